@@ -11,3 +11,66 @@ resource "aws_s3_bucket_acl" "main_acl" {
   bucket = aws_s3_bucket.main.id
   acl    = "private"
 }
+
+# Inter-stage ETL payloads (claim checks, services/etl/blob_store.py). The stages of one
+# run execute on different worker pods, so the payloads must live in shared storage.
+# Kept apart from the CloudFront-served app bucket; the sweep_etl_blobs task deletes
+# blobs after ETL_BLOB_RETENTION_HOURS and the lifecycle rule catches anything it misses.
+resource "aws_s3_bucket" "etl_blobs" {
+  bucket = "estate-etl-blobs"
+
+  tags = {
+    Environment = "development"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "etl_blobs" {
+  bucket                  = aws_s3_bucket.etl_blobs.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "etl_blobs" {
+  bucket = aws_s3_bucket.etl_blobs.id
+
+  rule {
+    id     = "expire-etl-blobs"
+    status = "Enabled"
+
+    filter {
+      prefix = "etl-blobs/"
+    }
+
+    expiration {
+      days = 4
+    }
+  }
+}
+
+resource "aws_iam_policy" "etl_blobs_access" {
+  name        = "estate-etl-blobs-access"
+  description = "Policy to allow the ETL workers to read and write inter-stage payloads"
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject", "s3:PutObject", "s3:DeleteObject"]
+        Resource = "${aws_s3_bucket.etl_blobs.arn}/etl-blobs/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = aws_s3_bucket.etl_blobs.arn
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "etl_blobs_access" {
+  role       = aws_iam_role.eks_node_group.name
+  policy_arn = aws_iam_policy.etl_blobs_access.arn
+}
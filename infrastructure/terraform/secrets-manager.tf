@@ -119,6 +119,12 @@ resource "aws_iam_policy" "secrets_manager_access" {
           aws_secretsmanager_secret.kreb_api_key.arn,
           aws_secretsmanager_secret.database_url.arn
         ]
+      },
+      {
+        # The Python services load their secrets in one batched call; GetSecretValue above still scopes which ones
+        Effect   = "Allow"
+        Action   = ["secretsmanager:BatchGetSecretValue"]
+        Resource = "*"
       }
     ]
   })
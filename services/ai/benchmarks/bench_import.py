@@ -0,0 +1,103 @@
+"""
+Benchmark: cold import time of a module (worker startup), without credentials.
+
+Each repeat imports the module in a fresh interpreter with every AWS_* and
+OPENAI_* variable removed and instance metadata lookups disabled, so the run
+proves importing needs no credentials or network. The child reports the wall
+time of the import and which heavy client libraries it pulled in. With --ref the
+same module is also timed in a git archive of that commit, for a before/after
+comparison.
+
+Run from the repository root:
+    python -m services.ai.benchmarks.bench_import --repeat 10 --ref HEAD~1
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from typing import Dict, Optional
+
+HEAVY_MODULES = ('openai', 'boto3', 'botocore', 'sqlalchemy', 'httpx')
+
+CHILD = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{'seconds': seconds, 'loaded': sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def clean_env(root: str) -> Dict[str, str]:
+    env = {k: v for k, v in os.environ.items() if not k.startswith(('AWS_', 'OPENAI_'))}
+    env.update({
+        'PYTHONPATH': root,
+        'PYTHONDONTWRITEBYTECODE': '1',
+        'NODE_ENV': 'development',
+        'AWS_EC2_METADATA_DISABLED': 'true',
+    })
+    env.pop('DATABASE_URL', None)
+    return env
+
+
+def measure(module: str, root: str, repeat: int) -> Dict:
+    """Import module repeat times in fresh interpreters rooted at root."""
+    code = CHILD.format(module=module, heavy=HEAVY_MODULES)
+    # One unmeasured run so every repeat reads warm bytecode caches
+    subprocess.run([sys.executable, "-c", f"import {module}"], env={**clean_env(root), 'PYTHONDONTWRITEBYTECODE': ''},
+                   cwd=root, capture_output=True, check=True)
+    samples, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], env=clean_env(root), cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result['seconds'])
+        loaded = result['loaded']
+    return {
+        'import_ms_median': round(statistics.median(samples) * 1000, 1),
+        'import_ms_min': round(min(samples) * 1000, 1),
+        'import_ms_max': round(max(samples) * 1000, 1),
+        'heavy_modules_loaded': loaded
+    }
+
+
+def _checkout(ref: str, directory: str) -> str:
+    archive = os.path.join(directory, 'tree.tar')
+    subprocess.run(['git', 'archive', '--format=tar', '-o', archive, ref], check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(os.path.join(directory, 'tree'))
+    return os.path.join(directory, 'tree')
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="services.ai.tasks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ref", help="git commit to compare against, e.g. HEAD~1")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    result: Dict[str, Optional[Dict]] = {
+        'benchmark': 'import_time',
+        'module': args.module,
+        'python': platform.python_version(),
+        'current': measure(args.module, os.getcwd(), args.repeat)
+    }
+    if args.ref:
+        with tempfile.TemporaryDirectory(prefix='import-bench-') as work_dir:
+            result['baseline'] = {'ref': args.ref, **measure(args.module, _checkout(args.ref, work_dir), args.repeat)}
+        result['speedup'] = round(result['baseline']['import_ms_median'] / result['current']['import_ms_median'], 1)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""
+Benchmark: wall time of a report summary, map-reduce versus one call per district in sequence.
+
+Both runs go through the real async OpenAI client to a local fake server
+(fake_llm) that answers after --latency seconds. The baseline is the same
+map-reduce summarizer with max_concurrency=1, so the calls and tokens are
+identical and only the concurrency differs. The cache is off for both runs.
+
+Run from the repository root:
+    python -m services.ai.benchmarks.bench_summarize --districts 25 --latency 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict
+
+from services.ai.benchmarks.fake_llm import FakeLLMServer
+from services.ai.summarization import MapReduceSummarizer, SUMMARY_MAX_CONCURRENCY
+
+
+def measure(base_url: str, districts: Dict[str, str], max_concurrency: int) -> Dict:
+    from services.ai.clients import new_async_openai_client
+    from services.ai.tasks import DISTRICT_SUMMARY_PROMPT, REPORT_SUMMARY_PROMPT
+
+    os.environ['OPENAI_API_BASE'] = base_url
+    summarizer = MapReduceSummarizer(new_async_openai_client, 'gpt-4', DISTRICT_SUMMARY_PROMPT, REPORT_SUMMARY_PROMPT,
+                                     max_concurrency=max_concurrency)
+    started = time.perf_counter()
+    result = summarizer.summarize("Weekly Seoul Apartment Market Analysis:", districts)
+    return {'max_concurrency': max_concurrency, 'seconds': round(time.perf_counter() - started, 2),
+            'calls': result.calls, 'fallbacks': result.fallbacks}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--districts", type=int, default=25)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds the fake server takes per call")
+    parser.add_argument("--concurrency", type=int, default=SUMMARY_MAX_CONCURRENCY)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('OPENAI_API_KEY', 'fake')
+    os.environ.setdefault('NODE_ENV', 'development')
+    districts = {f"District {i}": f"- District {i}: {10 + i} transactions, avg price {(9 + i) * 10 ** 8:,}원"
+                 for i in range(args.districts)}
+    with FakeLLMServer(latency=args.latency) as server:
+        result = {
+            'benchmark': 'map_reduce_summary',
+            'python': platform.python_version(),
+            'districts': args.districts,
+            'latency_seconds': args.latency,
+            'current': measure(server.base_url, districts, args.concurrency),
+            'baseline': measure(server.base_url, districts, 1)
+        }
+    result['speedup'] = round(result['baseline']['seconds'] / result['current']['seconds'], 1)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Local fake of the OpenAI chat completions endpoint, for tests, benchmarks and offline runs.
+
+The server answers POST /v1/chat/completions with a canned completion after a
+configurable latency. By default the answer is "Summary of: " plus the start
+of the last user message. A responder function can replace the answer, and a
+slow or failing call can be simulated per request. Point a client at it with
+base_url=server.base_url, or for a whole worker:
+
+    python -m services.ai.benchmarks.fake_llm --port 8089 --latency 0.5
+    OPENAI_API_BASE=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake celery -A services.ai.main worker
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Union
+
+# A responder returns the completion text, or an int HTTP status to fail the request with
+Responder = Callable[[List[Dict]], Union[str, int]]
+
+
+def echo_responder(messages: List[Dict]) -> str:
+    return f"Summary of: {messages[-1]['content'][:60]}"
+
+
+class FakeLLMServer:
+    """OpenAI-compatible chat completions server on a background thread."""
+
+    def __init__(self, responder: Responder = echo_responder, latency: Union[float, Callable[[List[Dict]], float]] = 0.0,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.responder = responder
+        self.latency = latency
+        self.requests: List[Dict] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send(404, {'error': {'message': f"unknown path {self.path}"}})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                server._record(body)
+                try:
+                    messages = body.get('messages', [])
+                    latency = server.latency(messages) if callable(server.latency) else server.latency
+                    time.sleep(latency)
+                    answer = server.responder(messages)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+                if isinstance(answer, int):
+                    self._send(answer, {'error': {'message': 'simulated failure', 'type': 'server_error'}})
+                    return
+                prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4
+                completion_tokens = len(answer) // 4
+                self._send(200, {
+                    'id': f"chatcmpl-fake-{len(server.requests)}",
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'fake'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                              'total_tokens': prompt_tokens + completion_tokens}
+                })
+
+            def _send(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _record(self, body: Dict):
+        with self._lock:
+            self.requests.append(body)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def start(self) -> 'FakeLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before every answer")
+    args = parser.parse_args(argv)
+    server = FakeLLMServer(latency=args.latency, host=args.host, port=args.port).start()
+    print(f"Fake LLM listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Local SMTP sink for tests, benchmarks and offline runs.
+
+Accepts every message and keeps it in memory instead of delivering it. A
+recipient can be rejected (550) with a predicate, to exercise per-recipient
+failures. It counts connections, so a test can check that a batch reused one.
+It speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET,
+NOOP and QUIT, without TLS or AUTH.
+
+    python -m services.ai.benchmarks.smtp_sink --port 8025
+    EMAIL_TRANSPORT=smtp SMTP_HOST=127.0.0.1 SMTP_PORT=8025 celery -A services.ai.main worker
+"""
+import argparse
+import sys
+import threading
+import time
+from email import message_from_bytes
+from email.message import Message
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from typing import Callable, List, NamedTuple, Optional
+
+
+class SinkMessage(NamedTuple):
+    sender: str
+    recipients: List[str]
+    message: Message
+
+
+def _address(argument: str) -> str:
+    return argument.split(':', 1)[1].split()[0].strip('<>') if ':' in argument else ''
+
+
+class SMTPSink:
+    """SMTP server on a background thread that keeps what it receives in .messages."""
+
+    def __init__(self, reject: Callable[[str], bool] = lambda recipient: False, host: str = '127.0.0.1', port: int = 0):
+        self.reject = reject
+        self.messages: List[SinkMessage] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingTCPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def _handler(self):
+        sink = self
+
+        class Handler(StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(f"{line}\r\n".encode('utf-8'))
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self.reply("220 estate smtp sink")
+                sender, recipients = '', []
+                for raw in self.rfile:
+                    command, _, argument = raw.decode('utf-8', 'replace').strip().partition(' ')
+                    command = command.upper()
+                    if command == 'EHLO':
+                        self.reply("250-estate smtp sink")
+                        self.reply("250 8BITMIME")
+                    elif command in ('HELO', 'NOOP'):
+                        self.reply("250 OK")
+                    elif command == 'MAIL':
+                        sender, recipients = _address(argument), []
+                        self.reply("250 OK")
+                    elif command == 'RCPT':
+                        recipient = _address(argument)
+                        if sink.reject(recipient):
+                            self.reply(f"550 {recipient} rejected")
+                        else:
+                            recipients.append(recipient)
+                            self.reply("250 OK")
+                    elif command == 'DATA':
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        for data_line in self.rfile:
+                            if data_line in (b".\r\n", b".\n"):
+                                break
+                            lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                        with sink._lock:
+                            sink.messages.append(SinkMessage(sender, recipients, message_from_bytes(b"".join(lines))))
+                        sender, recipients = '', []
+                        self.reply("250 OK: queued")
+                    elif command == 'RSET':
+                        sender, recipients = '', []
+                        self.reply("250 OK")
+                    elif command == 'QUIT':
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply(f"502 {command} not implemented")
+
+        return Handler
+
+    def start(self) -> 'SMTPSink':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'SMTPSink':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args(argv)
+    sink = SMTPSink(host=args.host, port=args.port).start()
+    print(f"SMTP sink listening on {args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"{len(sink.messages)} messages over {sink.connections} connections")
+    except KeyboardInterrupt:
+        sink.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
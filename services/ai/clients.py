@@ -0,0 +1,95 @@
+"""
+Lazily created, per-process clients for the AI tasks.
+
+Nothing here connects, reads a secret or imports openai, boto3 or SQLAlchemy
+until a task first asks for the client, so importing the tasks module (worker
+boot, tests) needs no network and no credentials. Each client is built once per
+process: a Celery prefork child that inherits a parent's client builds its own
+rather than sharing the parent's sockets.
+"""
+import os
+import logging
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+from services.common.secrets import secrets_manager
+
+T = TypeVar('T')
+
+
+class PerProcess(Generic[T]):
+    """Calls factory on first use in each process and caches the result."""
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._value: Optional[T] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def __call__(self) -> T:
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._value = self.factory()
+                    self._pid = pid
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._pid = None
+
+
+def _openai_options() -> dict:
+    options = {'api_key': secrets_manager.get_openai_api_key()}
+    if os.environ.get("OPENAI_API_TYPE") == 'azure':
+        options.update(azure_endpoint=os.environ.get("OPENAI_API_BASE"), api_version=os.environ.get("OPENAI_API_VERSION"))
+    else:
+        options['base_url'] = os.environ.get("OPENAI_API_BASE") or None
+    return options
+
+
+def _openai_client():
+    import openai
+
+    client_class = openai.AzureOpenAI if os.environ.get("OPENAI_API_TYPE") == 'azure' else openai.OpenAI
+    return client_class(**_openai_options())
+
+
+def new_async_openai_client(timeout: Optional[float] = None):
+    """A new async OpenAI client. Not cached: its connection pool belongs to the running event loop.
+
+    The caller handles timeouts and fallbacks itself, so the client does not retry.
+    """
+    import openai
+
+    client_class = openai.AsyncAzureOpenAI if os.environ.get("OPENAI_API_TYPE") == 'azure' else openai.AsyncOpenAI
+    return client_class(max_retries=0, timeout=timeout, **_openai_options())
+
+
+def _s3_client():
+    import boto3
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.environ.get("AWS_REGION"),
+    )
+
+
+def _db_engine():
+    # The pooled engine is shared process-wide and reset after fork by services.common.db
+    from services.common.db import get_engine
+
+    database_url = secrets_manager.get_database_url()
+    if not database_url:
+        logging.warning("No database URL configured for the AI service")
+        return None
+    return get_engine(database_url)
+
+
+get_openai_client = PerProcess(_openai_client)
+get_s3_client = PerProcess(_s3_client)
+get_db_engine = PerProcess(_db_engine)
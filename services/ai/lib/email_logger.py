@@ -11,3 +11,12 @@ def log_email_delivery_status(email: str, status: str, details: str = ''):
 
 def log_bounce_or_unsubscribe(email: str, event_type: str, details: str = ''):
     logging.warning(f"Email event: {event_type} for {email}. Details: {details}")
+
+def log_email_delivery_statuses(deliveries):
+    """One line for the successful deliveries of a batch, one per failure."""
+    sent = [delivery for delivery in deliveries if delivery.status == 'success']
+    if sent:
+        logging.info(f"Email delivery successful to {len(sent)} recipients. Details: {sent[0].details}")
+    for delivery in deliveries:
+        if delivery.status != 'success':
+            log_email_delivery_status(delivery.email, delivery.status, delivery.details)
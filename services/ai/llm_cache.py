@@ -0,0 +1,192 @@
+"""
+Content-addressed cache of LLM completions.
+
+A completion is stored under the hash of everything that determines it: the
+model, the prompt (system prompt, template and template version) and the data
+the template is filled with. A retry, a rerun or a quiet week with the same
+data summary therefore gets the stored text back instead of paying for another
+completion. The model and prompt hashes double as the model_hash and
+prompt_hash recorded with every report.
+
+Backends (LLM_CACHE_BACKEND):
+    database  the llm_response_cache table of the service database, shared by
+              every worker (default; disk when no database is configured).
+              The table is created by the schema migrations:
+              python -m services.etl.migrations
+    disk      one JSON file per entry under LLM_CACHE_DIR. Only shared, and
+              only kept across restarts, when LLM_CACHE_DIR is a shared
+              persistent volume
+    off       no cache
+
+Entries older than LLM_CACHE_TTL_SECONDS are misses. Beyond
+LLM_CACHE_MAX_ENTRIES the least recently used are evicted. LLM_CACHE_BYPASS=true
+(or bypass_cache=True on the task) skips the lookup but still stores the fresh
+completion.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+from services.ai.clients import PerProcess, get_db_engine
+
+LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'database').lower()
+LLM_CACHE_DIR = os.environ.get('LLM_CACHE_DIR', '/tmp/estate-llm-cache')
+LLM_CACHE_TTL_SECONDS = float(os.environ.get('LLM_CACHE_TTL_SECONDS', str(30 * 86400)))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '1000'))
+
+
+def _sha256(*parts: str) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class PromptKey(NamedTuple):
+    model_hash: str
+    prompt_hash: str
+    data_hash: str
+
+    @classmethod
+    def build(cls, model: str, system_prompt: str, template: str, template_version: str, data: str) -> 'PromptKey':
+        return cls(
+            model_hash=_sha256('model', model)[:16],
+            prompt_hash=_sha256('prompt', template_version, system_prompt, template)[:16],
+            data_hash=_sha256('data', data)
+        )
+
+    @property
+    def cache_key(self) -> str:
+        return _sha256(self.model_hash, self.prompt_hash, self.data_hash)
+
+
+def bypass_requested() -> bool:
+    return os.environ.get('LLM_CACHE_BYPASS', 'false').lower() == 'true'
+
+
+def cache_entry(model: str, response: str, usage=None) -> Dict:
+    """The entry stored for a completion, with its token usage if the API reported it."""
+    entry = {'model': model, 'response': response, 'created_at': time.time()}
+    for kind in ('prompt', 'completion'):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        entry[f"{kind}_tokens"] = tokens if isinstance(tokens, int) else None
+    return entry
+
+
+class DiskLLMCache:
+    """Entries as <root>/<key[:2]>/<key>.json; the file mtime is the last use."""
+
+    def __init__(self, root: str = LLM_CACHE_DIR, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key: PromptKey) -> Optional[Dict]:
+        path = self._path(key.cache_key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+            os.remove(path)
+            return None
+        os.utime(path)
+        return entry
+
+    def put(self, key: PromptKey, entry: Dict):
+        path = self._path(key.cache_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.prune()
+
+    def prune(self) -> int:
+        """Remove expired entries and the least recently used beyond max_entries; returns the count."""
+        entries: List = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(directory, name)
+                    entries.append((os.path.getmtime(path), path))
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.ttl_seconds
+        evicted = [path for i, (used_at, path) in enumerate(entries) if i >= self.max_entries or used_at < cutoff]
+        for path in evicted:
+            os.remove(path)
+        return len(evicted)
+
+
+class DatabaseLLMCache:
+    """Entries in the llm_response_cache table (schema migration 8)."""
+
+    def __init__(self, engine, ttl_seconds: float = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def get(self, key: PromptKey) -> Optional[Dict]:
+        from sqlalchemy import text
+        with self.engine.connect() as connection:
+            row = connection.execute(text(
+                "SELECT model, response, prompt_tokens, completion_tokens, created_at FROM llm_response_cache "
+                "WHERE cache_key = :cache_key AND created_at >= :cutoff"
+            ), {'cache_key': key.cache_key, 'cutoff': time.time() - self.ttl_seconds}).fetchone()
+            if row is None:
+                return None
+            connection.execute(text("UPDATE llm_response_cache SET last_used_at = :now WHERE cache_key = :cache_key"),
+                               {'now': time.time(), 'cache_key': key.cache_key})
+            connection.commit()
+        return {'model': row[0], 'response': row[1], 'prompt_tokens': row[2], 'completion_tokens': row[3],
+                'created_at': row[4]}
+
+    def put(self, key: PromptKey, entry: Dict):
+        from sqlalchemy import text
+        with self.engine.connect() as connection:
+            connection.execute(text("DELETE FROM llm_response_cache WHERE cache_key = :cache_key"),
+                               {'cache_key': key.cache_key})
+            connection.execute(text(
+                "INSERT INTO llm_response_cache (cache_key, model, model_hash, prompt_hash, response, prompt_tokens, "
+                "completion_tokens, created_at, last_used_at) VALUES (:cache_key, :model, :model_hash, :prompt_hash, "
+                ":response, :prompt_tokens, :completion_tokens, :created_at, :created_at)"
+            ), {'cache_key': key.cache_key, 'model_hash': key.model_hash, 'prompt_hash': key.prompt_hash,
+                'model': entry['model'], 'response': entry['response'], 'prompt_tokens': entry.get('prompt_tokens'),
+                'completion_tokens': entry.get('completion_tokens'), 'created_at': entry['created_at']})
+            connection.commit()
+        self.prune()
+
+    def prune(self) -> int:
+        from sqlalchemy import text
+        with self.engine.connect() as connection:
+            evicted = connection.execute(text("DELETE FROM llm_response_cache WHERE created_at < :cutoff"),
+                                         {'cutoff': time.time() - self.ttl_seconds}).rowcount
+            evicted += connection.execute(text(
+                "DELETE FROM llm_response_cache WHERE cache_key NOT IN "
+                "(SELECT cache_key FROM llm_response_cache ORDER BY last_used_at DESC LIMIT :max_entries)"
+            ), {'max_entries': self.max_entries}).rowcount
+            connection.commit()
+        return evicted
+
+
+def _llm_cache():
+    if LLM_CACHE_BACKEND == 'off':
+        return None
+    if LLM_CACHE_BACKEND == 'database':
+        engine = get_db_engine()
+        if engine is not None:
+            return DatabaseLLMCache(engine)
+        logging.warning(f"LLM cache backend is database but no database is configured; caching on disk in {LLM_CACHE_DIR}")
+        return DiskLLMCache()
+    if LLM_CACHE_BACKEND != 'disk':
+        raise ValueError(f"Unsupported LLM cache backend: {LLM_CACHE_BACKEND}")
+    return DiskLLMCache()
+
+
+get_llm_cache = PerProcess(_llm_cache)
@@ -0,0 +1,142 @@
+"""
+Report email delivery in batches.
+
+The report tasks stream verified subscribers with a server-side cursor and
+enqueue one send_report_emails task per EMAIL_BATCH_SIZE addresses, instead of
+one task per subscriber. A batch task renders the email once and sends every
+message of the batch over one connection. The per-recipient outcomes are then
+logged and counted in bulk.
+
+Transports (EMAIL_TRANSPORT):
+    log   log each delivery without sending (default)
+    smtp  SMTP_HOST:SMTP_PORT, with STARTTLS when SMTP_USE_TLS=true and a login
+          when SMTP_USERNAME is set (e.g. the SES SMTP endpoint,
+          email-smtp.<region>.amazonaws.com:587)
+
+For local runs and tests, point the smtp transport at the sink:
+
+    python -m services.ai.benchmarks.smtp_sink --port 8025
+    EMAIL_TRANSPORT=smtp SMTP_HOST=127.0.0.1 SMTP_PORT=8025 celery -A services.ai.main worker
+"""
+import os
+import smtplib
+import logging
+from email.message import EmailMessage
+from typing import Iterable, List, NamedTuple, Tuple
+
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'log').lower()
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', '500'))
+EMAIL_FROM = os.environ.get('EMAIL_FROM', 'Estate Reports <reports@estate.example.com>')
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '25'))
+SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'false').lower() == 'true'
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_TIMEOUT_SECONDS = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '30'))
+
+
+class ReportEmail(NamedTuple):
+    subject: str
+    html: str
+
+
+class Delivery(NamedTuple):
+    email: str
+    status: str  # success | failed
+    details: str
+
+
+def render_report_email(report_url: str, report_summary: str, report_type: str = "weekly") -> ReportEmail:
+    subject = f"Your {report_type.capitalize()} Real Estate Report is Here!"
+    html = f"<h1>{report_type.capitalize()} Real Estate Report</h1><p>Here's your {report_type} summary: {report_summary}</p><p>View full report: <a href=\"{report_url}\">{report_url}</a></p>"
+    return ReportEmail(subject, html)
+
+
+class LogTransport:
+    """Sends nothing; every delivery succeeds."""
+
+    def __enter__(self) -> 'LogTransport':
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def send(self, message: EmailMessage) -> str:
+        return 'Simulated email sent'
+
+
+class SMTPTransport:
+    """One SMTP connection for every message sent inside the with block; reconnects once if the server hangs up."""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, use_tls: bool = SMTP_USE_TLS,
+                 username: str = SMTP_USERNAME, password: str = SMTP_PASSWORD, timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.connections = 0
+        self._smtp = None
+
+    def _connect(self):
+        self._smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            self._smtp.starttls()
+        if self.username:
+            self._smtp.login(self.username, self.password or '')
+        self.connections += 1
+
+    def __enter__(self) -> 'SMTPTransport':
+        self._connect()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+
+    def send(self, message: EmailMessage) -> str:
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._smtp.send_message(message)
+        return 'Sent via SMTP'
+
+
+def get_transport():
+    if EMAIL_TRANSPORT == 'log':
+        return LogTransport()
+    if EMAIL_TRANSPORT == 'smtp':
+        return SMTPTransport()
+    raise ValueError(f"Unsupported email transport: {EMAIL_TRANSPORT}")
+
+
+def send_batch(recipients: Iterable[str], email: ReportEmail, transport) -> Tuple[List[Delivery], List[str]]:
+    """Send the email to every recipient over one transport connection.
+
+    Returns the deliveries, and the recipients not attempted because the connection was lost
+    (safe to retry: none of them was sent to).
+    """
+    message = EmailMessage()
+    message['Subject'] = email.subject
+    message['From'] = EMAIL_FROM
+    message.set_content(email.html, subtype='html')
+
+    recipients = list(recipients)
+    deliveries: List[Delivery] = []
+    try:
+        with transport:
+            for recipient in recipients:
+                del message['To']
+                message['To'] = recipient
+                try:
+                    deliveries.append(Delivery(recipient, 'success', transport.send(message)))
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                    # Rejected by the server: this recipient fails, the connection is still good
+                    deliveries.append(Delivery(recipient, 'failed', str(e)))
+    except Exception as e:
+        logging.error(f"Email transport failed after {len(deliveries)} of {len(recipients)} recipients: {e}")
+    return deliveries, recipients[len(deliveries):]
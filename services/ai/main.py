@@ -3,13 +3,19 @@ import sentry_sdk
 from celery import Celery
 from celery.schedules import crontab
 from prometheus_client import start_http_server
+from services.common import profiling
+from services.common.secrets import AI_SECRETS, secrets_manager
+
+# Load every secret the service needs in one batched call; they are refreshed in the background
+if os.environ.get('NODE_ENV') == 'production':
+    secrets_manager.preload(AI_SECRETS)
 
 sentry_dsn = os.environ.get("SENTRY_DSN")
 if sentry_dsn and sentry_dsn not in ["aHR0cHM6Ly9leGFtcGxlQHNlbnRyeS5pbw==", "https://example@sentry.io"]:  # Skip placeholders
+    # Traces are sampled per task name (SENTRY_TRACES_SAMPLE_RATE[S]) rather than for every task
     sentry_sdk.init(
         dsn=sentry_dsn,
-        traces_sample_rate=1.0,
-        profiles_sample_rate=1.0,
+        **profiling.sentry_options()
     )
 
 broker_url = os.environ.get("CELERY_BROKER", "redis://localhost:6379/0")
@@ -28,6 +34,9 @@ app.conf.beat_schedule = {
 }
 app.conf.timezone = 'UTC'
 
+# Sampled per-task profiles (TASK_PROFILE_* variables)
+profiling.install()
+
 # Health check endpoints
 from flask import Flask, jsonify
 
@@ -0,0 +1,248 @@
+"""
+Map-reduce summarization of per-district report data.
+
+Each district's data is summarized by its own LLM call (map). The calls run
+concurrently on an async client, at most SUMMARY_MAX_CONCURRENCY at a time.
+One more call (reduce) combines the district summaries and the report header.
+When the district summaries do not fit one reduce prompt, they are reduced in
+groups first, level by level.
+
+Token counts are estimated without a tokenizer (estimate_tokens is
+deliberately generous for Korean text). A document larger than the map prompt
+budget is chunked at line boundaries, and every call asks for at most
+SUMMARY_OUTPUT_TOKENS. Every call has a timeout. A map call that times out or
+fails falls back to the district's own data lines, trimmed to the output
+budget, so one slow district degrades the report instead of failing it. When
+more than SUMMARY_MAX_FALLBACK_RATIO of the map calls fail, or any reduce call
+fails, SummarizationError is raised instead and the report task retries.
+Completions go through the LLM response cache, so a rerun only pays for the
+districts whose data changed. With bypass, every completion is requested again
+and the fresh result replaces the cached one.
+"""
+import os
+import math
+import asyncio
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from services.ai.llm_cache import PromptKey, cache_entry
+from services.common.metrics import llm_cache_total, llm_duration_seconds, llm_fallbacks_total, observe_llm_usage, timed
+
+SUMMARY_MAX_CONCURRENCY = int(os.environ.get('SUMMARY_MAX_CONCURRENCY', '8'))
+SUMMARY_CALL_TIMEOUT_SECONDS = float(os.environ.get('SUMMARY_CALL_TIMEOUT_SECONDS', '60'))
+SUMMARY_CONTEXT_TOKENS = int(os.environ.get('SUMMARY_CONTEXT_TOKENS', '8192'))
+SUMMARY_OUTPUT_TOKENS = int(os.environ.get('SUMMARY_OUTPUT_TOKENS', '400'))
+SUMMARY_MAX_FALLBACK_RATIO = float(os.environ.get('SUMMARY_MAX_FALLBACK_RATIO', '0.5'))
+# Chat formatting tokens per message, on top of the content
+MESSAGE_OVERHEAD_TOKENS = 8
+MAX_REDUCE_LEVELS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """About four ASCII characters per token, and one token for every other character."""
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Split text at line boundaries into chunks of at most max_tokens; an overlong line is cut."""
+    chunks, lines, size = [], [], 0
+    for line in text.splitlines():
+        while estimate_tokens(line) > max_tokens:
+            head = truncate_to_tokens(line, max_tokens)
+            if lines:
+                chunks.append("\n".join(lines))
+                lines, size = [], 0
+            chunks.append(head)
+            line = line[len(head):]
+        tokens = estimate_tokens(line) + 1
+        if lines and size + tokens > max_tokens:
+            chunks.append("\n".join(lines))
+            lines, size = [], 0
+        lines.append(line)
+        size += tokens
+    if lines:
+        chunks.append("\n".join(lines))
+    return chunks or [""]
+
+
+def pack(texts: List[str], max_tokens: int) -> List[List[str]]:
+    """Greedy groups of consecutive texts, each group within max_tokens (a single text may exceed it)."""
+    groups, group, size = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text) + 1
+        if group and size + tokens > max_tokens:
+            groups.append(group)
+            group, size = [], 0
+        group.append(text)
+        size += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+
+class SummarizationError(RuntimeError):
+    """Too many LLM calls failed for the summary to be worth sending."""
+
+
+class Prompt(NamedTuple):
+    system: str
+    template: str  # formatted with data (and district for map prompts)
+    version: str = "1"
+
+
+class SummaryResult(NamedTuple):
+    summary: str
+    district_summaries: Dict[str, str]
+    calls: int
+    cache_hits: int
+    fallbacks: int
+
+
+class MapReduceSummarizer:
+    """Summarizes {district: data} with concurrent map calls and a reduce call; see the module docstring."""
+
+    def __init__(self, client_factory: Callable, model: str, map_prompt: Prompt, reduce_prompt: Prompt,
+                 cache=None, max_concurrency: int = SUMMARY_MAX_CONCURRENCY,
+                 call_timeout: float = SUMMARY_CALL_TIMEOUT_SECONDS, context_tokens: int = SUMMARY_CONTEXT_TOKENS,
+                 output_tokens: int = SUMMARY_OUTPUT_TOKENS, max_fallback_ratio: float = SUMMARY_MAX_FALLBACK_RATIO,
+                 bypass: bool = False):
+        self.client_factory = client_factory
+        self.model = model
+        self.map_prompt = map_prompt
+        self.reduce_prompt = reduce_prompt
+        self.cache = cache
+        self.bypass = bypass
+        self.max_concurrency = max_concurrency
+        self.call_timeout = call_timeout
+        self.output_tokens = output_tokens
+        self.max_fallback_ratio = max_fallback_ratio
+        self.map_budget = self._prompt_budget(context_tokens, map_prompt)
+        self.reduce_budget = self._prompt_budget(context_tokens, reduce_prompt)
+        # Every reduce group must take at least two summaries, or reducing would not converge
+        if self.reduce_budget < 2 * (output_tokens + 16):
+            raise ValueError(f"SUMMARY_CONTEXT_TOKENS {context_tokens} leaves too little room for reducing "
+                             f"summaries of {output_tokens} tokens")
+
+    def _prompt_budget(self, context_tokens: int, prompt: Prompt) -> int:
+        fixed = estimate_tokens(prompt.system) + estimate_tokens(prompt.template) + 2 * MESSAGE_OVERHEAD_TOKENS
+        return context_tokens - self.output_tokens - fixed
+
+    def prompt_key(self, data: str) -> PromptKey:
+        """Key of the whole summary; its model_hash and prompt_hash are recorded with the report."""
+        return PromptKey.build(self.model, self.map_prompt.system + self.reduce_prompt.system,
+                               self.map_prompt.template + self.reduce_prompt.template,
+                               f"map-reduce:{self.map_prompt.version}:{self.reduce_prompt.version}", data)
+
+    def summarize(self, header: str, documents: Dict[str, str]) -> SummaryResult:
+        return asyncio.run(self.asummarize(header, documents))
+
+    async def asummarize(self, header: str, documents: Dict[str, str]) -> SummaryResult:
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._calls = self._cache_hits = self._fallbacks = 0
+        client = self.client_factory()
+        try:
+            district_summaries = await self._map(client, documents)
+            summary = await self._reduce(client, header, [f"{district}: {text}" for district, text in district_summaries.items()])
+        finally:
+            close = getattr(client, 'close', None)
+            if close is not None:
+                await close()
+        return SummaryResult(summary, district_summaries, self._calls, self._cache_hits, self._fallbacks)
+
+    async def _map(self, client, documents: Dict[str, str]) -> Dict[str, str]:
+        async def summarize_district(district: str, data: str) -> str:
+            chunks = chunk_text(data, self.map_budget - estimate_tokens(district))
+            parts = await asyncio.gather(*(
+                self._complete(client, 'map', self.map_prompt, self.map_prompt.template.format(district=district, data=chunk),
+                               fallback=chunk)
+                for chunk in chunks
+            ))
+            return " ".join(parts)
+
+        summaries = await asyncio.gather(*(summarize_district(district, data) for district, data in documents.items()))
+        map_parts = self._calls + self._cache_hits
+        if self._fallbacks > map_parts * self.max_fallback_ratio:
+            raise SummarizationError(f"{self._fallbacks} of {map_parts} district summaries failed")
+        return dict(zip(documents, summaries))
+
+    async def _reduce(self, client, header: str, texts: List[str]) -> str:
+        budget = self.reduce_budget - estimate_tokens(header)
+        for _ in range(MAX_REDUCE_LEVELS):
+            groups = pack(texts, budget)
+            if len(groups) == 1:
+                break
+            # Too many summaries for one prompt: reduce each group, then reduce the results
+            texts = await asyncio.gather(*(self._reduce_group(client, header, group) for group in groups))
+        return await self._reduce_group(client, header, texts)
+
+    async def _reduce_group(self, client, header: str, texts: List[str]) -> str:
+        data = truncate_to_tokens("\n".join([header] + texts), self.reduce_budget)
+        return await self._complete(client, 'reduce', self.reduce_prompt, self.reduce_prompt.template.format(data=data))
+
+    async def _complete(self, client, stage: str, prompt: Prompt, content: str, fallback: Optional[str] = None) -> str:
+        """The completion for content; on failure the fallback text, or SummarizationError without one."""
+        key = PromptKey.build(self.model, prompt.system, prompt.template, prompt.version, content)
+        cached = self._cache_get(stage, key)
+        if cached is not None:
+            self._cache_hits += 1
+            return cached
+        async with self._semaphore:
+            self._calls += 1
+            try:
+                with timed(llm_duration_seconds, service='ai', stage=stage, model=self.model):
+                    response = await asyncio.wait_for(client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "system", "content": prompt.system}, {"role": "user", "content": content}],
+                        max_tokens=self.output_tokens
+                    ), timeout=self.call_timeout)
+                text = response.choices[0].message.content
+                if not text:
+                    raise ValueError("empty completion")
+            except Exception as e:
+                reason = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'error'
+                if fallback is None:
+                    raise SummarizationError(f"LLM {stage} call failed ({reason}: {e})") from e
+                logging.warning(f"LLM {stage} call failed ({reason}: {e}), using its data instead")
+                llm_fallbacks_total.labels('ai', stage, reason).inc()
+                self._fallbacks += 1
+                return truncate_to_tokens(fallback, self.output_tokens)
+        usage = getattr(response, 'usage', None)
+        observe_llm_usage('ai', stage, self.model, usage)
+        self._cache_put(key, cache_entry(self.model, text, usage))
+        return text
+
+    def _cache_get(self, stage: str, key: PromptKey) -> Optional[str]:
+        if self.cache is None:
+            return None
+        if self.bypass:
+            llm_cache_total.labels('ai', stage, 'bypass').inc()
+            return None
+        try:
+            entry = self.cache.get(key)
+        except Exception as e:
+            logging.warning(f"LLM cache lookup failed: {e}")
+            llm_cache_total.labels('ai', stage, 'error').inc()
+            return None
+        llm_cache_total.labels('ai', stage, 'hit' if entry is not None else 'miss').inc()
+        return entry['response'] if entry is not None else None
+
+    def _cache_put(self, key: PromptKey, entry: Dict):
+        if self.cache is not None:
+            try:
+                self.cache.put(key, entry)
+            except Exception as e:
+                logging.warning(f"Failed to store a completion in the LLM cache: {e}")
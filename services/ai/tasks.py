@@ -1,14 +1,19 @@
 from celery import shared_task
-import openai
 import os
 import hashlib
 import json
-import boto3
-from sqlalchemy import create_engine, text
 import logging
-from services.ai.lib.email_logger import log_email_delivery_status, log_bounce_or_unsubscribe
-from services.ai.secrets_manager import secrets_manager
+from services.ai.lib.email_logger import log_email_delivery_status, log_email_delivery_statuses, log_bounce_or_unsubscribe
+from typing import Dict, List, NamedTuple, Tuple
+from services.ai.clients import get_db_engine, get_openai_client, get_s3_client, new_async_openai_client
+from services.ai.mailer import EMAIL_BATCH_SIZE, Delivery, get_transport, render_report_email, send_batch
+from services.ai.llm_cache import PromptKey, bypass_requested, cache_entry, get_llm_cache
+from services.ai.summarization import SUMMARY_CALL_TIMEOUT_SECONDS, MapReduceSummarizer, Prompt
 from prometheus_client import Counter
+from services.common.metrics import (
+    emails_total, llm_cache_total, llm_duration_seconds, observe_llm_usage, observe_rows, s3_upload_duration_seconds,
+    stage_bytes_total, stage_duration_seconds, timed
+)
 
 # Prometheus Metrics
 ai_tasks_processed = Counter('ai_tasks_processed_total', 'Total number of AI tasks processed', ['task_name', 'status'])
@@ -16,23 +21,57 @@ ai_tasks_processed = Counter('ai_tasks_processed_total', 'Total number of AI tas
 # Configure logging for the AI service
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Configure OpenAI API key using secrets manager
-openai.api_key = secrets_manager.get_openai_api_key()
-openai.api_base = os.environ.get("OPENAI_API_BASE") # For Azure OpenAI
-openai.api_type = os.environ.get("OPENAI_API_TYPE") # For Azure OpenAI
-openai.api_version = os.environ.get("OPENAI_API_VERSION") # For Azure OpenAI
-
-# Configure S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-    region_name=os.environ.get("AWS_REGION"),
+# The OpenAI, S3 and database clients are created on first use (services.ai.clients),
+# so importing this module needs no credentials or network
+
+SUMMARY_MODEL = os.environ.get("OPENAI_SUMMARY_MODEL", "gpt-4") # Or your Azure OpenAI deployment name
+SUMMARY_SYSTEM_PROMPT = "You are a helpful assistant that summarizes real estate data."
+SUMMARY_PROMPT_TEMPLATE = "Summarize the following real estate data: {data_summary}"
+# Bump when the prompt's meaning changes without its wording (e.g. new data in the summary)
+SUMMARY_PROMPT_VERSION = "1"
+
+def summary_prompt_key(data_summary: str) -> PromptKey:
+    """Cache key of a summary; its model_hash and prompt_hash are recorded with the report."""
+    return PromptKey.build(SUMMARY_MODEL, SUMMARY_SYSTEM_PROMPT, SUMMARY_PROMPT_TEMPLATE, SUMMARY_PROMPT_VERSION, data_summary)
+
+# map_reduce: one concurrent LLM call per district, then one combining call (services.ai.summarization);
+# single: the whole data summary in one prompt
+REPORT_SUMMARY_MODE = os.environ.get("REPORT_SUMMARY_MODE", "map_reduce")
+DISTRICT_SUMMARY_PROMPT = Prompt(
+    system="You are a real estate analyst. Summarize one Seoul district's apartment market data in two or three sentences.",
+    template="District: {district}\n{data}"
+)
+REPORT_SUMMARY_PROMPT = Prompt(
+    system=SUMMARY_SYSTEM_PROMPT,
+    template="Combine these district summaries into one summary of the Seoul apartment market:\n{data}"
 )
 
-# Configure PostgreSQL engine using secrets manager
-DATABASE_URL = secrets_manager.get_database_url()
-engine = create_engine(DATABASE_URL) if DATABASE_URL else None
+class ReportData(NamedTuple):
+    header: List[str]
+    districts: Dict[str, str]  # district name -> its data line
+    notes: List[str]
+
+    @classmethod
+    def message(cls, text: str) -> 'ReportData':
+        return cls([text], {}, [])
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.header + list(self.districts.values()) + self.notes)
+
+def summarize_report_data(report_data: ReportData, bypass_cache: bool = False) -> Tuple[str, PromptKey]:
+    """Summary of a report's data and the key recording which model and prompts produced it"""
+    if REPORT_SUMMARY_MODE == 'map_reduce' and len(report_data.districts) > 1:
+        summarizer = MapReduceSummarizer(
+            lambda: new_async_openai_client(timeout=SUMMARY_CALL_TIMEOUT_SECONDS), SUMMARY_MODEL,
+            DISTRICT_SUMMARY_PROMPT, REPORT_SUMMARY_PROMPT,
+            cache=get_llm_cache(), bypass=bypass_cache or bypass_requested()
+        )
+        result = summarizer.summarize("\n".join(report_data.header + report_data.notes), report_data.districts)
+        logging.info(f"Summarized {len(report_data.districts)} districts with {result.calls} LLM calls "
+                     f"({result.cache_hits} cached, {result.fallbacks} fallbacks).")
+        return result.summary, summarizer.prompt_key(report_data.text)
+    return generate_summary_with_gpt4(report_data.text, bypass_cache), summary_prompt_key(report_data.text)
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
 def generate_weekly_report(self):
@@ -40,15 +79,15 @@ def generate_weekly_report(self):
         logging.info("Starting weekly report generation.")
         
         # Fetch actual Seoul apartment data from ETL pipeline
-        data_summary = get_weekly_apartment_data_summary()
+        report_data = get_weekly_apartment_report_data()
         
         # Generate summary using GPT-4
-        summary = generate_summary_with_gpt4(data_summary)
+        summary, prompt_key = summarize_report_data(report_data)
         logging.info(f"Generated summary: {summary}")
         
-        # Placeholder for model_hash and prompt_hash (would come from MLflow/Git tags)
-        model_hash = "mock_model_hash_123"
-        prompt_hash = "mock_prompt_hash_456"
+        # Hashes of the model and prompts that produced the summary (the LLM cache key)
+        model_hash = prompt_key.model_hash
+        prompt_hash = prompt_key.prompt_hash
 
         report_content = f"<h1>Weekly Real Estate Report</h1><p>{summary}</p>"
         report_filename = f"weekly_report_{hashlib.md5(report_content.encode()).hexdigest()}.html"
@@ -56,7 +95,9 @@ def generate_weekly_report(self):
 
         # Store report in S3
         try:
-            s3_client.put_object(Bucket=s3_bucket_name, Key=report_filename, Body=report_content, ContentType='text/html')
+            with timed(s3_upload_duration_seconds, service='ai', stage='report'):
+                get_s3_client().put_object(Bucket=s3_bucket_name, Key=report_filename, Body=report_content, ContentType='text/html')
+            stage_bytes_total.labels('ai', 'report', 'upload').inc(len(report_content.encode('utf-8')))
             logging.info(f"Report stored in S3: s3://{s3_bucket_name}/{report_filename}")
         except Exception as e:
             logging.error(f"Error storing report in S3: {e}")
@@ -72,8 +113,10 @@ def generate_weekly_report(self):
         logging.info(f"Generated report metadata: {report_metadata}")
 
         # Store metadata in PostgreSQL
+        engine = get_db_engine()
         if engine:
             try:
+                from sqlalchemy import text
                 with engine.connect() as connection:
                     connection.execute(text("INSERT INTO reports (summary, model_hash, prompt_hash, s3_url, timestamp) VALUES (:summary, :model_hash, :prompt_hash, :s3_url, NOW())"), report_metadata)
                     connection.commit()
@@ -82,18 +125,12 @@ def generate_weekly_report(self):
                 logging.error(f"Error storing report metadata in PostgreSQL: {e}")
                 raise self.retry(exc=e)
 
-        # Fetch subscribers and send emails
+        # Stream subscribers and send emails in batches
         if engine:
             try:
-                with engine.connect() as connection:
-                    result = connection.execute(text("SELECT email FROM \"Subscription\" WHERE frequency = 'weekly' AND verified = true"))
-                    subscribers = result.fetchall()
-                logging.info(f"Fetched {len(subscribers)} weekly subscribers.")
-
                 report_url = f"http://your-app-domain.com/reports/{report_filename}" # Replace with actual report URL
-
-                for subscriber in subscribers:
-                    send_report_email.delay(subscriber[0], report_url, summary)
+                subscribers = fan_out_report_emails(engine, 'weekly', report_url, summary, 'weekly')
+                logging.info(f"Queued report emails for {subscribers} weekly subscribers.")
 
             except Exception as e:
                 logging.error(f"Error fetching subscribers or sending emails: {e}")
@@ -107,18 +144,45 @@ def generate_weekly_report(self):
         raise self.retry(exc=e)
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
-def generate_summary_with_gpt4(self, data_summary: str):
+def generate_summary_with_gpt4(self, data_summary: str, bypass_cache: bool = False):
     try:
+        prompt_key = summary_prompt_key(data_summary)
+        cache = get_llm_cache()
+        if cache is not None and (bypass_cache or bypass_requested()):
+            llm_cache_total.labels('ai', 'summary', 'bypass').inc()
+        elif cache is not None:
+            try:
+                cached = cache.get(prompt_key)
+            except Exception as e:
+                # The cache only saves money; a broken one must not fail the report
+                logging.warning(f"LLM cache lookup failed: {e}")
+                llm_cache_total.labels('ai', 'summary', 'error').inc()
+                cached = None
+            if cached is not None:
+                llm_cache_total.labels('ai', 'summary', 'hit').inc()
+                logging.info(f"Summary served from the LLM cache ({prompt_key.data_hash[:12]}).")
+                ai_tasks_processed.labels('generate_summary_with_gpt4', 'success').inc()
+                return cached['response']
+            llm_cache_total.labels('ai', 'summary', 'miss').inc()
+
         logging.info(f"Generating summary with GPT-4 for data: {data_summary[:50]}...")
-        response = openai.chat.completions.create(
-            model="gpt-4", # Or your Azure OpenAI deployment name
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes real estate data."},
-                {"role": "user", "content": f"Summarize the following real estate data: {data_summary}"}
-            ]
-        )
+        with timed(llm_duration_seconds, service='ai', stage='summary', model=SUMMARY_MODEL):
+            response = get_openai_client().chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": SUMMARY_PROMPT_TEMPLATE.format(data_summary=data_summary)}
+                ]
+            )
+        usage = getattr(response, 'usage', None)
+        observe_llm_usage('ai', 'summary', SUMMARY_MODEL, usage)
         summary = response.choices[0].message.content
         logging.info("Summary generated successfully with GPT-4.")
+        if cache is not None and summary:
+            try:
+                cache.put(prompt_key, cache_entry(SUMMARY_MODEL, summary, usage))
+            except Exception as e:
+                logging.warning(f"Failed to store the summary in the LLM cache: {e}")
         ai_tasks_processed.labels('generate_summary_with_gpt4', 'success').inc()
         return summary
     except Exception as e:
@@ -133,15 +197,15 @@ def generate_monthly_report(self):
         logging.info("Starting monthly report generation.")
         
         # Fetch actual Seoul apartment data from ETL pipeline
-        data_summary = get_monthly_apartment_data_summary()
+        report_data = get_monthly_apartment_report_data()
         
         # Generate summary using GPT-4
-        summary = generate_summary_with_gpt4(data_summary)
+        summary, prompt_key = summarize_report_data(report_data)
         logging.info(f"Generated summary: {summary}")
         
-        # Placeholder for model_hash and prompt_hash (would come from MLflow/Git tags)
-        model_hash = "mock_model_hash_789"
-        prompt_hash = "mock_prompt_hash_101"
+        # Hashes of the model and prompts that produced the summary (the LLM cache key)
+        model_hash = prompt_key.model_hash
+        prompt_hash = prompt_key.prompt_hash
 
         report_content = f"<h1>Monthly Real Estate Report</h1><p>{summary}</p>"
         report_filename = f"monthly_report_{hashlib.md5(report_content.encode()).hexdigest()}.html"
@@ -149,7 +213,9 @@ def generate_monthly_report(self):
 
         # Store report in S3
         try:
-            s3_client.put_object(Bucket=s3_bucket_name, Key=report_filename, Body=report_content, ContentType='text/html')
+            with timed(s3_upload_duration_seconds, service='ai', stage='report'):
+                get_s3_client().put_object(Bucket=s3_bucket_name, Key=report_filename, Body=report_content, ContentType='text/html')
+            stage_bytes_total.labels('ai', 'report', 'upload').inc(len(report_content.encode('utf-8')))
             logging.info(f"Report stored in S3: s3://{s3_bucket_name}/{report_filename}")
         except Exception as e:
             logging.error(f"Error storing report in S3: {e}")
@@ -165,8 +231,10 @@ def generate_monthly_report(self):
         logging.info(f"Generated report metadata: {report_metadata}")
 
         # Store metadata in PostgreSQL
+        engine = get_db_engine()
         if engine:
             try:
+                from sqlalchemy import text
                 with engine.connect() as connection:
                     connection.execute(text("INSERT INTO reports (summary, model_hash, prompt_hash, s3_url, timestamp) VALUES (:summary, :model_hash, :prompt_hash, :s3_url, NOW())"), report_metadata)
                     connection.commit()
@@ -175,18 +243,12 @@ def generate_monthly_report(self):
                 logging.error(f"Error storing report metadata in PostgreSQL: {e}")
                 raise self.retry(exc=e)
 
-        # Fetch subscribers and send emails
+        # Stream subscribers and send emails in batches
         if engine:
             try:
-                with engine.connect() as connection:
-                    result = connection.execute(text("SELECT email FROM \"Subscription\" WHERE frequency = 'monthly' AND verified = true"))
-                    subscribers = result.fetchall()
-                logging.info(f"Fetched {len(subscribers)} monthly subscribers.")
-
                 report_url = f"http://your-app-domain.com/reports/{report_filename}" # Replace with actual report URL
-
-                for subscriber in subscribers:
-                    send_report_email.delay(subscriber[0], report_url, summary, "monthly")
+                subscribers = fan_out_report_emails(engine, 'monthly', report_url, summary, 'monthly')
+                logging.info(f"Queued report emails for {subscribers} monthly subscribers.")
 
             except Exception as e:
                 logging.error(f"Error fetching subscribers or sending emails: {e}")
@@ -199,39 +261,85 @@ def generate_monthly_report(self):
         ai_tasks_processed.labels('generate_monthly_report', 'failure').inc()
         raise self.retry(exc=e)
 
+def fan_out_report_emails(engine, frequency: str, report_url: str, report_summary: str, report_type: str) -> int:
+    """Queue one send_report_emails task per EMAIL_BATCH_SIZE verified subscribers; returns the subscriber count.
+
+    Subscribers are streamed with a server-side cursor, so the list is never held in memory whole.
+    """
+    from sqlalchemy import text
+
+    subscribers = 0
+    with timed(stage_duration_seconds, service='ai', stage='email_fanout'):
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=EMAIL_BATCH_SIZE).execute(
+                text("SELECT email FROM \"Subscription\" WHERE frequency = :frequency AND verified = true"),
+                {'frequency': frequency}
+            )
+            for rows in result.partitions(EMAIL_BATCH_SIZE):
+                recipients = [row[0] for row in rows]
+                send_report_emails.delay(recipients, report_url, report_summary, report_type)
+                subscribers += len(recipients)
+    observe_rows('ai', 'email_fanout', subscribers, subscribers)
+    return subscribers
+
+def deliver_report_emails(recipient_emails: List[str], report_url: str, report_summary: str,
+                          report_type: str = "weekly") -> Tuple[List[Delivery], List[str]]:
+    """Render the report email once and send it to every recipient over one transport connection"""
+    deliveries, undelivered = send_batch(recipient_emails, render_report_email(report_url, report_summary, report_type),
+                                         get_transport())
+    log_email_delivery_statuses(deliveries)
+    for recipient in undelivered:
+        log_email_delivery_status(recipient, 'failed', 'Email transport unavailable')
+    failed = len(deliveries) - sum(delivery.status == 'success' for delivery in deliveries) + len(undelivered)
+    emails_total.labels('ai', 'email', 'success').inc(len(recipient_emails) - failed)
+    emails_total.labels('ai', 'email', 'failure').inc(failed)
+    return deliveries, undelivered
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_report_emails(self, recipient_emails: List[str], report_url: str, report_summary: str, report_type: str = "weekly"):
+    deliveries, undelivered = deliver_report_emails(recipient_emails, report_url, report_summary, report_type)
+    if undelivered:
+        # Retry only the recipients that were never sent to, so nobody gets the report twice
+        ai_tasks_processed.labels('send_report_emails', 'failure').inc()
+        raise self.retry(args=(undelivered, report_url, report_summary, report_type))
+    ai_tasks_processed.labels('send_report_emails', 'success').inc()
+    sent = sum(delivery.status == 'success' for delivery in deliveries)
+    return {"message": "Report emails sent", "sent": sent, "failed": len(deliveries) - sent}
+
 @shared_task
 def send_report_email(recipient_email: str, report_url: str, report_summary: str, report_type: str = "weekly"):
-    subject = f"Your {report_type.capitalize()} Real Estate Report is Here!"
-    body = f"<h1>{report_type.capitalize()} Real Estate Report</h1><p>Here's your {report_type} summary: {report_summary}</p><p>View full report: <a href=\"{report_url}\">{report_url}</a></p>"
-    try:
-        # Placeholder for sending email via SES
-        # await sendEmail(recipient_email, subject, body)
-        log_email_delivery_status(recipient_email, 'success', 'Simulated email sent')
-        ai_tasks_processed.labels('send_report_email', 'success').inc()
-        return {"message": "Report email sent successfully"}
-    except Exception as e:
-        log_email_delivery_status(recipient_email, 'failed', str(e))
+    """Single-recipient variant, kept for messages queued before batched delivery"""
+    deliveries, _ = deliver_report_emails([recipient_email], report_url, report_summary, report_type)
+    if not deliveries or deliveries[0].status != 'success':
         ai_tasks_processed.labels('send_report_email', 'failure').inc()
-        raise
+        raise RuntimeError(deliveries[0].details if deliveries else 'Email transport unavailable')
+    ai_tasks_processed.labels('send_report_email', 'success').inc()
+    return {"message": "Report email sent successfully"}
 
 def get_weekly_apartment_data_summary():
     """Fetch and summarize Seoul apartment data for the past week"""
+    return get_weekly_apartment_report_data().text
+
+def get_weekly_apartment_report_data() -> ReportData:
+    """The past week's summary lines, with one line per district kept apart for map-reduce summarization"""
+    engine = get_db_engine()
     if not engine:
-        return "No database connection available. Using mock data: Recent real estate data shows a 5% increase in apartment prices in Gangnam district."
+        return ReportData.message("No database connection available. Using mock data: Recent real estate data shows a 5% increase in apartment prices in Gangnam district.")
+    
+    from sqlalchemy import text
     
     try:
         with engine.connect() as connection:
-            # Fetch transactions from the past 7 days
+            # Past 7 days from the district/day rollup maintained by the ETL store step
             query = """
             SELECT 
                 district_name,
-                COUNT(*) as transaction_count,
-                AVG(transaction_amount_won) as avg_price,
-                AVG(price_per_sqm) as avg_price_per_sqm,
-                AVG(area_sqm) as avg_area
-            FROM apartment_transactions 
-            WHERE transaction_date >= CURRENT_DATE - INTERVAL '7 days'
-            AND data_quality_score >= 80
+                SUM(transaction_count) as transaction_count,
+                SUM(price_sum) * 1.0 / SUM(transaction_count) as avg_price,
+                SUM(price_per_sqm_sum) * 1.0 / SUM(transaction_count) as avg_price_per_sqm,
+                SUM(area_sum) * 1.0 / SUM(transaction_count) as avg_area
+            FROM district_daily_stats 
+            WHERE stat_date >= CURRENT_DATE - INTERVAL '7 days'
             GROUP BY district_name
             ORDER BY transaction_count DESC
             LIMIT 10
@@ -241,12 +349,13 @@ def get_weekly_apartment_data_summary():
             rows = result.fetchall()
             
             if not rows:
-                return "No recent apartment transaction data available in the database."
+                return ReportData.message("No recent apartment transaction data available in the database.")
             
             # Create data summary
             summary_parts = []
             summary_parts.append(f"Weekly Seoul Apartment Market Analysis:")
             summary_parts.append(f"Total districts with transactions: {len(rows)}")
+            districts = {}
             
             for row in rows:
                 district = row[0]
@@ -255,48 +364,53 @@ def get_weekly_apartment_data_summary():
                 avg_price_sqm = int(row[3]) if row[3] else 0
                 avg_area = float(row[4]) if row[4] else 0.0
                 
-                summary_parts.append(
+                districts[district] = (
                     f"- {district}: {count} transactions, "
                     f"avg price {avg_price:,}원 ({avg_price_sqm:,}원/㎡), "
                     f"avg area {avg_area:.1f}㎡"
                 )
             
-            return "\n".join(summary_parts)
+            return ReportData(summary_parts, districts, [])
             
     except Exception as e:
         logging.error(f"Error fetching weekly data summary: {e}")
-        return "Error accessing apartment transaction data. Using fallback: Recent real estate data shows market activity in Seoul districts."
+        return ReportData.message("Error accessing apartment transaction data. Using fallback: Recent real estate data shows market activity in Seoul districts.")
 
 def get_monthly_apartment_data_summary():
     """Fetch and summarize Seoul apartment data for the past month"""
+    return get_monthly_apartment_report_data().text
+
+def get_monthly_apartment_report_data() -> ReportData:
+    """The past month's summary lines, with one line per district kept apart for map-reduce summarization"""
+    engine = get_db_engine()
     if not engine:
-        return "No database connection available. Using mock data: Monthly real estate data shows a 10% increase in apartment prices in Seoul."
+        return ReportData.message("No database connection available. Using mock data: Monthly real estate data shows a 10% increase in apartment prices in Seoul.")
+    
+    from sqlalchemy import text
     
     try:
         with engine.connect() as connection:
-            # Fetch transactions from the past 30 days with comparison to previous month
+            # Past 30 days against the 30 days before, from the district/day rollup
             query = """
             WITH current_month AS (
                 SELECT 
                     district_name,
-                    COUNT(*) as transaction_count,
-                    AVG(transaction_amount_won) as avg_price,
-                    AVG(price_per_sqm) as avg_price_per_sqm
-                FROM apartment_transactions 
-                WHERE transaction_date >= CURRENT_DATE - INTERVAL '30 days'
-                AND data_quality_score >= 80
+                    SUM(transaction_count) as transaction_count,
+                    SUM(price_sum) * 1.0 / SUM(transaction_count) as avg_price,
+                    SUM(price_per_sqm_sum) * 1.0 / SUM(transaction_count) as avg_price_per_sqm
+                FROM district_daily_stats 
+                WHERE stat_date >= CURRENT_DATE - INTERVAL '30 days'
                 GROUP BY district_name
             ),
             previous_month AS (
                 SELECT 
                     district_name,
-                    COUNT(*) as transaction_count,
-                    AVG(transaction_amount_won) as avg_price,
-                    AVG(price_per_sqm) as avg_price_per_sqm
-                FROM apartment_transactions 
-                WHERE transaction_date >= CURRENT_DATE - INTERVAL '60 days'
-                AND transaction_date < CURRENT_DATE - INTERVAL '30 days'
-                AND data_quality_score >= 80
+                    SUM(transaction_count) as transaction_count,
+                    SUM(price_sum) * 1.0 / SUM(transaction_count) as avg_price,
+                    SUM(price_per_sqm_sum) * 1.0 / SUM(transaction_count) as avg_price_per_sqm
+                FROM district_daily_stats 
+                WHERE stat_date >= CURRENT_DATE - INTERVAL '60 days'
+                AND stat_date < CURRENT_DATE - INTERVAL '30 days'
                 GROUP BY district_name
             )
             SELECT 
@@ -320,7 +434,7 @@ def get_monthly_apartment_data_summary():
             rows = result.fetchall()
             
             if not rows:
-                return "No monthly apartment transaction data available in the database."
+                return ReportData.message("No monthly apartment transaction data available in the database.")
             
             # Create monthly summary
             summary_parts = []
@@ -333,6 +447,8 @@ def get_monthly_apartment_data_summary():
             # Analyze price trends
             price_increases = []
             price_decreases = []
+            districts = {}
+            trends = []
             
             for row in rows:
                 district = row[0]
@@ -347,7 +463,7 @@ def get_monthly_apartment_data_summary():
                     elif price_change < 0:
                         price_decreases.append((district, abs(price_change), current_count))
                 
-                summary_parts.append(
+                districts[district] = (
                     f"- {district}: {current_count} transactions, "
                     f"avg {current_price:,}원 ({current_price_sqm:,}원/㎡)"
                     f"{f', {price_change:+.1f}% vs last month' if price_change is not None else ''}"
@@ -356,14 +472,14 @@ def get_monthly_apartment_data_summary():
             # Add trend analysis
             if price_increases:
                 top_increases = sorted(price_increases, key=lambda x: x[1], reverse=True)[:3]
-                summary_parts.append(f"\nTop price increases: {', '.join([f'{d} (+{p:.1f}%)' for d, p, _ in top_increases])}")
+                trends.append(f"\nTop price increases: {', '.join([f'{d} (+{p:.1f}%)' for d, p, _ in top_increases])}")
             
             if price_decreases:
                 top_decreases = sorted(price_decreases, key=lambda x: x[1], reverse=True)[:3]
-                summary_parts.append(f"Notable price decreases: {', '.join([f'{d} (-{p:.1f}%)' for d, p, _ in top_decreases])}")
+                trends.append(f"Notable price decreases: {', '.join([f'{d} (-{p:.1f}%)' for d, p, _ in top_decreases])}")
             
-            return "\n".join(summary_parts)
+            return ReportData(summary_parts, districts, trends)
             
     except Exception as e:
         logging.error(f"Error fetching monthly data summary: {e}")
-        return "Error accessing apartment transaction data. Using fallback: Monthly real estate data shows varied market conditions across Seoul districts."
+        return ReportData.message("Error accessing apartment transaction data. Using fallback: Monthly real estate data shows varied market conditions across Seoul districts.")
@@ -10,27 +10,175 @@ os.environ["AWS_ACCESS_KEY_ID"] = "test"
 os.environ["AWS_SECRET_ACCESS_KEY"] = "test"
 os.environ["AWS_REGION"] = "us-east-1"
 os.environ["OPENAI_API_KEY"] = "test"
+# Every test counts real completions; the LLM cache test installs its own cache
+os.environ["LLM_CACHE_BACKEND"] = "off"
 
-from services.ai.tasks import generate_weekly_report, s3_client
-
-# Mock s3_client directly at the module level
-s3_client.put_object = MagicMock(return_value={})
+from services.ai.tasks import generate_weekly_report
 
 @pytest.fixture(autouse=True)
-def mock_all_clients():
-    with patch('openai.chat.completions.create') as mock_openai_create:
-        mock_openai_create.return_value.choices = [MagicMock(message=MagicMock(content="Mocked summary"))]
-        with patch('services.ai.tasks.engine') as mock_engine:
-            # Configure the mocked engine connection
-            mock_connection = MagicMock()
-            mock_connection.execute.return_value.fetchall.return_value = []
-            mock_connection.commit.return_value = None
-            mock_engine.connect.return_value.__enter__.return_value = mock_connection
-            mock_engine.connect.return_value.__exit__.return_value = None
-            yield
+def mock_all_clients(request):
+    mock_openai = MagicMock()
+    request.node.mock_openai = mock_openai
+    mock_openai.chat.completions.create.return_value.choices = [MagicMock(message=MagicMock(content="Mocked summary"))]
+    mock_engine = MagicMock()
+    with patch('services.ai.tasks.get_openai_client', return_value=mock_openai), \
+            patch('services.ai.tasks.get_s3_client', return_value=MagicMock()), \
+            patch('services.ai.tasks.get_db_engine', return_value=mock_engine):
+        # Configure the mocked engine connection
+        mock_connection = MagicMock()
+        mock_connection.execute.return_value.fetchall.return_value = []
+        mock_connection.commit.return_value = None
+        mock_engine.connect.return_value.__enter__.return_value = mock_connection
+        mock_engine.connect.return_value.__exit__.return_value = None
+        yield
 
 def test_generate_weekly_report_success():
     result = generate_weekly_report()
     assert result["message"] == "Weekly report generation initiated"
     assert "report_metadata" in result
     assert result["report_metadata"]["summary"] == "Mocked summary"
+
+def test_weekly_report_records_llm_and_upload_metrics():
+    from prometheus_client import REGISTRY
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    llm_before = sample('estate_llm_duration_seconds_count', service='ai', stage='summary', model='gpt-4', status='success')
+    upload_before = sample('estate_s3_upload_duration_seconds_count', service='ai', stage='report', status='success')
+    generate_weekly_report()
+    assert sample('estate_llm_duration_seconds_count', service='ai', stage='summary', model='gpt-4', status='success') == llm_before + 1
+    assert sample('estate_s3_upload_duration_seconds_count', service='ai', stage='report', status='success') == upload_before + 1
+
+def test_clients_are_created_lazily_once_per_process():
+    import subprocess
+    import sys
+    from services.ai.clients import PerProcess
+
+    # A fresh interpreter without credentials imports the tasks without touching openai or boto3
+    env = {k: v for k, v in os.environ.items() if not k.startswith(('AWS_', 'OPENAI_'))}
+    code = "import sys, services.ai.tasks; print(sorted({'openai', 'boto3'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.run([sys.executable, "-c", code], env={**env, 'PYTHONPATH': root}, cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+    factory = MagicMock(side_effect=lambda: object())
+    client = PerProcess(factory)
+    assert client() is client()
+    assert factory.call_count == 1
+    with patch('services.ai.clients.os.getpid', return_value=-1):
+        client()
+    assert factory.call_count == 2
+
+@pytest.mark.parametrize("backend", ["disk", "database"])
+def test_summaries_are_served_from_the_llm_cache(backend, tmp_path, request):
+    from services.ai.llm_cache import DatabaseLLMCache, DiskLLMCache
+    from services.ai.tasks import generate_summary_with_gpt4, summary_prompt_key
+    from services.common.db import get_engine
+    from services.etl.migrations import migrate
+
+    create = request.node.mock_openai.chat.completions.create
+    if backend == "disk":
+        cache = DiskLLMCache(str(tmp_path), max_entries=2)
+    else:
+        engine = get_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+        migrate(engine)
+        cache = DatabaseLLMCache(engine, max_entries=2)
+    with patch('services.ai.tasks.get_llm_cache', return_value=cache):
+        assert generate_summary_with_gpt4("week 1") == "Mocked summary"
+        # A retry or rerun with the same data costs no completion
+        assert generate_summary_with_gpt4("week 1") == "Mocked summary"
+        assert create.call_count == 1
+        assert generate_summary_with_gpt4("week 1", bypass_cache=True) == "Mocked summary"
+        assert create.call_count == 2
+
+        # Beyond max_entries the least recently used entry is evicted
+        generate_summary_with_gpt4("week 2")
+        generate_summary_with_gpt4("week 3")
+        assert cache.get(summary_prompt_key("week 1")) is None
+        assert cache.get(summary_prompt_key("week 3")) is not None
+
+        result = generate_weekly_report()
+    key = summary_prompt_key("No recent apartment transaction data available in the database.")
+    assert result["report_metadata"]["model_hash"] == key.model_hash
+    assert result["report_metadata"]["prompt_hash"] == key.prompt_hash
+    assert summary_prompt_key("week 1").prompt_hash == key.prompt_hash
+
+def test_map_reduce_summary_runs_districts_concurrently_and_survives_a_slow_call(tmp_path):
+    from services.ai.benchmarks.fake_llm import FakeLLMServer
+    from services.ai.clients import new_async_openai_client
+    from services.ai.llm_cache import DiskLLMCache
+    from services.ai.summarization import MapReduceSummarizer, Prompt, SummarizationError, chunk_text, estimate_tokens
+
+    # Gangnam's map call hangs past the timeout; every other call takes 0.2s
+    latency = lambda messages: 5 if messages[0]['content'] == "map" and "Gangnam" in messages[-1]['content'] else 0.2
+    districts = {f"District {i}": f"- District {i}: {i} transactions" for i in range(12)}
+    districts["Gangnam"] = "- Gangnam: 40 transactions"
+    with FakeLLMServer(latency=latency) as server, patch.dict(os.environ, {"OPENAI_API_BASE": server.base_url}):
+        summarizer = MapReduceSummarizer(lambda: new_async_openai_client(), "gpt-4", Prompt("map", "{district}\n{data}"),
+                                         Prompt("reduce", "{data}"), cache=DiskLLMCache(str(tmp_path)),
+                                         max_concurrency=4, call_timeout=1)
+        result = summarizer.summarize("Weekly Seoul Apartment Market Analysis:", districts)
+        assert server.max_active <= 4
+        assert result.calls == 14 and result.fallbacks == 1
+        # The slow district falls back to its own data, never to prompt text, instead of failing the report
+        assert result.district_summaries["Gangnam"] == "- Gangnam: 40 transactions"
+        assert result.summary.startswith("Summary of: Weekly Seoul")
+
+        # A rerun pays only for the call that failed last time
+        requests_before = len(server.requests)
+        rerun = summarizer.summarize("Weekly Seoul Apartment Market Analysis:", districts)
+        assert rerun.cache_hits == 13 and len(server.requests) == requests_before + 1
+
+        # A bypassed run pays for every call again, but still refreshes the cache
+        bypass_cache = DiskLLMCache(str(tmp_path / "bypass"))
+        bypassed = MapReduceSummarizer(lambda: new_async_openai_client(), "gpt-4", Prompt("map", "{district}\n{data}"),
+                                       Prompt("reduce", "{data}"), cache=bypass_cache, max_concurrency=4,
+                                       call_timeout=1, bypass=True)
+        assert bypassed.summarize("Weekly Seoul Apartment Market Analysis:", districts).cache_hits == 0
+        bypassed.bypass = False
+        assert bypassed.summarize("Weekly Seoul Apartment Market Analysis:", districts).cache_hits == 13
+
+    # A failed reduce call, or most map calls failing, fails the summary so the report task retries
+    failing_reduce = lambda messages: 500 if messages[0]['content'] == "reduce" else "ok"
+    failing_maps = lambda messages: 500 if "District" in messages[-1]['content'] else "ok"
+    for responder in (failing_reduce, failing_maps):
+        with FakeLLMServer(responder=responder) as server, patch.dict(os.environ, {"OPENAI_API_BASE": server.base_url}):
+            summarizer = MapReduceSummarizer(lambda: new_async_openai_client(), "gpt-4", Prompt("map", "{district}\n{data}"),
+                                             Prompt("reduce", "{data}"))
+            with pytest.raises(SummarizationError):
+                summarizer.summarize("Weekly Seoul Apartment Market Analysis:", districts)
+
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunk_text("\n".join(districts.values()), 10))
+
+def test_report_emails_are_streamed_in_batches_over_one_smtp_connection_each(tmp_path):
+    from sqlalchemy import text
+    from services.ai.benchmarks.smtp_sink import SMTPSink
+    from services.ai.mailer import SMTPTransport
+    from services.ai.tasks import fan_out_report_emails, send_report_emails
+    from services.common.db import get_engine
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'subscribers.db'}")
+    with engine.connect() as connection:
+        connection.execute(text('CREATE TABLE "Subscription" (email TEXT, frequency TEXT, verified BOOLEAN)'))
+        connection.execute(text('INSERT INTO "Subscription" VALUES (:email, :frequency, :verified)'),
+                           [{'email': f"user{i}@example.com", 'frequency': 'weekly', 'verified': True} for i in range(7)] +
+                           [{'email': "unverified@example.com", 'frequency': 'weekly', 'verified': False},
+                            {'email': "monthly@example.com", 'frequency': 'monthly', 'verified': True}])
+        connection.commit()
+
+    results = []
+    with SMTPSink(reject=lambda recipient: recipient == "user4@example.com") as sink, \
+            patch('services.ai.tasks.EMAIL_BATCH_SIZE', 3), \
+            patch('services.ai.tasks.get_transport', side_effect=lambda: SMTPTransport(*sink.address)), \
+            patch.object(send_report_emails, 'delay', side_effect=lambda *args: results.append(send_report_emails(*args))) as delay:
+        assert fan_out_report_emails(engine, 'weekly', "http://reports/1", "Prices rose", 'weekly') == 7
+
+    assert [len(call.args[0]) for call in delay.call_args_list] == [3, 3, 1]
+    # One connection per batch; the rejected recipient fails alone
+    assert sink.connections == 3
+    assert [result["failed"] for result in results] == [0, 1, 0]
+    assert sorted(recipient for message in sink.messages for recipient in message.recipients) == \
+        [f"user{i}@example.com" for i in range(7) if i != 4]
+    assert all(message.message['Subject'] == "Your Weekly Real Estate Report is Here!" for message in sink.messages)
@@ -0,0 +1,71 @@
+"""
+Process-wide SQLAlchemy engine registry shared by the ETL and AI services.
+
+Every task used to build its own engine (and with it a new connection pool) per
+run. get_engine returns one pooled engine per database URL for the whole
+process instead. Pools are reset in forked children (Celery prefork workers) so
+a child never reuses a socket inherited from its parent.
+"""
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '5'))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get('DB_POOL_RECYCLE_SECONDS', '1800'))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+_engines: Dict[str, Engine] = {}
+_lock = threading.Lock()
+
+
+def _engine_options(url: str) -> Dict:
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    # SQLite (tests, local runs) uses its own pool classes, which take no sizing options
+    if make_url(url).get_backend_name() != 'sqlite':
+        options.update({
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_recycle': DB_POOL_RECYCLE_SECONDS
+        })
+    return options
+
+
+def get_engine(url: Optional[str]) -> Engine:
+    """Return the process-wide engine for url, creating it on first use."""
+    if not url:
+        raise ValueError("No database URL configured")
+    engine = _engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = create_engine(url, **_engine_options(url))
+                _engines[url] = engine
+                logging.info(f"Created {engine.dialect.name} engine with pool {type(engine.pool).__name__}")
+    return engine
+
+
+def dispose_engines():
+    """Close every pooled connection and forget the engines (tests, shutdown)."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def _reset_pools_after_fork():
+    global _lock
+    # The parent's lock may have been held mid-fork; the child gets a fresh one
+    _lock = threading.Lock()
+    for engine in _engines.values():
+        # close=False drops the inherited connections without closing the parent's sockets
+        engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
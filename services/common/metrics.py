@@ -0,0 +1,101 @@
+"""
+Prometheus metrics shared by the ETL and AI services.
+
+Every metric carries the same service and stage labels, so one dashboard can
+break pipeline time, rows and bytes down the same way for both services:
+
+    estate_stage_duration_seconds{service, stage, status}
+    estate_stage_rows_total{service, stage, direction}      direction: in | out
+    estate_stage_bytes_total{service, stage, direction}     direction: download | upload
+    estate_dedup_ratio{service, stage}                      duplicates / rows in, last batch
+    estate_db_rows_written_total{service, stage, operation} operation: inserted | updated | unchanged | rejected
+    estate_db_rows_written_per_second{service, stage}       rows / second of the last store
+    estate_fetch_duration_seconds{service, stage, district, status}
+    estate_llm_duration_seconds{service, stage, model, status}
+    estate_llm_tokens_total{service, stage, model, kind}    kind: prompt | completion
+    estate_llm_cache_total{service, stage, result}          result: hit | miss | bypass | error
+    estate_llm_fallbacks_total{service, stage, reason}      reason: timeout | error
+    estate_s3_upload_duration_seconds{service, stage, status}
+    estate_emails_total{service, stage, status}
+"""
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from services.common.profiling import span
+
+# Stage and call latencies range from milliseconds (a cached page) to many minutes (a backfill store)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+CALL_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+stage_duration_seconds = Histogram('estate_stage_duration_seconds', 'Duration of one run of a pipeline stage',
+                                   ['service', 'stage', 'status'], buckets=STAGE_BUCKETS)
+stage_rows_total = Counter('estate_stage_rows_total', 'Rows entering and leaving pipeline stages',
+                           ['service', 'stage', 'direction'])
+stage_bytes_total = Counter('estate_stage_bytes_total', 'Bytes downloaded and uploaded by pipeline stages',
+                            ['service', 'stage', 'direction'])
+dedup_ratio = Gauge('estate_dedup_ratio', 'Share of rows removed as duplicates in the last batch',
+                    ['service', 'stage'])
+db_rows_written_total = Counter('estate_db_rows_written_total', 'Rows handled by database writes, by outcome',
+                                ['service', 'stage', 'operation'])
+db_rows_written_per_second = Gauge('estate_db_rows_written_per_second', 'Write throughput of the last store',
+                                   ['service', 'stage'])
+fetch_duration_seconds = Histogram('estate_fetch_duration_seconds', 'Latency of one upstream API request',
+                                   ['service', 'stage', 'district', 'status'], buckets=CALL_BUCKETS)
+llm_duration_seconds = Histogram('estate_llm_duration_seconds', 'Latency of one LLM completion',
+                                 ['service', 'stage', 'model', 'status'], buckets=CALL_BUCKETS)
+llm_tokens_total = Counter('estate_llm_tokens_total', 'LLM tokens used', ['service', 'stage', 'model', 'kind'])
+llm_cache_total = Counter('estate_llm_cache_total', 'LLM response cache lookups, by result', ['service', 'stage', 'result'])
+llm_fallbacks_total = Counter('estate_llm_fallbacks_total', 'LLM calls replaced by their fallback', ['service', 'stage', 'reason'])
+s3_upload_duration_seconds = Histogram('estate_s3_upload_duration_seconds', 'Latency of one S3 upload',
+                                       ['service', 'stage', 'status'], buckets=CALL_BUCKETS)
+emails_total = Counter('estate_emails_total', 'Report emails sent, by outcome', ['service', 'stage', 'status'])
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """Observe the wrapped block's duration with status success or failure added to labels.
+
+    The block is also a span of a sampled task's profile, named after the label values.
+    """
+    started = time.perf_counter()
+    status = 'success'
+    try:
+        with span(":".join(str(value) for value in labels.values())):
+            yield
+    except Exception:
+        status = 'failure'
+        raise
+    finally:
+        histogram.labels(status=status, **labels).observe(time.perf_counter() - started)
+
+
+def observe_rows(service: str, stage: str, rows_in: int, rows_out: int):
+    stage_rows_total.labels(service, stage, 'in').inc(rows_in)
+    stage_rows_total.labels(service, stage, 'out').inc(rows_out)
+
+
+def observe_dedup(service: str, stage: str, rows_in: int, duplicates: int):
+    observe_rows(service, stage, rows_in, rows_in - duplicates)
+    dedup_ratio.labels(service, stage).set(duplicates / rows_in if rows_in else 0)
+
+
+def observe_db_writes(service: str, stage: str, seconds: float, inserted: int = 0, updated: int = 0,
+                      unchanged: int = 0, rejected: int = 0):
+    for operation, rows in (('inserted', inserted), ('updated', updated), ('unchanged', unchanged), ('rejected', rejected)):
+        db_rows_written_total.labels(service, stage, operation).inc(rows)
+    if seconds > 0:
+        db_rows_written_per_second.labels(service, stage).set((inserted + updated) / seconds)
+
+
+def observe_llm_usage(service: str, stage: str, model: str, usage) -> Optional[int]:
+    """Count the prompt and completion tokens of a completion's usage; returns the total, if reported."""
+    total = None
+    for kind in ('prompt', 'completion'):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            llm_tokens_total.labels(service, stage, model, kind).inc(tokens)
+            total = (total or 0) + tokens
+    return total
@@ -0,0 +1,252 @@
+"""
+Sampled profiling of Celery tasks, shared by the ETL and AI workers.
+
+A task run is sampled with the rate configured for its name. A sampled run can
+capture cProfile stats, the top tracemalloc allocations and the wall-clock spans
+recorded with span() while it runs. They are written as artifacts under
+TASK_PROFILE_DIR/<task name>/<task id>/, and copied to TASK_PROFILE_S3_BUCKET if
+set. Unsampled runs pay for one random() call.
+
+Rates come from TASK_PROFILE_SAMPLE_RATE (default for every task) and
+TASK_PROFILE_RATES ("normalize_seoul_apartment_data=1,generate_weekly_report=0.1",
+by full or short task name). If TASK_PROFILE_CONFIG names a JSON file
+({"default": 0.0, "rates": {...}, "capture": [...]}), it overrides both and is
+re-read when it changes, so sampling of one task type can be turned up on
+demand (e.g. by editing a mounted ConfigMap) without restarting workers.
+
+sentry_options() applies the same per-task approach to Sentry tracing instead
+of tracing and profiling every transaction.
+"""
+import os
+import io
+import json
+import time
+import random
+import marshal
+import cProfile
+import logging
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+CAPTURES = ('cprofile', 'tracemalloc', 'spans')
+CONFIG_CHECK_INTERVAL_SECONDS = 10
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 25
+
+
+def _parse_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def rate_for(task_name: str, rates: Dict[str, float], default: float) -> float:
+    """Rate for a task by full name, then by its short name, then the default."""
+    if task_name in rates:
+        return rates[task_name]
+    return rates.get(task_name.rsplit('.', 1)[-1], default)
+
+
+class ProfilingConfig:
+    """Sampling rates and captures from the environment, overridden by an optional JSON file."""
+
+    def __init__(self):
+        self.default = float(os.environ.get('TASK_PROFILE_SAMPLE_RATE', '0'))
+        self.rates = _parse_rates(os.environ.get('TASK_PROFILE_RATES', ''))
+        self.capture = [c.strip() for c in os.environ.get('TASK_PROFILE_CAPTURE', 'cprofile,spans').split(',') if c.strip()]
+        self.directory = os.environ.get('TASK_PROFILE_DIR', '/tmp/estate-profiles')
+        self.s3_bucket = os.environ.get('TASK_PROFILE_S3_BUCKET')
+        self.path = os.environ.get('TASK_PROFILE_CONFIG')
+        self._env = (self.default, dict(self.rates), list(self.capture))
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def refresh(self):
+        if not self.path or time.monotonic() - self._checked_at < CONFIG_CHECK_INTERVAL_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            with open(self.path, 'r') as f:
+                overrides = json.load(f)
+            default, rates, capture = self._env
+            self.default = float(overrides.get('default', default))
+            self.rates = {**rates, **{name: float(rate) for name, rate in overrides.get('rates', {}).items()}}
+            self.capture = list(overrides.get('capture', capture))
+            self._mtime = mtime
+            logging.info(f"Loaded task profiling config from {self.path}: default {self.default}, rates {self.rates}")
+        except FileNotFoundError:
+            self.default, self.rates, self.capture = self._env[0], dict(self._env[1]), list(self._env[2])
+            self._mtime = None
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Ignoring unreadable task profiling config {self.path}: {e}")
+
+    def sample_rate(self, task_name: str) -> float:
+        self.refresh()
+        return rate_for(task_name, self.rates, self.default)
+
+
+class TaskProfile:
+    """Captures of one sampled task run."""
+
+    def __init__(self, task_name: str, task_id: str, capture: List[str]):
+        self.task_name = task_name
+        self.task_id = task_id
+        self.capture = [c for c in capture if c in CAPTURES]
+        self.spans: List[Dict] = []
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._tracing = False
+
+    def start(self):
+        if 'tracemalloc' in self.capture and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        if 'cprofile' in self.capture:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                self._profiler = None
+
+    def stop(self, state: Optional[str]) -> Dict[str, bytes]:
+        """Stop every capture and return the artifacts as {file name: content}."""
+        duration = time.perf_counter() - self.started
+        artifacts = {}
+        if self._profiler is not None:
+            self._profiler.disable()
+            text = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=text)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            artifacts['cprofile.txt'] = text.getvalue().encode('utf-8')
+            # Same bytes as Stats.dump_stats, loadable with pstats.Stats(path)
+            artifacts['cprofile.pstats'] = marshal.dumps(stats.stats)
+        if self._tracing:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"peak {peak / 2**20:.2f} MB"]
+            lines.extend(str(stat) for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS])
+            artifacts['tracemalloc.txt'] = "\n".join(lines).encode('utf-8')
+        artifacts['profile.json'] = json.dumps({
+            'task_name': self.task_name,
+            'task_id': self.task_id,
+            'state': state,
+            'started_at': self.started_at,
+            'duration_seconds': round(duration, 6),
+            'capture': self.capture,
+            'spans': self.spans if 'spans' in self.capture else []
+        }, indent=2).encode('utf-8')
+        return artifacts
+
+
+_config: Optional[ProfilingConfig] = None
+_active = threading.local()
+
+
+def get_config() -> ProfilingConfig:
+    global _config
+    if _config is None:
+        _config = ProfilingConfig()
+    return _config
+
+
+def _current() -> Optional[TaskProfile]:
+    return getattr(_active, 'profile', None)
+
+
+@contextmanager
+def span(name: str):
+    """Record the wrapped block as a wall-clock span of the sampled task running in this thread."""
+    profile = _current()
+    if profile is None or 'spans' not in profile.capture:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans.append({
+            'name': name,
+            'offset_seconds': round(started - profile.started, 6),
+            'duration_seconds': round(time.perf_counter() - started, 6)
+        })
+
+
+def write_artifacts(profile: TaskProfile, artifacts: Dict[str, bytes], config: ProfilingConfig) -> str:
+    directory = os.path.join(config.directory, profile.task_name, profile.task_id)
+    os.makedirs(directory, exist_ok=True)
+    for name, content in artifacts.items():
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(content)
+    if config.s3_bucket:
+        import boto3
+        s3 = boto3.client('s3')
+        for name, content in artifacts.items():
+            s3.put_object(Bucket=config.s3_bucket, Key=f"task-profiles/{profile.task_name}/{profile.task_id}/{name}", Body=content)
+    return directory
+
+
+def _on_prerun(task_id=None, task=None, **kwargs):
+    if task is None or task_id is None or _current() is not None:
+        return
+    config = get_config()
+    rate = config.sample_rate(task.name)
+    if rate <= 0 or random.random() >= rate:
+        return
+    profile = TaskProfile(task.name, task_id, config.capture)
+    _active.profile = profile
+    profile.start()
+
+
+def _on_postrun(task_id=None, task=None, state=None, **kwargs):
+    profile = _current()
+    if profile is None or profile.task_id != task_id:
+        return
+    _active.profile = None
+    try:
+        directory = write_artifacts(profile, profile.stop(state), get_config())
+        logging.info(f"Wrote profile of {profile.task_name} [{task_id}] to {directory}")
+    except Exception as e:
+        # Profiling is diagnostics only, it must never fail the task
+        logging.warning(f"Failed to write profile of {profile.task_name} [{task_id}]: {e}")
+
+
+def install():
+    """Connect the sampling hooks to Celery's task signals (idempotent)."""
+    from celery.signals import task_prerun, task_postrun
+    task_prerun.connect(_on_prerun, weak=False, dispatch_uid='estate-task-profiling-prerun')
+    task_postrun.connect(_on_postrun, weak=False, dispatch_uid='estate-task-profiling-postrun')
+
+
+def sentry_options() -> Dict:
+    """sentry_sdk.init options sampling traces per task name instead of tracing everything.
+
+    SENTRY_TRACES_SAMPLE_RATE (default 0.01) and SENTRY_TRACES_SAMPLE_RATES
+    ("task=rate,...") pick the trace rate; SENTRY_PROFILES_SAMPLE_RATE (default 0)
+    is the share of traced transactions that are also profiled.
+    """
+    default = float(os.environ.get('SENTRY_TRACES_SAMPLE_RATE', '0.01'))
+    rates = _parse_rates(os.environ.get('SENTRY_TRACES_SAMPLE_RATES', ''))
+
+    def traces_sampler(sampling_context):
+        # Keep the parent's decision for transactions continuing a sampled trace
+        parent_sampled = sampling_context.get('parent_sampled')
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        name = (sampling_context.get('transaction_context') or {}).get('name') or ''
+        return rate_for(name, rates, default)
+
+    return {
+        'traces_sampler': traces_sampler,
+        'profiles_sample_rate': float(os.environ.get('SENTRY_PROFILES_SAMPLE_RATE', '0')),
+    }
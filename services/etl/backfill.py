@@ -0,0 +1,170 @@
+import os
+import json
+import math
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from services.etl.rtms_client import RTMSClient
+from services.etl.rtms_parser import parse_rtms_response
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('RTMS_PAGE_SIZE', '1000'))
+
+
+def month_range(start_ym: str, end_ym: str) -> List[str]:
+    """Return every DEAL_YMD (YYYYMM) from start_ym to end_ym inclusive."""
+    year, month = int(start_ym[:4]), int(start_ym[4:6])
+    end_year, end_month = int(end_ym[:4]), int(end_ym[4:6])
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append(f"{year:04d}{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+def default_checkpoint_path(start_ym: str, end_ym: str) -> str:
+    state_dir = os.environ.get('ETL_STATE_DIR', '/tmp/estate-etl')
+    return os.path.join(state_dir, 'backfill', f"rtms_{start_ym}_{end_ym}.json")
+
+
+class BackfillCheckpoint:
+    """On-disk record of which (district, month, page) units have been loaded.
+
+    The file is rewritten atomically, so an interrupted backfill can always be
+    resumed from the last saved state.
+    """
+
+    def __init__(self, path: str, save_every: int = 50):
+        self.path = path
+        self.save_every = save_every
+        self.total_pages: Dict[str, int] = {}
+        self.done: Dict[str, int] = {}
+        self._unsaved = 0
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            self.total_pages = state.get('total_pages', {})
+            self.done = state.get('done', {})
+
+    @staticmethod
+    def _month_key(district_code: str, deal_ymd: str) -> str:
+        return f"{district_code}:{deal_ymd}"
+
+    def get_total_pages(self, district_code: str, deal_ymd: str) -> Optional[int]:
+        return self.total_pages.get(self._month_key(district_code, deal_ymd))
+
+    def set_total_pages(self, district_code: str, deal_ymd: str, pages: int):
+        self.total_pages[self._month_key(district_code, deal_ymd)] = pages
+
+    def is_done(self, district_code: str, deal_ymd: str, page_no: int) -> bool:
+        return f"{district_code}:{deal_ymd}:{page_no}" in self.done
+
+    def mark_done(self, district_code: str, deal_ymd: str, page_no: int, row_count: int):
+        self.done[f"{district_code}:{deal_ymd}:{page_no}"] = row_count
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'total_pages': self.total_pages, 'done': self.done}, f)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+
+class RTMSPageWalker:
+    """Walks every page of every (district, month) in parallel.
+
+    Page 1 of each (district, month) is requested first; as soon as it reports
+    totalCount the remaining pages of that month are queued ahead of other
+    months, so follow-up pages start while other first pages are still in
+    flight. At most max_in_flight pages are fetched or waiting to be consumed at
+    any time, which keeps memory bounded when the consumer is the bottleneck.
+
+    With mark_on_yield a unit is marked done in the checkpoint once the consumer
+    resumes the generator; consumers that buffer pages pass mark_on_yield=False
+    and mark units themselves after the records are stored.
+    """
+
+    def __init__(self, client: RTMSClient, page_size: int = DEFAULT_PAGE_SIZE,
+                 checkpoint: Optional[BackfillCheckpoint] = None, mark_on_yield: bool = True,
+                 max_in_flight: Optional[int] = None):
+        self.client = client
+        self.page_size = page_size
+        self.checkpoint = checkpoint
+        self.mark_on_yield = mark_on_yield
+        self.max_in_flight = max_in_flight or client.max_workers * 2
+        self.failed_units: List[Tuple[str, str, int]] = []
+
+    def _fetch(self, unit: Tuple[str, str, int]):
+        district_code, deal_ymd, page_no = unit
+        content = self.client.fetch_page(district_code, deal_ymd, page_no, self.page_size)
+        return parse_rtms_response(content, district_code)
+
+    def _initial_units(self, districts: List[str], months: List[str],
+                       skip: Iterable[Tuple[str, str]] = ()) -> List[Tuple[str, str, int]]:
+        skip = set(skip)
+        units = []
+        for district_code in districts:
+            for deal_ymd in months:
+                if (district_code, deal_ymd) in skip:
+                    continue
+                pages = self.checkpoint.get_total_pages(district_code, deal_ymd) if self.checkpoint else None
+                candidates = [1] if pages is None else range(1, pages + 1)
+                for page_no in candidates:
+                    if not (self.checkpoint and self.checkpoint.is_done(district_code, deal_ymd, page_no)):
+                        units.append((district_code, deal_ymd, page_no))
+        return units
+
+    def walk(self, districts: List[str], months: List[str],
+             skip: Iterable[Tuple[str, str]] = ()) -> Iterator[Tuple[str, str, int, List[Dict[str, str]]]]:
+        """Yield (district_code, deal_ymd, page_no, transactions) for every page not yet loaded,
+        leaving out the (district, month) partitions in skip."""
+        self.failed_units = []
+        with ThreadPoolExecutor(max_workers=self.client.max_workers) as executor:
+            pending = deque(self._initial_units(districts, months, skip))
+            queued = set(pending)
+            in_flight = {}
+            
+            def refill():
+                while pending and len(in_flight) < self.max_in_flight:
+                    unit = pending.popleft()
+                    in_flight[executor.submit(self._fetch, unit)] = unit
+            
+            refill()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    district_code, deal_ymd, page_no = unit = in_flight.pop(future)
+                    try:
+                        transactions, total_count = future.result()
+                    except requests.exceptions.RequestException as e:
+                        logging.warning(f"Failed to fetch district {district_code} month {deal_ymd} page {page_no}: {e}")
+                        self.failed_units.append(unit)
+                        continue
+                    
+                    if page_no == 1:
+                        pages = max(1, math.ceil(total_count / self.page_size))
+                        if self.checkpoint:
+                            self.checkpoint.set_total_pages(district_code, deal_ymd, pages)
+                        follow_ups = [(district_code, deal_ymd, next_page) for next_page in range(2, pages + 1)]
+                        for next_unit in reversed(follow_ups):
+                            if next_unit in queued or (self.checkpoint and self.checkpoint.is_done(*next_unit)):
+                                continue
+                            queued.add(next_unit)
+                            pending.appendleft(next_unit)
+                    
+                    yield district_code, deal_ymd, page_no, transactions
+                    
+                    if self.checkpoint and self.mark_on_yield:
+                        self.checkpoint.mark_done(district_code, deal_ymd, page_no, len(transactions))
+                refill()
+        if self.checkpoint:
+            self.checkpoint.save()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: columnar normalization vs normalizing each transaction dict.
+
+Run from the repository root:
+    python -m services.etl.benchmarks.bench_normalize --rows 1000000
+"""
+import argparse
+import gc
+import json
+import logging
+import random
+import time
+
+from services.etl.transforms import normalize_transaction
+from services.etl.columnar import columns_from_records, columns_to_records, normalize_columns
+
+
+def synthetic_transactions(rows, seed=7):
+    """Raw transactions with the value distributions of a Seoul RTMS month."""
+    rng = random.Random(seed)
+    return [{
+        'district_code': '11110',
+        'apartment_name': f"아파트{rng.randint(1, 3000)}",
+        'transaction_amount': f"{rng.randint(20000, 300000):,}",
+        'construction_year': str(rng.randint(1975, 2023)),
+        'transaction_date': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'area_sqm': f"{rng.uniform(20, 200):.2f}",
+        'district_name': '종로구',
+        'dong_name': f"동{rng.randint(1, 30)}",
+        'floor': str(rng.randint(1, 40)),
+        'reg_date': '',
+    } for _ in range(rows)]
+
+
+def _timed(fn, *args):
+    gc.collect()
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def run(rows):
+    transactions = synthetic_transactions(rows)
+    created_at = '2024-01-01T00:00:00'
+
+    row_records, row_seconds = _timed(lambda: [normalize_transaction(t, created_at) for t in transactions])
+    columns, transpose_seconds = _timed(columns_from_records, transactions)
+    (normalized, _), columnar_seconds = _timed(normalize_columns, columns, created_at)
+    columnar_records, to_records_seconds = _timed(columns_to_records, normalized)
+    assert columnar_records == row_records
+
+    end_to_end_seconds = transpose_seconds + columnar_seconds + to_records_seconds
+    return {
+        "rows": rows,
+        "row_seconds": round(row_seconds, 3),
+        "row_rows_per_second": round(rows / row_seconds),
+        "columnar_seconds": round(columnar_seconds, 3),
+        "columnar_rows_per_second": round(rows / columnar_seconds),
+        "columnar_end_to_end_seconds": round(end_to_end_seconds, 3),
+        "speedup": round(row_seconds / columnar_seconds, 1),
+        "speedup_end_to_end": round(row_seconds / end_to_end_seconds, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(json.dumps(run(args.rows)))
@@ -0,0 +1,210 @@
+"""
+Benchmark suite: every ETL stage on a seeded synthetic corpus, batch by batch.
+
+The corpus is cut into batches of whole RTMS pages. Each batch goes through
+parsing, normalize_seoul_apartment_data, deduplicate_seoul_apartment_records and
+the store step (store_and_commit, key index included) in turn. Per stage the
+suite reports rows/sec and p50/p99 batch latency. It also reports the process
+peak RSS, and per-stage peak traced memory with --trace-memory (which slows every
+stage several-fold).
+
+Run from the repository root, against a fresh database (rows stored by an
+earlier run come back as unchanged):
+    python -m services.etl.benchmarks.bench_pipeline --rows 1000 100000 --output bench.json
+    python -m services.etl.benchmarks.bench_pipeline --rows 100000 --database-url postgresql://... \\
+        --baseline bench.json --tolerance 0.15
+
+With --baseline the run is compared to an earlier result file and exits with
+status 1 if any stage's rows/sec dropped by more than the tolerance.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from services.etl.benchmarks.synthetic import SyntheticRTMS
+from services.etl.rtms_parser import parse_rtms_response
+from services.etl.streaming import peak_rss_mb
+
+STAGES = ('parse', 'normalize', 'deduplicate', 'store')
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _StageTimer:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.batches: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.rows: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.peak_traced: Dict[str, int] = {stage: 0 for stage in STAGES}
+
+    def run(self, stage: str, rows: Optional[int], fn, *args):
+        """Time fn(*args) as one batch of stage over rows rows (len of the result if None)."""
+        if self.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = fn(*args)
+        self.batches[stage].append(time.perf_counter() - started)
+        if self.trace_memory:
+            self.peak_traced[stage] = max(self.peak_traced[stage], tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.rows[stage] += len(result) if rows is None else rows
+        return result
+
+    def summary(self) -> Dict:
+        stages = {}
+        for stage in STAGES:
+            timings = self.batches[stage]
+            if not timings:
+                continue
+            seconds = sum(timings)
+            stages[stage] = {
+                'rows': self.rows[stage],
+                'batches': len(timings),
+                'seconds': round(seconds, 3),
+                'rows_per_second': round(self.rows[stage] / seconds) if seconds else None,
+                'batch_p50_ms': round(percentile(timings, 50) * 1000, 2),
+                'batch_p99_ms': round(percentile(timings, 99) * 1000, 2)
+            }
+            if self.trace_memory:
+                stages[stage]['peak_traced_mb'] = round(self.peak_traced[stage] / 2**20, 2)
+        return stages
+
+
+def _batches(corpus: SyntheticRTMS, rows: int, batch_rows: int):
+    """Groups of whole pages holding about batch_rows items."""
+    batch, size = [], 0
+    for district_code, _, _, content in corpus.pages(rows):
+        batch.append((district_code, content))
+        size += content.count(b'<item>')
+        if size >= batch_rows:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def run(rows: int, batch_rows: int = 10000, database_url: Optional[str] = None, seed: int = 42,
+        months: Optional[List[str]] = None, stages=STAGES, trace_memory: bool = False) -> Dict:
+    """Benchmark the given stages on rows synthetic transactions; returns the result for one scale."""
+    # Imported here: the tasks module configures logging and metrics on import
+    from services.etl.tasks import normalize_seoul_apartment_data, deduplicate_seoul_apartment_records
+    from services.etl.key_index import store_and_commit
+    from services.etl.migrations import migrate
+    from services.common.db import get_engine
+    # Per-batch stage logs would dominate the smaller scales
+    logging.getLogger().setLevel(logging.WARNING)
+
+    corpus = SyntheticRTMS(seed=seed, months=months or ["202401", "202402", "202403"],
+                           page_size=min(1000, batch_rows))
+    engine = None
+    if 'store' in stages:
+        engine = get_engine(database_url)
+        migrate(engine)
+
+    timer = _StageTimer(trace_memory)
+    started = time.perf_counter()
+    for pages in _batches(corpus, rows, batch_rows):
+        gc.collect()
+        raw = timer.run('parse', None, lambda: [t for code, content in pages for t in parse_rtms_response(content, code)[0]])
+        if 'normalize' not in stages:
+            continue
+        normalized = timer.run('normalize', len(raw), normalize_seoul_apartment_data, {'data': raw})
+        if 'deduplicate' not in stages:
+            continue
+        deduplicated = timer.run('deduplicate', normalized['count'], deduplicate_seoul_apartment_records, normalized)
+        if 'store' not in stages:
+            continue
+        timer.run('store', deduplicated['unique_count'], store_and_commit, engine, deduplicated['deduplicated_data'])
+
+    return {
+        'rows': rows,
+        'batch_rows': batch_rows,
+        'total_seconds': round(time.perf_counter() - started, 3),
+        'stages': timer.summary(),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def compare(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Stages whose rows/sec fell by more than tolerance against the baseline run at the same scale."""
+    regressions = []
+    baseline_runs = {run['rows']: run for run in baseline.get('runs', [])}
+    for run in result['runs']:
+        previous = baseline_runs.get(run['rows'])
+        if previous is None:
+            continue
+        for stage, stats in run['stages'].items():
+            before = previous['stages'].get(stage, {}).get('rows_per_second')
+            after = stats.get('rows_per_second')
+            if before and after is not None and after < before * (1 - tolerance):
+                regressions.append(f"{stage} at {run['rows']} rows: {before} -> {after} rows/s "
+                                   f"({(after / before - 1) * 100:.1f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--batch-rows", type=int, default=10000)
+    parser.add_argument("--database-url", help="defaults to a new SQLite file per scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON of an earlier commit to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='etl-bench-') as work_dir:
+        # A fresh key index and blob directory, so no state of an earlier run is reused
+        os.environ.setdefault('ETL_STATE_DIR', work_dir)
+        runs = []
+        for rows in args.rows:
+            database_url = args.database_url or f"sqlite:///{os.path.join(work_dir, f'bench-{rows}.db')}"
+            runs.append(run(rows, args.batch_rows, database_url, args.seed, stages=args.stages,
+                            trace_memory=args.trace_memory))
+            print(json.dumps(runs[-1], ensure_ascii=False))
+
+    result = {
+        'benchmark': 'etl_pipeline',
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'runs': runs
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Micro-benchmark: streaming RTMS parser vs the original ET.fromstring/find parser.
+
+Run from the repository root:
+    python -m services.etl.benchmarks.bench_rtms_parser --rows 1000 100000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from services.etl.rtms_parser import iter_rtms_items
+
+
+def legacy_parse(content, district_code):
+    """The original fetch_seoul_apartment_data parser, kept for comparison."""
+    root = ET.fromstring(content)
+    transactions = []
+    for item in root.findall('.//item'):
+        transactions.append({
+            'district_code': district_code,
+            'apartment_name': item.find('아파트').text if item.find('아파트') is not None else '',
+            'transaction_amount': item.find('거래금액').text if item.find('거래금액') is not None else '',
+            'construction_year': item.find('건축년도').text if item.find('건축년도') is not None else '',
+            'transaction_date': f"{item.find('년').text}-{item.find('월').text.zfill(2)}-{item.find('일').text.zfill(2)}"
+                              if all(item.find(x) is not None for x in ['년', '월', '일']) else '',
+            'area_sqm': item.find('전용면적').text if item.find('전용면적') is not None else '',
+            'district_name': item.find('시군구').text if item.find('시군구') is not None else '',
+            'dong_name': item.find('법정동').text if item.find('법정동') is not None else '',
+            'floor': item.find('층').text if item.find('층') is not None else '',
+            'reg_date': item.find('등기날짜').text if item.find('등기날짜') is not None else ''
+        })
+    return transactions
+
+
+def synthetic_rtms_response(rows, seed=42):
+    """Build an RTMS-shaped XML body with the given number of <item> rows."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(rows):
+        items.append(
+            "<item>"
+            f"<거래금액>{rng.randint(20000, 300000):,}</거래금액>"
+            f"<건축년도>{rng.randint(1975, 2023)}</건축년도>"
+            "<년>2024</년>"
+            f"<법정동>동{rng.randint(1, 30)}</법정동>"
+            f"<아파트>아파트{rng.randint(1, 500)}</아파트>"
+            f"<월>{rng.randint(1, 12)}</월>"
+            f"<일>{rng.randint(1, 28)}</일>"
+            f"<전용면적>{rng.uniform(20, 200):.2f}</전용면적>"
+            "<지번>123-4</지번>"
+            "<지역코드>11110</지역코드>"
+            f"<층>{rng.randint(1, 40)}</층>"
+            "<시군구>종로구</시군구>"
+            "<등기날짜>24.03.15</등기날짜>"
+            "</item>"
+        )
+    return (
+        "<?xml version=\"1.0\" encoding=\"UTF-8\"?><response><header><resultCode>00</resultCode>"
+        "<resultMsg>NORMAL SERVICE.</resultMsg></header><body><items>"
+        + "".join(items)
+        + f"</items><numOfRows>{rows}</numOfRows><pageNo>1</pageNo><totalCount>{rows}</totalCount></body></response>"
+    ).encode('utf-8')
+
+
+def _measure(consume, content, repeat=3):
+    # Timing and memory are taken in separate passes, tracemalloc slows parsing several-fold
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        rows = consume(content)
+        timings.append(time.perf_counter() - started)
+    elapsed = min(timings)
+
+    gc.collect()
+    tracemalloc.start()
+    consume(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rows": rows, "seconds": round(elapsed, 4), "rows_per_sec": round(rows / elapsed), "peak_mb": round(peak / 2**20, 2)}
+
+
+def run(row_counts):
+    results = []
+    for rows in row_counts:
+        content = synthetic_rtms_response(rows)
+        assert legacy_parse(content, "11110") == list(iter_rtms_items(content, "11110"))
+        results.append({
+            "rows": rows,
+            "legacy": _measure(lambda c: len(legacy_parse(c, "11110")), content),
+            "streaming": _measure(lambda c: sum(1 for _ in iter_rtms_items(c, "11110")), content),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    args = parser.parse_args()
+    for result in run(args.rows):
+        print(json.dumps(result, ensure_ascii=False))
@@ -0,0 +1,124 @@
+"""
+Seeded generator of realistic RTMS responses for benchmarks and offline runs.
+
+Rows are spread over the 25 Seoul districts and the requested months and cut
+into pages like the real API returns them. Each district has its own pool of
+complexes and dongs, areas cluster around the common unit sizes, and prices
+follow area and district, so the value distributions (and with them factorizing,
+deduplication and index behaviour) resemble a real month. A small share of rows
+are reported twice, as RTMS does when a deal is re-registered.
+
+The same seed always produces the same bytes, so a generated corpus can also be
+written into a response cache and replayed through the whole pipeline.
+"""
+import math
+import random
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
+
+from services.etl.rtms_client import RTMS_BASE_URL, SEOUL_DISTRICTS
+from services.etl.rtms_parser import parse_rtms_response
+from services.etl.columnar import iter_normalized_records
+
+DISTRICT_NAMES = [
+    "종로구", "중구", "용산구", "성동구", "광진구", "동대문구", "중랑구", "성북구",
+    "강북구", "도봉구", "노원구", "은평구", "서대문구", "마포구", "양천구", "강서구",
+    "구로구", "금천구", "영등포구", "동작구", "관악구", "서초구", "강남구", "송파구", "강동구"
+]
+# Exclusive areas (m²) of the common unit types and how often they trade
+UNIT_AREAS = [(39.6, 0.08), (49.9, 0.1), (59.9, 0.3), (74.9, 0.12), (84.9, 0.3), (114.8, 0.07), (134.9, 0.03)]
+COMPLEXES_PER_DISTRICT = 400
+DONGS_PER_DISTRICT = 15
+
+Page = Tuple[str, str, int, bytes]
+
+
+class SyntheticRTMS:
+    """Deterministic RTMS corpus for a seed; see the module docstring."""
+
+    def __init__(self, seed: int = 42, months: Optional[List[str]] = None, page_size: int = 1000,
+                 duplicate_rate: float = 0.02):
+        self.seed = seed
+        self.months = months or ["202401"]
+        self.page_size = page_size
+        self.duplicate_rate = duplicate_rate
+        rng = random.Random(seed)
+        # Price level per district, in 만원 per m²
+        self.price_levels = {code: rng.uniform(700, 2500) for code in SEOUL_DISTRICTS}
+        self._areas = [area for area, _ in UNIT_AREAS]
+        self._weights = [weight for _, weight in UNIT_AREAS]
+
+    def _item(self, rng: random.Random, district_index: int, deal_ymd: str) -> str:
+        district_code = SEOUL_DISTRICTS[district_index]
+        complex_no = int(rng.paretovariate(1.2)) % COMPLEXES_PER_DISTRICT
+        area = rng.choices(self._areas, self._weights)[0] + rng.choice((0.0, 0.01, 0.03, 0.07))
+        construction_year = 1978 + (complex_no * 7919) % 46
+        amount = round(area * self.price_levels[district_code] * rng.lognormvariate(0, 0.15) / 10) * 10
+        registered = rng.random() < 0.6
+        return (
+            "<item>"
+            f"<거래금액>{amount:>10,}</거래금액>"
+            f"<건축년도>{construction_year}</건축년도>"
+            f"<년>{deal_ymd[:4]}</년>"
+            f"<법정동> {DISTRICT_NAMES[district_index][:-1]}{complex_no % DONGS_PER_DISTRICT + 1}동</법정동>"
+            f"<아파트>{DISTRICT_NAMES[district_index][:-1]}단지{complex_no}</아파트>"
+            f"<월>{int(deal_ymd[4:])}</월>"
+            f"<일>{rng.randint(1, 28)}</일>"
+            f"<전용면적>{area:.2f}</전용면적>"
+            f"<지번>{rng.randint(1, 999)}-{rng.randint(1, 30)}</지번>"
+            f"<지역코드>{district_code}</지역코드>"
+            f"<층>{int(rng.triangular(1, 35, 8))}</층>"
+            f"<시군구>{DISTRICT_NAMES[district_index]}</시군구>"
+            f"<등기날짜>{f'{deal_ymd[2:4]}.{int(deal_ymd[4:]) % 12 + 1:02d}.{rng.randint(1, 28):02d}' if registered else ' '}</등기날짜>"
+            "</item>"
+        )
+
+    def pages(self, rows: int) -> Iterator[Page]:
+        """Yield (district_code, deal_ymd, page_no, xml) covering rows items in total, page by page."""
+        partitions = [(d, m) for m in self.months for d in range(len(SEOUL_DISTRICTS))]
+        per_partition = math.ceil(rows / len(partitions))
+        remaining = rows
+        for district_index, deal_ymd in partitions:
+            count = min(per_partition, remaining)
+            if count <= 0:
+                break
+            remaining -= count
+            rng = random.Random(f"{self.seed}:{district_index}:{deal_ymd}")
+            page_count = max(1, math.ceil(count / self.page_size))
+            # Duplicates repeat one of the partition's recent items
+            recent = deque(maxlen=200)
+            for page_no in range(1, page_count + 1):
+                page_items = []
+                for _ in range(min(self.page_size, count - (page_no - 1) * self.page_size)):
+                    if recent and rng.random() < self.duplicate_rate:
+                        page_items.append(rng.choice(recent))
+                    else:
+                        page_items.append(self._item(rng, district_index, deal_ymd))
+                        recent.append(page_items[-1])
+                yield SEOUL_DISTRICTS[district_index], deal_ymd, page_no, self._response(page_items, page_no, count)
+
+    def _response(self, items: List[str], page_no: int, total_count: int) -> bytes:
+        return (
+            "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?><response><header><resultCode>000</resultCode>"
+            "<resultMsg>OK</resultMsg></header><body><items>"
+            + "".join(items)
+            + f"</items><numOfRows>{self.page_size}</numOfRows><pageNo>{page_no}</pageNo>"
+            f"<totalCount>{total_count}</totalCount></body></response>"
+        ).encode('utf-8')
+
+    def raw_records(self, rows: int) -> Iterator[dict]:
+        """The raw transaction dicts of pages(rows), as the fetch stage produces them."""
+        for district_code, _, _, content in self.pages(rows):
+            yield from parse_rtms_response(content, district_code)[0]
+
+    def normalized_records(self, rows: int) -> Iterator[dict]:
+        """raw_records(rows) after normalization."""
+        return iter_normalized_records(self.raw_records(rows))
+
+    def record(self, rows: int, cache) -> int:
+        """Write pages(rows) into a ResponseCache so the pipeline can replay them; returns the page count."""
+        recorded = 0
+        for district_code, deal_ymd, page_no, content in self.pages(rows):
+            cache.put(RTMS_BASE_URL, district_code, deal_ymd, page_no, self.page_size, content)
+            recorded += 1
+        return recorded
@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Blob layout: zlib stream of newline-delimited JSON. The first line is a header
+# naming the record fields, every following line is one record as a JSON array
+# in that field order (or a JSON object if its keys differ from the header).
+BLOB_FORMAT = 'rows-jsonl+zlib'
+READ_CHUNK_SIZE = 1 << 16
+
+
+class BlobWriter:
+    """Streams records into a temporary file, hashing the compressed bytes as they are written."""
+
+    def __init__(self, store: 'BlobStore'):
+        self.store = store
+        self.count = 0
+        self.size = 0
+        self._fields: Optional[List[str]] = None
+        self._digest = hashlib.sha256()
+        self._compressor = zlib.compressobj(6)
+        fd, self._tmp_path = tempfile.mkstemp(prefix='blob-', suffix='.tmp', dir=store.tmp_dir)
+        self._file = os.fdopen(fd, 'wb')
+
+    def _emit(self, obj):
+        line = json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+        self._write_compressed(self._compressor.compress(line))
+
+    def _write_compressed(self, chunk: bytes):
+        if chunk:
+            self._digest.update(chunk)
+            self._file.write(chunk)
+            self.size += len(chunk)
+
+    def write(self, record: Dict):
+        if self._fields is None:
+            self._fields = list(record.keys())
+            self._emit({'format': BLOB_FORMAT, 'fields': self._fields})
+        if len(record) == len(self._fields) and all(field in record for field in self._fields):
+            self._emit([record[field] for field in self._fields])
+        else:
+            self._emit(record)
+        self.count += 1
+
+    def write_many(self, records: Iterable[Dict]):
+        for record in records:
+            self.write(record)
+
+    def close(self) -> Dict:
+        """Finalize the blob and return its claim-check reference."""
+        if self._fields is None:
+            self._emit({'format': BLOB_FORMAT, 'fields': []})
+        self._write_compressed(self._compressor.flush())
+        self._file.close()
+        digest = self._digest.hexdigest()
+        try:
+            self.store._commit(self._tmp_path, digest)
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+        return {'blob': f"sha256:{digest}", 'format': BLOB_FORMAT, 'count': self.count, 'bytes': self.size}
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+class BlobStore:
+    """Content-addressed store for inter-stage ETL payloads (the claim-check pattern)."""
+
+    def __init__(self, tmp_dir: Optional[str] = None):
+        self.tmp_dir = tmp_dir
+        if tmp_dir:
+            os.makedirs(tmp_dir, exist_ok=True)
+
+    def open_writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put_records(self, records: Iterable[Dict]) -> Dict:
+        with self.open_writer() as writer:
+            writer.write_many(records)
+            return writer.close()
+
+    def iter_records(self, ref: Dict) -> Iterator[Dict]:
+        """Stream records back out of a blob without materializing it."""
+        digest = ref['blob'].split(':', 1)[1]
+        decompressor = zlib.decompressobj()
+        fields = None
+        pending = b''
+        stream = self._open_read(digest)
+        try:
+            while True:
+                chunk = stream.read(READ_CHUNK_SIZE)
+                data = decompressor.decompress(chunk) if chunk else decompressor.flush()
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    value = json.loads(line)
+                    if fields is None:
+                        fields = value['fields']
+                    elif isinstance(value, list):
+                        yield dict(zip(fields, value))
+                    else:
+                        yield value
+                if not chunk:
+                    break
+        finally:
+            stream.close()
+
+    def _commit(self, tmp_path: str, digest: str):
+        raise NotImplementedError
+
+    def _open_read(self, digest: str):
+        raise NotImplementedError
+
+    def sweep(self, max_age_seconds: float) -> int:
+        """Delete blobs older than max_age_seconds, returning how many were removed."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = root
+        super().__init__(tmp_dir=os.path.join(root, 'tmp'))
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.blob")
+
+    def _commit(self, tmp_path: str, digest: str):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            # Same content already stored; refresh its age for the sweeper
+            os.utime(path)
+        else:
+            os.replace(tmp_path, path)
+
+    def _open_read(self, digest: str):
+        return open(self._path(digest), 'rb')
+
+    def sweep(self, max_age_seconds: float) -> int:
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(('.blob', '.tmp')):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+
+class S3BlobStore(BlobStore):
+    """Blob store on S3 or any S3-compatible service (MinIO, Ceph) via endpoint_url."""
+
+    def __init__(self, bucket: str, prefix: str = 'etl-blobs/', endpoint_url: Optional[str] = None, client=None):
+        import boto3
+        super().__init__(tmp_dir=None)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client or boto3.client('s3', endpoint_url=endpoint_url, region_name=os.environ.get('AWS_REGION'))
+
+    def _key(self, digest: str) -> str:
+        return f"{self.prefix}{digest[:2]}/{digest}.blob"
+
+    def _commit(self, tmp_path: str, digest: str):
+        self.client.upload_file(tmp_path, self.bucket, self._key(digest))
+
+    def _open_read(self, digest: str):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(digest))['Body']
+
+    def sweep(self, max_age_seconds: float) -> int:
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            expired = [{'Key': obj['Key']} for obj in page.get('Contents', []) if obj['LastModified'].timestamp() < cutoff]
+            if expired:
+                self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': expired})
+                removed += len(expired)
+        return removed
+
+
+_blob_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Process-wide blob store configured from ETL_BLOB_* environment variables.
+
+    Every worker that may run a stage of the same run must see the same blobs: a
+    fetch on one pod hands its claim check to a normalize on another. Deployments
+    with more than one worker pod set ETL_BLOB_BACKEND=s3 and ETL_BLOB_S3_BUCKET
+    (see k8s/etl-deployment.yaml), or point ETL_BLOB_DIR at a volume every pod mounts.
+    The local default under ETL_STATE_DIR only suits a single host.
+    """
+    global _blob_store
+    if _blob_store is None:
+        if os.environ.get('ETL_BLOB_BACKEND', 'local') == 's3':
+            _blob_store = S3BlobStore(
+                bucket=os.environ['ETL_BLOB_S3_BUCKET'],
+                prefix=os.environ.get('ETL_BLOB_S3_PREFIX', 'etl-blobs/'),
+                endpoint_url=os.environ.get('ETL_BLOB_S3_ENDPOINT_URL'),
+            )
+        else:
+            state_dir = os.environ.get('ETL_STATE_DIR', '/tmp/estate-etl')
+            _blob_store = LocalBlobStore(os.environ.get('ETL_BLOB_DIR', os.path.join(state_dir, 'blobs')))
+            if os.environ.get('NODE_ENV') == 'production' and 'ETL_BLOB_DIR' not in os.environ:
+                logging.warning("ETL stage payloads are stored on this host only; set ETL_BLOB_BACKEND=s3 "
+                                "or a shared ETL_BLOB_DIR when workers run on more than one pod")
+        logging.info(f"Using {type(_blob_store).__name__} for ETL stage payloads")
+    return _blob_store
+
+
+def iter_payload_records(payload: Dict, key: str) -> Iterator[Dict]:
+    """Records of a stage payload, whether passed inline under key or as a claim check under key_ref."""
+    ref = payload.get(f"{key}_ref")
+    if ref:
+        return get_blob_store().iter_records(ref)
+    return iter(payload.get(key, []))
+
+
+def payload_count(payload: Dict, key: str) -> int:
+    ref = payload.get(f"{key}_ref")
+    if ref:
+        return ref['count']
+    return len(payload.get(key, []))
+
+
+class StageOutput:
+    """Collects a stage's output records, as a blob if the stage input came as one, inline otherwise."""
+
+    def __init__(self, as_blob: bool):
+        self.as_blob = as_blob
+        self.count = 0
+        self._records: List[Dict] = []
+        self._writer = get_blob_store().open_writer() if as_blob else None
+
+    @classmethod
+    def like(cls, payload: Dict, key: str) -> 'StageOutput':
+        return cls(as_blob=bool(payload.get(f"{key}_ref")))
+
+    def append(self, record: Dict):
+        self.count += 1
+        if self._writer is not None:
+            self._writer.write(record)
+        else:
+            self._records.append(record)
+
+    def extend(self, records: Iterable[Dict]):
+        for record in records:
+            self.append(record)
+
+    def finish(self, key: str) -> Dict:
+        """Return {key: records} or {key_ref: claim check} for the stage result."""
+        if self._writer is not None:
+            return {f"{key}_ref": self._writer.close()}
+        return {key: self._records}
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
@@ -0,0 +1,171 @@
+"""
+Streaming and partitioned checksums for pipeline audit records.
+
+streaming_checksum hashes records one at a time, so a dataset of any size is
+checksummed without being serialized in one piece. PartitionDigests builds one
+digest per (district, month) partition from the content fingerprints of the
+stored rows, and a Merkle root over them. The leaves are persisted per run, so a
+single partition can later be verified against the table (or re-synced when it
+no longer matches) without re-hashing everything else.
+"""
+import json
+import hashlib
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy import text
+
+from services.etl.storage import STORE_COLUMNS
+from services.etl.transforms import content_fingerprint
+
+PartitionKey = Tuple[str, str]
+
+
+def streaming_checksum(records: Iterable[Dict]) -> str:
+    """SHA-256 over the canonical JSON of each record, fed to the hash incrementally."""
+    digest = hashlib.sha256()
+    for record in records:
+        digest.update(json.dumps(record, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def partition_of(transaction: Dict) -> PartitionKey:
+    """(district_code, YYYYMM of transaction_date); rows without a date share the '' month."""
+    transaction_date = transaction.get('transaction_date') or ''
+    return str(transaction.get('district_code') or ''), str(transaction_date)[:7].replace('-', '')
+
+
+def partition_digest(fingerprints: Dict[str, str]) -> str:
+    """Digest of one partition from its unique_key -> content fingerprint map, independent of row order."""
+    digest = hashlib.sha256()
+    for unique_key in sorted(fingerprints):
+        digest.update(f"{unique_key}\t{fingerprints[unique_key]}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def merkle_root(leaves: Dict[PartitionKey, Tuple[int, str]]) -> Optional[str]:
+    """Merkle root over (row_count, digest) leaves in partition order; None for no partitions."""
+    level = [
+        hashlib.sha256(b'\x00' + f"{district_code}:{deal_ymd}:{row_count}:{digest}".encode('utf-8')).digest()
+        for (district_code, deal_ymd), (row_count, digest) in sorted(leaves.items())
+    ]
+    if not level:
+        return None
+    while len(level) > 1:
+        next_level = []
+        for i in range(0, len(level), 2):
+            if i + 1 < len(level):
+                next_level.append(hashlib.sha256(b'\x01' + level[i] + level[i + 1]).digest())
+            else:
+                # An odd node is promoted unchanged
+                next_level.append(level[i])
+        level = next_level
+    return level[0].hex()
+
+
+class PartitionDigests:
+    """Collects the content fingerprints of records flowing through a stage, per partition."""
+
+    def __init__(self):
+        self._partitions: Dict[PartitionKey, Dict[str, str]] = {}
+
+    def observe(self, transactions: Iterable[Dict]) -> Iterator[Dict]:
+        """Pass records through unchanged apart from caching their content_fingerprint."""
+        for transaction in transactions:
+            fingerprint = transaction.get('content_fingerprint') or content_fingerprint(transaction)
+            transaction['content_fingerprint'] = fingerprint
+            self._partitions.setdefault(partition_of(transaction), {})[str(transaction.get('unique_key'))] = fingerprint
+            yield transaction
+
+    def leaves(self) -> Dict[PartitionKey, Tuple[int, str]]:
+        return {key: (len(fingerprints), partition_digest(fingerprints)) for key, fingerprints in self._partitions.items()}
+
+    def summary(self) -> Dict:
+        """Digests only, for the stage result and the audit record."""
+        return leaves_summary(self.leaves())
+
+
+def leaves_summary(leaves: Dict[PartitionKey, Tuple[int, str]]) -> Dict:
+    return {
+        'merkle_root': merkle_root(leaves),
+        'partitions': {f"{d}:{m}": {'row_count': count, 'digest': digest} for (d, m), (count, digest) in sorted(leaves.items())}
+    }
+
+
+class PartitionDigestStore:
+    """Per-run partition digests and Merkle roots, persisted in etl_partition_digests."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def save(self, run_id: str, digests: PartitionDigests) -> Dict:
+        self._insert(run_id, digests.leaves())
+        return digests.summary()
+
+    def save_table_digests(self, run_id: str, partitions: Iterable[PartitionKey]) -> Dict:
+        """Persist digests of whole partitions recomputed from the table, for loads that store a partition
+        in several pieces (a backfill stores page by page)."""
+        leaves = {partition: self.table_digest(*partition) for partition in partitions}
+        self._insert(run_id, leaves)
+        return leaves_summary(leaves)
+
+    def _insert(self, run_id: str, leaves: Dict[PartitionKey, Tuple[int, str]]):
+        root = merkle_root(leaves)
+        if leaves:
+            with self.engine.connect() as connection:
+                connection.execute(text("""
+                INSERT INTO etl_partition_digests (run_id, district_code, deal_ymd, row_count, digest, merkle_root)
+                VALUES (:run_id, :district_code, :deal_ymd, :row_count, :digest, :merkle_root)
+                """), [{
+                    'run_id': run_id,
+                    'district_code': district_code,
+                    'deal_ymd': deal_ymd,
+                    'row_count': row_count,
+                    'digest': digest,
+                    'merkle_root': root
+                } for (district_code, deal_ymd), (row_count, digest) in leaves.items()])
+                connection.commit()
+
+    def run_leaves(self, run_id: str) -> Dict[PartitionKey, Tuple[int, str]]:
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("""
+            SELECT district_code, deal_ymd, row_count, digest FROM etl_partition_digests WHERE run_id = :run_id
+            """), {'run_id': run_id}).fetchall()
+        return {(district_code, deal_ymd): (row_count, digest) for district_code, deal_ymd, row_count, digest in rows}
+
+    def latest(self, district_code: str, deal_ymd: str) -> Optional[Tuple[int, str]]:
+        with self.engine.connect() as connection:
+            row = connection.execute(text("""
+            SELECT row_count, digest FROM etl_partition_digests
+            WHERE district_code = :district_code AND deal_ymd = :deal_ymd
+            ORDER BY created_at DESC LIMIT 1
+            """), {'district_code': district_code, 'deal_ymd': deal_ymd}).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def table_digest(self, district_code: str, deal_ymd: str) -> Tuple[int, str]:
+        """Recompute one partition's (row_count, digest) from apartment_transactions."""
+        if deal_ymd:
+            date_filter = "transaction_date >= :start AND transaction_date < :end"
+            year, month = int(deal_ymd[:4]), int(deal_ymd[4:])
+            params = {
+                'start': f"{year:04d}-{month:02d}-01",
+                'end': f"{year + month // 12:04d}-{month % 12 + 1:02d}-01"
+            }
+        else:
+            date_filter = "transaction_date IS NULL"
+            params = {}
+        columns = STORE_COLUMNS + ('content_fingerprint',)
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(
+                f"SELECT {', '.join(columns)} FROM apartment_transactions WHERE district_code = :district_code AND {date_filter}"
+            ), {'district_code': district_code, **params}).fetchall()
+        fingerprints = {}
+        for row in rows:
+            record = dict(zip(columns, row))
+            fingerprints[record['unique_key']] = record['content_fingerprint'] or content_fingerprint(record)
+        return len(fingerprints), partition_digest(fingerprints)
+
+    def verify_partition(self, district_code: str, deal_ymd: str) -> bool:
+        """Whether the table still matches the last digest persisted for the partition."""
+        expected = self.latest(district_code, deal_ymd)
+        return expected is not None and self.table_digest(district_code, deal_ymd) == expected
@@ -0,0 +1,266 @@
+"""
+Persistent index of what apartment_transactions already holds, used to drop
+unchanged rows before the store step writes anything.
+
+For every stored row the index keeps a 64-bit hash of its unique_key and a
+32-bit hash of its stored content, as two numpy arrays sorted by key hash: 12
+bytes per row, about 240 MB at 20 million rows. A Bloom filter would be smaller
+but its false positives would silently drop new rows; here a row is skipped only
+if its key hash is present and its content hash matches, and a changed row
+always replaces its old entry.
+
+The index is only trusted up to the store generation it was built at. Stores
+stamp the rows they write with a generation from a locked counter row (see
+storage.next_store_generation), so before filtering, the index reads back just
+the rows written since its generation, or rebuilds itself from the table if it
+is missing, from another database or ahead of it. Deleted rows leave no newer
+generation behind, so at most every ETL_KEY_INDEX_VERIFY_INTERVAL_SECONDS the
+index also compares its size with the table's row count and rebuilds when they
+differ (a 64-bit key hash collision, about 1 in 10^5 at 20 million rows, would
+only cost a rebuild per interval). Input is filtered in chunks of
+ETL_STORE_BATCH_SIZE rows, and each row's content fingerprint is computed once
+and handed on to the store.
+"""
+import io
+import os
+import time
+import hashlib
+import logging
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from services.etl.response_cache import write_atomic
+from services.etl.storage import STORE_BATCH_SIZE, STORE_COLUMNS, next_store_generation, store_transactions
+from services.etl.transforms import content_fingerprint
+from services.common.metrics import observe_db_writes
+
+KEY_INDEX_ENABLED = os.environ.get('ETL_KEY_INDEX', 'true').lower() == 'true'
+KEY_INDEX_SAVE_INTERVAL_SECONDS = float(os.environ.get('ETL_KEY_INDEX_SAVE_INTERVAL_SECONDS', '60'))
+KEY_INDEX_VERIFY_INTERVAL_SECONDS = float(os.environ.get('ETL_KEY_INDEX_VERIFY_INTERVAL_SECONDS', '300'))
+REBUILD_CHUNK_ROWS = 50000
+
+
+def key_hash(unique_key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(unique_key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def content_hash(record: Dict) -> int:
+    """32 bits of the record's content fingerprint, read from the table when it has one."""
+    return int((record.get('content_fingerprint') or content_fingerprint(record))[:8], 16)
+
+
+def _hash_records(records: Iterable[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    keys, contents = [], []
+    for record in records:
+        keys.append(key_hash(str(record['unique_key'])))
+        contents.append(content_hash(record))
+    return np.array(keys, dtype=np.uint64), np.array(contents, dtype=np.uint32)
+
+
+class StoredKeyIndex:
+    """Sorted (key hash -> content hash) index of the stored rows, persisted as one .npz file."""
+
+    def __init__(self, path: str, database: str):
+        self.path = path
+        self.database = database
+        self.generation: Optional[int] = None
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.contents = np.empty(0, dtype=np.uint32)
+        self._pending = None
+        self._saved_at: Optional[float] = None
+        self._verified_at: Optional[float] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                if str(data['database']) != self.database:
+                    logging.info(f"Key index {self.path} belongs to another database, rebuilding")
+                    return
+                self.keys = data['keys']
+                self.contents = data['contents']
+                self.generation = int(data['generation'])
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable key index {self.path}: {e}")
+
+    def save(self):
+        if self.generation is None:
+            return
+        # Every prefork child of a pod saves to the same path
+        buffer = io.BytesIO()
+        np.savez(buffer, keys=self.keys, contents=self.contents,
+                 generation=np.int64(self.generation), database=np.str_(self.database))
+        write_atomic(self.path, buffer.getvalue())
+        self._saved_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _merge(self, keys: np.ndarray, contents: np.ndarray):
+        """Insert or replace entries; the last entry for a key hash wins."""
+        if not len(keys):
+            return
+        # Last occurrence per key among the incoming entries
+        order = np.argsort(keys, kind='stable')
+        keys, contents = keys[order], contents[order]
+        last = np.append(keys[1:] != keys[:-1], True)
+        keys, contents = keys[last], contents[last]
+
+        positions = np.searchsorted(self.keys, keys)
+        in_range = positions < len(self.keys)
+        present = np.zeros(len(keys), dtype=bool)
+        present[in_range] = self.keys[positions[in_range]] == keys[in_range]
+
+        merged_contents = self.contents.copy()
+        merged_contents[positions[present]] = contents[present]
+        merged_keys = np.concatenate([self.keys, keys[~present]])
+        merged_contents = np.concatenate([merged_contents, contents[~present]])
+        order = np.argsort(merged_keys, kind='stable')
+        self.keys, self.contents = merged_keys[order], merged_contents[order]
+
+    def _read_rows(self, connection, since: Optional[int]):
+        columns = STORE_COLUMNS + ('content_fingerprint',)
+        query = f"SELECT {', '.join(columns)} FROM apartment_transactions"
+        params = {}
+        if since is not None:
+            query += " WHERE store_generation > :since"
+            params['since'] = since
+        result = connection.execution_options(stream_results=True, yield_per=REBUILD_CHUNK_ROWS).execute(text(query), params)
+        keys, contents = [], []
+        while True:
+            rows = result.fetchmany(REBUILD_CHUNK_ROWS)
+            if not rows:
+                break
+            chunk_keys, chunk_contents = _hash_records(dict(zip(columns, row)) for row in rows)
+            keys.append(chunk_keys)
+            contents.append(chunk_contents)
+        if keys:
+            # One merge (and sort) for the whole read instead of one per chunk
+            self._merge(np.concatenate(keys), np.concatenate(contents))
+
+    def rebuild(self, connection):
+        logging.info(f"Rebuilding key index {self.path} from apartment_transactions")
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.contents = np.empty(0, dtype=np.uint32)
+        self._read_rows(connection, since=None)
+        self._verified_at = time.monotonic()
+
+    def catch_up(self, connection, generation: int):
+        """Bring the index up to the given committed store generation."""
+        if self.generation is None or self.generation > generation:
+            self.rebuild(connection)
+        elif self.generation < generation:
+            self._read_rows(connection, since=self.generation)
+        self.generation = generation
+        if self._verified_at is None or time.monotonic() - self._verified_at >= KEY_INDEX_VERIFY_INTERVAL_SECONDS:
+            self.verify(connection)
+
+    def verify(self, connection):
+        """Rebuild if rows were deleted from (or restored to) the table behind the index's back."""
+        rows = connection.execute(text("SELECT COUNT(*) FROM apartment_transactions")).scalar_one()
+        self._verified_at = time.monotonic()
+        if rows != len(self.keys):
+            logging.info(f"Key index {self.path} holds {len(self.keys)} keys for {rows} rows")
+            self.rebuild(connection)
+
+    def unchanged_mask(self, keys: np.ndarray, contents: np.ndarray) -> np.ndarray:
+        positions = np.searchsorted(self.keys, keys)
+        in_range = positions < len(self.keys)
+        unchanged = np.zeros(len(keys), dtype=bool)
+        matched = positions[in_range]
+        unchanged[in_range] = (self.keys[matched] == keys[in_range]) & (self.contents[matched] == contents[in_range])
+        return unchanged
+
+    def store(self, connection, transactions: Iterable[Dict]) -> Tuple[int, int, int, int]:
+        """Store only the new and changed transactions; returns (new, updated, failed, unchanged).
+
+        The caller commits, then calls committed() to fold the stored rows into the index.
+        """
+        store_generation = next_store_generation(connection)
+        # Holding the counter row lock, every generation before ours is committed
+        self.catch_up(connection, store_generation - 1)
+
+        changed_keys: List[np.ndarray] = []
+        changed_contents: List[np.ndarray] = []
+        skipped = [0]
+        new_records, updated_records, failed_records, unchanged_records = store_transactions(
+            connection, self._changed(transactions, changed_keys, changed_contents, skipped), store_generation
+        )
+
+        # Rejected rows are not in the table; leave the index at the previous
+        # generation so the next store reads back exactly what was written
+        if not failed_records:
+            self._pending = (np.concatenate(changed_keys or [np.empty(0, dtype=np.uint64)]),
+                             np.concatenate(changed_contents or [np.empty(0, dtype=np.uint32)]), store_generation)
+        return new_records, updated_records, failed_records, unchanged_records + skipped[0]
+
+    def _changed(self, transactions: Iterable[Dict], changed_keys: List[np.ndarray], changed_contents: List[np.ndarray],
+                 skipped: List[int]) -> Iterator[Dict]:
+        """Yield the new and changed transactions, a chunk at a time, collecting their hashes."""
+        transactions = iter(transactions)
+        while True:
+            chunk = [record if record.get('content_fingerprint') else {**record, 'content_fingerprint': content_fingerprint(record)}
+                     for record in islice(transactions, STORE_BATCH_SIZE)]
+            if not chunk:
+                return
+            keys, contents = _hash_records(chunk)
+            unchanged = self.unchanged_mask(keys, contents)
+            changed = np.flatnonzero(~unchanged)
+            changed_keys.append(keys[changed])
+            changed_contents.append(contents[changed])
+            skipped[0] += int(unchanged.sum())
+            for i in changed.tolist():
+                yield chunk[i]
+
+    def committed(self):
+        if self._pending is not None:
+            keys, contents, generation = self._pending
+            self._merge(keys, contents)
+            self.generation = generation
+            self._pending = None
+        # The file is only a head start for catch_up, so frequent stores (streaming
+        # backfills) persist it at most once per interval
+        if self._saved_at is None or time.monotonic() - self._saved_at >= KEY_INDEX_SAVE_INTERVAL_SECONDS:
+            # The rows are already committed; a lost save only costs the next worker a longer catch_up
+            try:
+                self.save()
+            except Exception as e:
+                logging.warning(f"Failed to save key index {self.path}: {e}")
+
+
+_key_indexes: Dict[str, StoredKeyIndex] = {}
+
+
+def get_key_index(engine) -> StoredKeyIndex:
+    """Process-wide key index for the engine's database, stored under ETL_STATE_DIR."""
+    database = engine.url.render_as_string(hide_password=True)
+    if database not in _key_indexes:
+        state_dir = os.environ.get('ETL_STATE_DIR', '/tmp/estate-etl')
+        name = hashlib.sha256(database.encode('utf-8')).hexdigest()[:12]
+        path = os.environ.get('ETL_KEY_INDEX_PATH', os.path.join(state_dir, f"key-index-{name}.npz"))
+        _key_indexes[database] = StoredKeyIndex(path, database)
+    return _key_indexes[database]
+
+
+def store_and_commit(engine, transactions: Iterable[Dict]) -> Tuple[int, int, int, int]:
+    """Store transactions in one committed transaction, skipping rows the key index
+    knows are unchanged; returns (new, updated, failed, unchanged)."""
+    key_index = get_key_index(engine) if KEY_INDEX_ENABLED else None
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        if key_index is not None:
+            counts = key_index.store(connection, transactions)
+        else:
+            counts = store_transactions(connection, transactions)
+        connection.commit()
+    if key_index is not None:
+        key_index.committed()
+    new_records, updated_records, failed_records, unchanged_records = counts
+    observe_db_writes('etl', 'store', time.perf_counter() - started, inserted=new_records, updated=updated_records,
+                      unchanged=unchanged_records, rejected=failed_records)
+    return counts
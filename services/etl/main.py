@@ -3,35 +3,25 @@ import sentry_sdk
 from celery import Celery
 from celery.schedules import crontab
 from prometheus_client import start_http_server
-import boto3
-import json
-
-# Initialize Secrets Manager client
-secrets_client = boto3.client('secretsmanager', region_name=os.environ.get("AWS_REGION"))
-
-def get_secret(secret_name):
-    try:
-        response = secrets_client.get_secret_value(SecretId=secret_name)
-        if 'SecretString' in response:
-            return response['SecretString']
-        else:
-            return json.loads(response['SecretBinary'].decode('utf-8'))
-    except Exception as e:
-        print(f"Error retrieving secret {secret_name}: {e}")
-        raise
+from services.common import profiling
+from services.common.secrets import ETL_SECRETS, secrets_manager
+
+# Load every secret the service needs in one batched call; they are refreshed in the background
+sentry_dsn_secret_name = os.environ.get("SENTRY_DSN_SECRET_NAME")
+startup_secrets = list(ETL_SECRETS) if os.environ.get('NODE_ENV') == 'production' else []
+if sentry_dsn_secret_name:
+    startup_secrets.append(sentry_dsn_secret_name)
+if startup_secrets:
+    secrets_manager.preload(startup_secrets)
 
 # Load Sentry DSN from Secrets Manager
-if os.environ.get("SENTRY_DSN_SECRET_NAME"):
-    os.environ["SENTRY_DSN"] = get_secret(os.environ.get("SENTRY_DSN_SECRET_NAME"))
+if sentry_dsn_secret_name:
+    os.environ["SENTRY_DSN"] = secrets_manager.get_secret(sentry_dsn_secret_name) or ""
 
+# Traces are sampled per task name (SENTRY_TRACES_SAMPLE_RATE[S]) rather than for every task
 sentry_sdk.init(
     dsn=os.environ.get("SENTRY_DSN"),
-    # Set traces_sample_rate to 1.0 to capture 100% 
-    # of transactions for performance monitoring.
-    traces_sample_rate=1.0,
-    # Set profiles_sample_rate to 1.0 to profile every transaction. 
-    # Set this to a lower number in production if you have a high volume of transactions.
-    profiles_sample_rate=1.0,
+    **profiling.sentry_options()
 )
 
 app = Celery('etl_service', broker='redis://localhost:6379/0', backend='redis://localhost:6379/0')
@@ -46,9 +36,16 @@ app.conf.beat_schedule = {
         'task': 'services.etl.tasks.send_daily_etl_summary_email',
         'schedule': crontab(hour=3, minute=0), # Run daily at 3 AM, after ETL
     },
+    'sweep-etl-blobs': {
+        'task': 'services.etl.tasks.sweep_etl_blobs',
+        'schedule': crontab(hour=4, minute=0), # Run daily at 4 AM, after the summary
+    },
 }
 app.conf.timezone = 'UTC'
 
+# Sampled per-task profiles (TASK_PROFILE_* variables)
+profiling.install()
+
 # Start up the server to expose the metrics.
 start_http_server(8000)
 
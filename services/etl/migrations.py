@@ -0,0 +1,223 @@
+"""
+Versioned schema migrations for the ETL tables.
+
+Each migration runs once per database and is recorded in schema_migrations.
+Run it as a deploy step:
+
+    python -m services.etl.migrations
+
+ensure_schema applies anything pending at most once per process, so workers
+started without the deploy step still find their tables.
+"""
+import sys
+import logging
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from services.common.db import get_engine
+from services.common.secrets import secrets_manager
+
+# (version, name, statements); append new migrations, never edit applied ones
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, 'create apartment_transactions', [
+        """
+        CREATE TABLE IF NOT EXISTS apartment_transactions (
+            id SERIAL PRIMARY KEY,
+            unique_key VARCHAR(255) UNIQUE NOT NULL,
+            district_code VARCHAR(10),
+            district_name VARCHAR(50),
+            dong_name VARCHAR(50),
+            apartment_name VARCHAR(100),
+            transaction_amount_won BIGINT,
+            transaction_amount_display VARCHAR(50),
+            area_sqm DECIMAL(10,2),
+            area_pyeong DECIMAL(10,2),
+            construction_year INTEGER,
+            floor INTEGER,
+            transaction_date DATE,
+            reg_date VARCHAR(20),
+            price_per_sqm INTEGER,
+            data_quality_score INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS etl_rejected_transactions (
+            id SERIAL PRIMARY KEY,
+            unique_key VARCHAR(255),
+            reason TEXT NOT NULL,
+            record TEXT NOT NULL,
+            rejected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    # unique_key is already indexed by its UNIQUE constraint
+    (2, 'index apartment_transactions for report and price queries', [
+        "CREATE INDEX IF NOT EXISTS idx_apartment_transactions_district_date "
+        "ON apartment_transactions (district_name, transaction_date)",
+        # The AI reports only read rows with data_quality_score >= 80
+        "CREATE INDEX IF NOT EXISTS idx_apartment_transactions_quality_date "
+        "ON apartment_transactions (transaction_date, district_name) WHERE data_quality_score >= 80",
+        "CREATE INDEX IF NOT EXISTS idx_apartment_transactions_district_code "
+        "ON apartment_transactions (district_code)",
+        "CREATE INDEX IF NOT EXISTS idx_apartment_transactions_amount "
+        "ON apartment_transactions (transaction_amount_won)",
+    ]),
+    # Every store stamps the rows it writes with a generation from a single
+    # counter row, so a stored-key index can catch up on what changed since it was built
+    (3, 'track store generations', [
+        "ALTER TABLE apartment_transactions ADD COLUMN store_generation BIGINT",
+        "CREATE INDEX IF NOT EXISTS idx_apartment_transactions_store_generation "
+        "ON apartment_transactions (store_generation)",
+        """
+        CREATE TABLE IF NOT EXISTS etl_store_generation (
+            id INTEGER PRIMARY KEY,
+            generation BIGINT NOT NULL
+        )
+        """,
+        "INSERT INTO etl_store_generation (id, generation) VALUES (1, 0)",
+    ]),
+    # Rows written before this migration get their fingerprint on their next store
+    (4, 'add content fingerprints', [
+        "ALTER TABLE apartment_transactions ADD COLUMN content_fingerprint VARCHAR(32)",
+    ]),
+    (5, 'persist per-run partition digests', [
+        """
+        CREATE TABLE IF NOT EXISTS etl_partition_digests (
+            run_id VARCHAR(64) NOT NULL,
+            district_code VARCHAR(10) NOT NULL,
+            deal_ymd VARCHAR(6) NOT NULL,
+            row_count INTEGER NOT NULL,
+            digest VARCHAR(64) NOT NULL,
+            merkle_root VARCHAR(64) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, district_code, deal_ymd)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_etl_partition_digests_partition "
+        "ON etl_partition_digests (district_code, deal_ymd, created_at)",
+    ]),
+    # Kept up to date by the store step (services/etl/rollups.py); filled here from the existing rows.
+    # Refreshes read through idx_apartment_transactions_quality_date, another index would slow every write
+    (6, 'create district_daily_stats rollup', [
+        """
+        CREATE TABLE IF NOT EXISTS district_daily_stats (
+            stat_date DATE NOT NULL,
+            district_code VARCHAR(10) NOT NULL,
+            district_name VARCHAR(50),
+            transaction_count INTEGER NOT NULL,
+            price_sum BIGINT NOT NULL,
+            price_per_sqm_sum BIGINT NOT NULL,
+            area_sum DECIMAL(14,2) NOT NULL,
+            PRIMARY KEY (stat_date, district_code)
+        )
+        """,
+        """
+        INSERT INTO district_daily_stats (
+            stat_date, district_code, district_name, transaction_count, price_sum, price_per_sqm_sum, area_sum
+        )
+        SELECT transaction_date, district_code, MAX(district_name), COUNT(*),
+               SUM(transaction_amount_won), SUM(price_per_sqm), SUM(area_sqm)
+        FROM apartment_transactions
+        WHERE data_quality_score >= 80 AND transaction_date IS NOT NULL AND district_code IS NOT NULL
+        GROUP BY transaction_date, district_code
+        """,
+    ]),
+    # Both tables used to be created on first use, so existing databases already have them
+    (7, 'create watermark and run stage tables', [
+        """
+        CREATE TABLE IF NOT EXISTS etl_partition_watermarks (
+            district_code VARCHAR(10) NOT NULL,
+            deal_ymd VARCHAR(6) NOT NULL,
+            row_count INTEGER NOT NULL,
+            content_hash VARCHAR(64) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (district_code, deal_ymd)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS etl_run_stages (
+            run_id VARCHAR(64) NOT NULL,
+            stage VARCHAR(64) NOT NULL,
+            district_code VARCHAR(10),
+            started_at TIMESTAMP NOT NULL,
+            finished_at TIMESTAMP NOT NULL,
+            duration_seconds DOUBLE PRECISION NOT NULL,
+            status VARCHAR(16) NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_etl_run_stages_run_id ON etl_run_stages (run_id, started_at)",
+    ]),
+    # The AI service's LLM response cache (services/ai/llm_cache.py), shared by every worker
+    (8, 'create llm_response_cache', [
+        """
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            cache_key VARCHAR(64) PRIMARY KEY,
+            model VARCHAR(100) NOT NULL,
+            model_hash VARCHAR(16) NOT NULL,
+            prompt_hash VARCHAR(16) NOT NULL,
+            response TEXT NOT NULL,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            created_at DOUBLE PRECISION NOT NULL,
+            last_used_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+    ]),
+]
+
+CREATE_SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Arbitrary key serializing concurrent migrators (several workers starting at once)
+MIGRATION_LOCK_KEY = 72611
+
+
+def migrate(engine) -> List[int]:
+    """Apply pending migrations in order and return the versions applied."""
+    applied = []
+    with engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+        connection.execute(text(CREATE_SCHEMA_MIGRATIONS_SQL))
+        done = {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+        for version, name, statements in MIGRATIONS:
+            if version in done:
+                continue
+            logging.info(f"Applying schema migration {version}: {name}")
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                               {'version': version, 'name': name})
+            applied.append(version)
+        connection.commit()
+    return applied
+
+
+_migrated_urls = set()
+
+
+def ensure_schema(engine):
+    """Run pending migrations once per process and engine."""
+    url = engine.url.render_as_string(hide_password=False)
+    if url not in _migrated_urls:
+        migrate(engine)
+        _migrated_urls.add(url)
+
+
+def main():
+    applied = migrate(get_engine(secrets_manager.get_database_url()))
+    logging.info(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
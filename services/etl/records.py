@@ -0,0 +1,101 @@
+"""
+Compact in-memory representation of transaction records shared by the ETL stages.
+
+A TransactionBatch keeps one list (or numpy array) per field instead of one dict
+per row, and interns the strings that repeat across rows (district, dong and
+apartment names, dates, codes), so each distinct value is stored once. Records
+are converted to dicts only at the edges: the blob store, the database and the
+watermark fingerprints.
+"""
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Marks a field absent from a record, so converting back to dicts reproduces it exactly
+MISSING = object()
+
+INTERNED_FIELDS = frozenset({
+    'district_code', 'district_name', 'dong_name', 'apartment_name', 'construction_year',
+    'transaction_date', 'reg_date', 'floor', 'created_at'
+})
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class TransactionBatch:
+    """Struct-of-arrays batch of transaction records."""
+
+    __slots__ = ('fields', 'columns', '_length')
+
+    def __init__(self, fields: Sequence[str] = (), columns: Optional[Dict[str, Sequence]] = None, length: int = 0):
+        self.fields: List[str] = list(fields)
+        self.columns: Dict[str, Sequence] = columns if columns is not None else {field: [] for field in self.fields}
+        self._length = length
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'TransactionBatch':
+        batch = cls()
+        batch.extend(records)
+        return batch
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, object], fields: Optional[Sequence[str]] = None) -> 'TransactionBatch':
+        """Wrap equal-length columns; a scalar column is broadcast to every row."""
+        fields = list(fields or columns)
+        length = next((len(column) for column in columns.values() if isinstance(column, (list, tuple)) or hasattr(column, 'tolist')), 0)
+        batch_columns = {}
+        for field in fields:
+            column = columns[field]
+            if isinstance(column, (list, tuple)) or hasattr(column, 'tolist'):
+                batch_columns[field] = column
+            else:
+                batch_columns[field] = [_intern(column)] * length
+        return cls(fields, batch_columns, length)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _add_field(self, field: str):
+        self.fields.append(field)
+        self.columns[field] = [MISSING] * self._length
+
+    def append(self, record: Dict):
+        for field in record:
+            if field not in self.columns:
+                self._add_field(field)
+        for field in self.fields:
+            value = record.get(field, MISSING)
+            self.columns[field].append(_intern(value) if field in INTERNED_FIELDS else value)
+        self._length += 1
+
+    def extend(self, records: Iterable[Dict]):
+        for record in records:
+            self.append(record)
+
+    def column(self, field: str, default=MISSING) -> list:
+        """Values of one field as a list, with default in place of missing values."""
+        column = self.columns.get(field)
+        if column is None:
+            return [default] * self._length
+        values = column.tolist() if hasattr(column, 'tolist') else list(column)
+        if default is not MISSING:
+            values = [default if value is MISSING else value for value in values]
+        return values
+
+    def take(self, indices: Sequence[int]) -> 'TransactionBatch':
+        """New batch holding the given rows, in the given order."""
+        indices = list(indices)
+        columns = {}
+        for field in self.fields:
+            column = self.columns[field]
+            columns[field] = column[indices] if hasattr(column, 'tolist') else [column[i] for i in indices]
+        return TransactionBatch(self.fields, columns, len(indices))
+
+    def __iter__(self) -> Iterator[Dict]:
+        columns = [self.column(field) for field in self.fields]
+        for row in zip(*columns):
+            yield {field: value for field, value in zip(self.fields, row) if value is not MISSING}
+
+    def to_records(self) -> List[Dict]:
+        return list(self)
@@ -0,0 +1,144 @@
+"""
+Retry and circuit-breaking for calls to the RTMS API.
+
+RetryPolicy retries a single request with jittered exponential backoff, so one
+flaky (district, month) page is retried on its own instead of re-running the
+whole fetch. CircuitBreaker is shared by every request to a host in the
+process: after enough consecutive failures it fails requests immediately for a
+cooldown, then lets one probe through to decide whether to close again.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import requests
+
+RTMS_MAX_ATTEMPTS = int(os.environ.get('RTMS_MAX_ATTEMPTS', '4'))
+RTMS_RETRY_BASE_DELAY = float(os.environ.get('RTMS_RETRY_BASE_DELAY', '0.5'))
+RTMS_RETRY_MAX_DELAY = float(os.environ.get('RTMS_RETRY_MAX_DELAY', '30'))
+RTMS_BREAKER_FAILURES = int(os.environ.get('RTMS_BREAKER_FAILURES', '5'))
+RTMS_BREAKER_RESET_SECONDS = float(os.environ.get('RTMS_BREAKER_RESET_SECONDS', '60'))
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit is open."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection errors, timeouts, 429 and 5xx responses; other 4xx will fail the same way again."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = getattr(error.response, 'status_code', None)
+        return status is None or status == 429 or status >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class RetryPolicy:
+    """Exponential backoff with "equal jitter": half of each delay is fixed, half random.
+
+    The fixed half keeps retries from coming back before the API had a chance to
+    recover; the random half spreads out workers that failed at the same moment.
+    """
+
+    def __init__(self, max_attempts: int = RTMS_MAX_ATTEMPTS, base_delay: float = RTMS_RETRY_BASE_DELAY,
+                 max_delay: float = RTMS_RETRY_MAX_DELAY, sleep: Callable[[float], None] = time.sleep):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def delay(self, attempt: int) -> float:
+        """Delay before retry number attempt + 1 (attempt counts from 0)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout."""
+
+    def __init__(self, name: str, failure_threshold: int = RTMS_BREAKER_FAILURES,
+                 reset_timeout: float = RTMS_BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self.state == 'open':
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"Circuit for {self.name} is open")
+                self.state = 'half_open'
+                self._probing = False
+            if self.state == 'half_open':
+                # A single probe decides whether the API is back
+                if self._probing:
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open, probe in flight")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                logging.info(f"Circuit for {self.name} closed")
+            self.state = 'closed'
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logging.warning(f"Circuit for {self.name} opened after {self._failures} consecutive failures")
+                self.state = 'open'
+                self._opened_at = self.clock()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a host, shared by every client and task in the worker."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def call_with_retry(fn: Callable, policy: RetryPolicy, breaker: Optional[CircuitBreaker] = None,
+                    description: str = 'request'):
+    """Call fn() under the breaker, retrying retryable failures per the policy."""
+    for attempt in range(policy.max_attempts):
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_retryable(e):
+                # The API answered; a client error says nothing about its health
+                if breaker is not None:
+                    breaker.record_success()
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt + 1 >= policy.max_attempts:
+                raise
+            delay = policy.delay(attempt)
+            logging.info(f"Retrying {description} in {delay:.1f}s after attempt {attempt + 1} failed: {e}")
+            policy.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
@@ -0,0 +1,148 @@
+"""
+Record/replay cache of raw RTMS API responses.
+
+Response bodies are stored content-addressed (by the SHA-256 of the bytes,
+zlib-compressed) under bodies/, so the many identical pages, such as empty
+months, are kept once. Each request (endpoint, LAWD_CD, DEAL_YMD, pageNo and
+numOfRows; never the service key) has a small JSON entry under requests/ that
+points at its body and records when it was fetched.
+
+Modes (ETL_RTMS_CACHE_MODE):
+    off     no cache (default)
+    record  serve entries younger than the TTL, fetch and record everything else
+    replay  serve recorded entries regardless of age and never touch the network;
+            a request that was never recorded fails like a failed page
+
+Replay runs the whole pipeline offline, e.g. to re-run normalization and
+storage after a code change (with use_watermarks=False, since the recorded
+responses match the stored watermarks), or to benchmark it on a fixed corpus.
+"""
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+import requests
+
+MODES = ('off', 'record', 'replay')
+RTMS_CACHE_MODE = os.environ.get('ETL_RTMS_CACHE_MODE', 'off').lower()
+RTMS_CACHE_TTL_SECONDS = float(os.environ.get('ETL_RTMS_CACHE_TTL_SECONDS', '86400'))
+
+
+class CacheMiss(requests.exceptions.RequestException):
+    """A replayed request that was never recorded."""
+
+
+def write_atomic(path: str, data: bytes):
+    """Write data to path through a temporary file private to this process and thread."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Concurrent district fetches can write the same shared body from several threads
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    """On-disk RTMS response cache; see the module docstring for the layout and modes."""
+
+    def __init__(self, root: str, mode: str = 'record', ttl_seconds: float = RTMS_CACHE_TTL_SECONDS):
+        if mode not in MODES or mode == 'off':
+            raise ValueError(f"Unsupported response cache mode: {mode}")
+        self.root = root
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def request_key(endpoint: str, district_code: str, deal_ymd: str, page_no: int, num_of_rows: int) -> str:
+        canonical = json.dumps([endpoint, district_code, deal_ymd, int(page_no), int(num_of_rows)])
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _request_path(self, key: str) -> str:
+        return os.path.join(self.root, 'requests', key[:2], f"{key}.json")
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'bodies', digest[:2], f"{digest}.z")
+
+    def get(self, endpoint: str, district_code: str, deal_ymd: str, page_no: int, num_of_rows: int) -> Optional[bytes]:
+        """The cached body, or None if it must be fetched; raises CacheMiss in replay mode."""
+        key = self.request_key(endpoint, district_code, deal_ymd, page_no, num_of_rows)
+        try:
+            with open(self._request_path(key), 'r') as f:
+                entry = json.load(f)
+            fresh = self.mode == 'replay' or time.time() - entry['fetched_at'] < self.ttl_seconds
+            if fresh:
+                with open(self._body_path(entry['body']), 'rb') as f:
+                    body = zlib.decompress(f.read())
+                self.hits += 1
+                return body
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, zlib.error) as e:
+            logging.warning(f"Ignoring unreadable RTMS cache entry {key}: {e}")
+        self.misses += 1
+        if self.mode == 'replay':
+            raise CacheMiss(f"No recorded response for district {district_code} month {deal_ymd} page {page_no}")
+        return None
+
+    def put(self, endpoint: str, district_code: str, deal_ymd: str, page_no: int, num_of_rows: int, body: bytes):
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = self._body_path(digest)
+        if not os.path.exists(body_path):
+            write_atomic(body_path, zlib.compress(body, 6))
+        entry = {
+            'endpoint': endpoint,
+            'district_code': district_code,
+            'deal_ymd': deal_ymd,
+            'page_no': int(page_no),
+            'num_of_rows': int(num_of_rows),
+            'body': digest,
+            'fetched_at': time.time()
+        }
+        key = self.request_key(endpoint, district_code, deal_ymd, page_no, num_of_rows)
+        write_atomic(self._request_path(key), json.dumps(entry).encode('utf-8'))
+
+    def prune(self, max_age_seconds: Optional[float] = None) -> int:
+        """Drop entries older than max_age_seconds (the TTL by default) and bodies no entry uses."""
+        max_age_seconds = self.ttl_seconds if max_age_seconds is None else max_age_seconds
+        now = time.time()
+        referenced = set()
+        removed = 0
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, 'requests')):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    with open(path, 'r') as f:
+                        entry = json.load(f)
+                    if now - entry['fetched_at'] < max_age_seconds:
+                        referenced.add(entry['body'])
+                        continue
+                except (OSError, ValueError, KeyError):
+                    pass
+                os.remove(path)
+                removed += 1
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, 'bodies')):
+            for filename in filenames:
+                if filename[:-len('.z')] not in referenced:
+                    os.remove(os.path.join(dirpath, filename))
+        return removed
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache configured from ETL_RTMS_CACHE_* variables, None when off."""
+    global _response_cache
+    if _response_cache is None and RTMS_CACHE_MODE != 'off':
+        state_dir = os.environ.get('ETL_STATE_DIR', '/tmp/estate-etl')
+        root = os.environ.get('ETL_RTMS_CACHE_DIR', os.path.join(state_dir, 'rtms-cache'))
+        _response_cache = ResponseCache(root, RTMS_CACHE_MODE)
+        logging.info(f"Using RTMS response cache at {root} in {RTMS_CACHE_MODE} mode")
+    return _response_cache
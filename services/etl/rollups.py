@@ -0,0 +1,119 @@
+"""
+district_daily_stats: per district and day totals of the report-quality rows
+(data_quality_score >= 80) of apartment_transactions.
+
+The store step refreshes the days it wrote in the same transaction as the rows
+themselves, so the rollup is never ahead of or behind the fact table. A cell
+is recomputed from the fact table rather than adjusted by deltas. An updated
+row therefore needs no knowledge of its previous values, and refreshing a day
+twice is harmless. unique_key contains the district code and the transaction
+date, so an update never moves a row to another cell.
+
+The AI reports read averages as sums over counts from a few hundred rollup
+rows. Rebuild the rollup from scratch (after a manual fix of the fact table)
+with:
+
+    python -m services.etl.rollups
+"""
+import sys
+import logging
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import text
+
+from services.common.db import get_engine
+from services.common.secrets import secrets_manager
+
+ROLLUP_QUALITY_THRESHOLD = 80
+
+_SELECT_CELLS = f"""
+SELECT
+    transaction_date,
+    district_code,
+    MAX(district_name),
+    COUNT(*),
+    SUM(transaction_amount_won),
+    SUM(price_per_sqm),
+    SUM(area_sqm)
+FROM apartment_transactions
+WHERE data_quality_score >= {ROLLUP_QUALITY_THRESHOLD}
+AND transaction_date IS NOT NULL
+AND district_code IS NOT NULL
+"""
+
+_INSERT_CELLS = """
+INSERT INTO district_daily_stats (
+    stat_date, district_code, district_name, transaction_count, price_sum, price_per_sqm_sum, area_sum
+)
+"""
+
+REFRESH_DELETE_SQL = """
+DELETE FROM district_daily_stats
+WHERE district_code = :district_code AND stat_date BETWEEN :first_date AND :last_date
+"""
+
+REFRESH_INSERT_SQL = _INSERT_CELLS + _SELECT_CELLS + """
+AND district_code = :district_code AND transaction_date BETWEEN :first_date AND :last_date
+GROUP BY transaction_date, district_code
+"""
+
+REBUILD_INSERT_SQL = _INSERT_CELLS + _SELECT_CELLS + """
+GROUP BY transaction_date, district_code
+"""
+
+
+class DistrictDateRanges:
+    """First and last transaction_date per district_code of the rows passing through track()."""
+
+    def __init__(self):
+        self.ranges: Dict[str, List[str]] = {}
+
+    def track(self, transactions: Iterable[Dict]) -> Iterator[Dict]:
+        ranges = self.ranges
+        for transaction in transactions:
+            district_code = transaction.get('district_code')
+            transaction_date = transaction.get('transaction_date')
+            if district_code and isinstance(transaction_date, str):
+                bounds = ranges.get(district_code)
+                if bounds is None:
+                    ranges[district_code] = [transaction_date, transaction_date]
+                elif transaction_date < bounds[0]:
+                    bounds[0] = transaction_date
+                elif transaction_date > bounds[1]:
+                    bounds[1] = transaction_date
+            yield transaction
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def params(self) -> List[Dict]:
+        return [{'district_code': code, 'first_date': first, 'last_date': last}
+                for code, (first, last) in sorted(self.ranges.items())]
+
+
+def refresh_district_daily_stats(connection, ranges: DistrictDateRanges):
+    """Recompute the rollup cells of every tracked district over its date range. The caller commits."""
+    params = ranges.params()
+    if params:
+        connection.execute(text(REFRESH_DELETE_SQL), params)
+        connection.execute(text(REFRESH_INSERT_SQL), params)
+
+
+def rebuild_district_daily_stats(connection) -> int:
+    """Recompute the whole rollup from apartment_transactions; returns the cell count. The caller commits."""
+    connection.execute(text("DELETE FROM district_daily_stats"))
+    connection.execute(text(REBUILD_INSERT_SQL))
+    return connection.execute(text("SELECT COUNT(*) FROM district_daily_stats")).scalar_one()
+
+
+def main():
+    with get_engine(secrets_manager.get_database_url()).connect() as connection:
+        cells = rebuild_district_daily_stats(connection)
+        connection.commit()
+    logging.info(f"Rebuilt district_daily_stats: {cells} district days")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.etl.resilience import CircuitBreaker, RetryPolicy, call_with_retry, get_circuit_breaker
+from services.etl.response_cache import ResponseCache, get_response_cache
+from services.common.metrics import fetch_duration_seconds, stage_bytes_total, timed
+
+# Ministry of Land (MOLIT) real transaction price API for apartment trades
+RTMS_BASE_URL = "http://apis.data.go.kr/1613000/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev"
+
+# Seoul district codes (구)
+SEOUL_DISTRICTS = [
+    "11110", "11140", "11170", "11200", "11215", "11230", "11260", "11290",
+    "11305", "11320", "11350", "11380", "11410", "11440", "11470", "11500",
+    "11530", "11545", "11560", "11590", "11620", "11650", "11680", "11710", "11740"
+]
+
+
+class RateLimiter:
+    """Token bucket limiting how many requests per second leave the process."""
+
+    def __init__(self, rate_per_sec: float, burst: Optional[int] = None):
+        self.rate = float(rate_per_sec)
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_sec)))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RTMSClient:
+    """Concurrent RTMS API client sharing one keep-alive connection pool.
+
+    Requests are fanned out over a bounded thread pool, capped per host and
+    throttled by a process-wide token bucket so the government API is never
+    hit harder than configured. Each page request is retried on its own with
+    jittered backoff, behind a per-host circuit breaker shared by the process.
+    With a response cache, cached pages are served without any of that.
+    """
+
+    def __init__(self, api_key: str, base_url: str = RTMS_BASE_URL,
+                 max_workers: Optional[int] = None, per_host_limit: Optional[int] = None,
+                 rate_limit: Optional[float] = None, timeout: Optional[Tuple[float, float]] = None,
+                 session: Optional[requests.Session] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_workers = max_workers or int(os.environ.get('RTMS_FETCH_CONCURRENCY', '16'))
+        self.per_host_limit = per_host_limit or int(os.environ.get('RTMS_PER_HOST_LIMIT', '8'))
+        self.rate_limiter = RateLimiter(
+            rate_limit if rate_limit is not None else float(os.environ.get('RTMS_RATE_LIMIT_PER_SEC', '10'))
+        )
+        self.timeout = timeout or (
+            float(os.environ.get('RTMS_CONNECT_TIMEOUT', '5')),
+            float(os.environ.get('RTMS_READ_TIMEOUT', '30')),
+        )
+        self.session = session or self._build_session()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker(urlsplit(base_url).netloc)
+        self.response_cache = response_cache or get_response_cache()
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.per_host_limit)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+
+    def fetch_page(self, district_code: str, deal_ymd: str, page_no: int = 1, num_of_rows: int = 1000) -> bytes:
+        """Fetch one page of transactions for a district and month."""
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.base_url, district_code, deal_ymd, page_no, num_of_rows)
+            if cached is not None:
+                return cached
+        
+        params = {
+            'serviceKey': self.api_key,
+            'LAWD_CD': district_code,
+            'DEAL_YMD': deal_ymd,
+            'numOfRows': str(num_of_rows),
+            'pageNo': str(page_no)
+        }
+        
+        def request():
+            self.rate_limiter.acquire()
+            with self._host_semaphore(self.base_url):
+                with timed(fetch_duration_seconds, service='etl', stage='fetch', district=district_code):
+                    response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                    response.raise_for_status()
+            stage_bytes_total.labels('etl', 'fetch', 'download').inc(len(response.content))
+            return response.content
+        
+        # Backoff sleeps happen outside the host semaphore, so waiting retries
+        # do not hold connection slots
+        content = call_with_retry(request, self.retry_policy, self.circuit_breaker,
+                                  f"district {district_code} month {deal_ymd} page {page_no}")
+        if self.response_cache is not None:
+            self.response_cache.put(self.base_url, district_code, deal_ymd, page_no, num_of_rows, content)
+        return content
+
+    def map_concurrent(self, fn: Callable, units: Iterable) -> Iterator[Tuple[object, object, Optional[Exception]]]:
+        """Run fn(unit) on the thread pool, yielding (unit, result, error) as each completes."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fn, unit): unit for unit in units}
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    yield unit, future.result(), None
+                except Exception as e:
+                    yield unit, None, e
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
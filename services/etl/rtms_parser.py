@@ -0,0 +1,57 @@
+import io
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+
+def _build_transaction(fields: Dict[str, Optional[str]], district_code: str) -> Dict[str, str]:
+    get = fields.get
+    return {
+        'district_code': district_code,
+        'apartment_name': get('아파트', ''),
+        'transaction_amount': get('거래금액', ''),
+        'construction_year': get('건축년도', ''),
+        'transaction_date': f"{fields['년']}-{(fields['월'] or '').zfill(2)}-{(fields['일'] or '').zfill(2)}"
+                            if '년' in fields and '월' in fields and '일' in fields else '',
+        'area_sqm': get('전용면적', ''),
+        'district_name': get('시군구', ''),
+        'dong_name': get('법정동', ''),
+        'floor': get('층', ''),
+        'reg_date': get('등기날짜', '')
+    }
+
+
+def iter_rtms_items(source: Union[bytes, BinaryIO], district_code: str, meta: Optional[Dict] = None) -> Iterator[Dict[str, str]]:
+    """Stream raw transaction dicts out of an RTMS XML response.
+
+    Each <item> is mapped in a single pass over its children and released as
+    soon as it has been yielded, so memory stays flat regardless of response
+    size. If meta is given, meta['total_count'] is set once <totalCount> has
+    been read (it follows the items in RTMS responses).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    items_parent = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'items':
+                items_parent = elem
+            continue
+
+        if elem.tag == 'item':
+            fields = {child.tag: child.text for child in elem}
+            yield _build_transaction(fields, district_code)
+            elem.clear()
+            if items_parent is not None:
+                items_parent.remove(elem)
+        elif elem.tag == 'totalCount' and meta is not None:
+            count_text = (elem.text or '').strip()
+            meta['total_count'] = int(count_text) if count_text.isdigit() else None
+
+
+def parse_rtms_response(content: Union[bytes, BinaryIO], district_code: str) -> Tuple[List[Dict[str, str]], int]:
+    """Parse an RTMS XML response body into raw transaction dicts and the reported totalCount."""
+    meta = {}
+    transactions = list(iter_rtms_items(content, district_code, meta))
+    total_count = meta.get('total_count')
+    return transactions, total_count if total_count is not None else len(transactions)
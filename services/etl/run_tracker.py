@@ -0,0 +1,130 @@
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from services.common.db import get_engine
+from services.common.metrics import stage_duration_seconds
+from services.common.profiling import span
+from services.common.secrets import secrets_manager
+from services.etl.migrations import ensure_schema
+
+
+class RunTracker:
+    """Persists per-stage spans of pipeline runs in etl_run_stages, so a run's timing can be queried by run id."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def record(self, run_id: str, stage: str, district_code: Optional[str],
+               started_at: datetime, finished_at: datetime, status: str):
+        with self.engine.connect() as connection:
+            connection.execute(text("""
+            INSERT INTO etl_run_stages (run_id, stage, district_code, started_at, finished_at, duration_seconds, status)
+            VALUES (:run_id, :stage, :district_code, :started_at, :finished_at, :duration_seconds, :status)
+            """), {
+                'run_id': run_id,
+                'stage': stage,
+                'district_code': district_code,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'duration_seconds': (finished_at - started_at).total_seconds(),
+                'status': status
+            })
+            connection.commit()
+
+    def timings(self, run_id: str) -> Dict:
+        """Return every span of a run plus a per-stage summary.
+
+        wall_clock_seconds is first start to last finish across the stage's
+        parallel spans; total_seconds is the sum of their durations.
+        """
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("""
+            SELECT stage, district_code, started_at, finished_at, duration_seconds, status
+            FROM etl_run_stages WHERE run_id = :run_id ORDER BY started_at
+            """), {'run_id': run_id}).fetchall()
+
+        spans = []
+        summary = {}
+        for stage, district_code, started_at, finished_at, duration, status in rows:
+            started_at = started_at if isinstance(started_at, datetime) else datetime.fromisoformat(started_at)
+            finished_at = finished_at if isinstance(finished_at, datetime) else datetime.fromisoformat(finished_at)
+            spans.append({
+                'stage': stage,
+                'district_code': district_code,
+                'started_at': started_at.isoformat(),
+                'finished_at': finished_at.isoformat(),
+                'duration_seconds': duration,
+                'status': status
+            })
+            stage_summary = summary.setdefault(stage, {
+                'spans': 0, 'failures': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                '_first_start': started_at, '_last_finish': finished_at
+            })
+            stage_summary['spans'] += 1
+            stage_summary['failures'] += status != 'success'
+            stage_summary['total_seconds'] += duration
+            stage_summary['max_seconds'] = max(stage_summary['max_seconds'], duration)
+            stage_summary['_first_start'] = min(stage_summary['_first_start'], started_at)
+            stage_summary['_last_finish'] = max(stage_summary['_last_finish'], finished_at)
+
+        for stage_summary in summary.values():
+            first_start = stage_summary.pop('_first_start')
+            last_finish = stage_summary.pop('_last_finish')
+            stage_summary['wall_clock_seconds'] = (last_finish - first_start).total_seconds()
+
+        return {'run_id': run_id, 'stages': summary, 'spans': spans}
+
+
+_run_tracker: Optional[RunTracker] = None
+
+
+def get_run_tracker() -> RunTracker:
+    global _run_tracker
+    if _run_tracker is None:
+        engine = get_engine(secrets_manager.get_database_url())
+        ensure_schema(engine)
+        _run_tracker = RunTracker(engine)
+    return _run_tracker
+
+
+@contextmanager
+def stage_span(run_id: Optional[str], stage: str, district_code: Optional[str] = None):
+    """Time the wrapped block in estate_stage_duration_seconds and, within a tracked run,
+    record it as one span of the run."""
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    status = 'success'
+    try:
+        with span(f"etl:{stage}" + (f":{district_code}" if district_code else "")):
+            yield
+    except Exception:
+        status = 'failure'
+        raise
+    finally:
+        stage_duration_seconds.labels('etl', stage, status).observe(time.perf_counter() - started)
+        if run_id:
+            try:
+                get_run_tracker().record(run_id, stage, district_code, started_at, datetime.utcnow(), status)
+            except Exception as e:
+                # Timing is diagnostics only, it must never fail the pipeline
+                logging.warning(f"Failed to record {stage} span for run {run_id}: {e}")
+
+
+def tracked_stage(stage: str):
+    """Decorate a stage task whose first argument is a stage payload (or a list of them) carrying run_id."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(payload, *args, **kwargs):
+            first = payload[0] if isinstance(payload, list) and payload else payload
+            run_id = first.get('run_id') if isinstance(first, dict) else None
+            district_code = first.get('district_code') if isinstance(payload, dict) else None
+            with stage_span(run_id, stage, district_code):
+                return fn(payload, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,308 @@
+import io
+import os
+import json
+import logging
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from services.etl.rollups import DistrictDateRanges, refresh_district_daily_stats
+from services.etl.transforms import FINGERPRINT_COLUMNS, content_fingerprint
+
+STORE_BATCH_SIZE = int(os.environ.get('ETL_STORE_BATCH_SIZE', '10000'))
+
+CHECK_SQL = "SELECT id, content_fingerprint FROM apartment_transactions WHERE unique_key = :unique_key"
+
+UPDATE_SQL = """
+UPDATE apartment_transactions SET
+    district_code = :district_code,
+    district_name = :district_name,
+    dong_name = :dong_name,
+    apartment_name = :apartment_name,
+    transaction_amount_won = :transaction_amount_won,
+    transaction_amount_display = :transaction_amount_display,
+    area_sqm = :area_sqm,
+    area_pyeong = :area_pyeong,
+    construction_year = :construction_year,
+    floor = :floor,
+    transaction_date = :transaction_date,
+    reg_date = :reg_date,
+    price_per_sqm = :price_per_sqm,
+    data_quality_score = :data_quality_score,
+    content_fingerprint = :content_fingerprint,
+    store_generation = :store_generation,
+    updated_at = CURRENT_TIMESTAMP
+WHERE unique_key = :unique_key
+"""
+
+INSERT_SQL = """
+INSERT INTO apartment_transactions (
+    unique_key, district_code, district_name, dong_name, apartment_name,
+    transaction_amount_won, transaction_amount_display, area_sqm, area_pyeong,
+    construction_year, floor, transaction_date, reg_date, price_per_sqm,
+    data_quality_score, content_fingerprint, store_generation
+) VALUES (
+    :unique_key, :district_code, :district_name, :dong_name, :apartment_name,
+    :transaction_amount_won, :transaction_amount_display, :area_sqm, :area_pyeong,
+    :construction_year, :floor, :transaction_date, :reg_date, :price_per_sqm,
+    :data_quality_score, :content_fingerprint, :store_generation
+)
+"""
+
+
+STORE_COLUMNS = FINGERPRINT_COLUMNS
+
+# Columns written by the bulk path: the stored content plus its fingerprint
+COPY_COLUMNS = STORE_COLUMNS + ('content_fingerprint',)
+
+# Rows that could not be stored, kept in etl_rejected_transactions instead of aborting their batch
+REJECT_SQL = """
+INSERT INTO etl_rejected_transactions (unique_key, reason, record)
+VALUES (:unique_key, :reason, :record)
+"""
+
+# Session-local staging table for the bulk path; dropped when the transaction commits
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS apartment_transactions_staging (
+    seq INTEGER NOT NULL,
+    unique_key VARCHAR(255) NOT NULL,
+    district_code VARCHAR(10),
+    district_name VARCHAR(50),
+    dong_name VARCHAR(50),
+    apartment_name VARCHAR(100),
+    transaction_amount_won BIGINT,
+    transaction_amount_display VARCHAR(50),
+    area_sqm DECIMAL(10,2),
+    area_pyeong DECIMAL(10,2),
+    construction_year INTEGER,
+    floor INTEGER,
+    transaction_date DATE,
+    reg_date VARCHAR(20),
+    price_per_sqm INTEGER,
+    data_quality_score INTEGER,
+    content_fingerprint VARCHAR(32)
+) ON COMMIT DROP
+"""
+
+# xmax is 0 only for rows this statement inserted, which separates new from updated rows.
+# DISTINCT ON keeps the last staged row per key, as sequential upserts would. Existing
+# rows whose fingerprint matches are left alone (no new row version, no WAL), so they
+# are neither returned nor counted as updated.
+MERGE_SQL = f"""
+WITH merged AS (
+    INSERT INTO apartment_transactions ({', '.join(COPY_COLUMNS)}, store_generation)
+    SELECT DISTINCT ON (unique_key) {', '.join(COPY_COLUMNS)}, :store_generation
+    FROM apartment_transactions_staging
+    ORDER BY unique_key, seq DESC
+    ON CONFLICT (unique_key) DO UPDATE SET
+        {', '.join(f"{column} = EXCLUDED.{column}" for column in COPY_COLUMNS[1:])},
+        store_generation = EXCLUDED.store_generation,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE apartment_transactions.content_fingerprint IS DISTINCT FROM EXCLUDED.content_fingerprint
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT
+    COUNT(*) FILTER (WHERE inserted),
+    COUNT(*) FILTER (WHERE NOT inserted),
+    (SELECT COUNT(DISTINCT unique_key) FROM apartment_transactions_staging)
+FROM merged
+"""
+
+_VARCHAR_LIMITS = {
+    'unique_key': 255, 'district_code': 10, 'district_name': 50, 'dong_name': 50,
+    'apartment_name': 100, 'transaction_amount_display': 50, 'reg_date': 20
+}
+_BIGINT_COLUMNS = ('transaction_amount_won',)
+_INTEGER_COLUMNS = ('construction_year', 'floor', 'price_per_sqm', 'data_quality_score')
+_DECIMAL_COLUMNS = ('area_sqm', 'area_pyeong')
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _check_integer(value, bits: int) -> bool:
+    return value is None or (type(value) is int and -2 ** (bits - 1) <= value < 2 ** (bits - 1))
+
+
+def validate_transaction(transaction: Dict) -> Optional[str]:
+    """Return why a normalized transaction cannot be stored, or None if it can."""
+    if not isinstance(transaction.get('unique_key'), str) or not transaction['unique_key']:
+        return "missing unique_key"
+    for column in STORE_COLUMNS:
+        if column not in transaction:
+            return f"missing {column}"
+    for column, limit in _VARCHAR_LIMITS.items():
+        value = transaction[column]
+        if value is not None and (not isinstance(value, str) or len(value) > limit):
+            return f"{column} is not a string of at most {limit} characters"
+    for column in _BIGINT_COLUMNS:
+        if not _check_integer(transaction[column], 64):
+            return f"{column} is not a 64-bit integer"
+    for column in _INTEGER_COLUMNS:
+        if not _check_integer(transaction[column], 32):
+            return f"{column} is not a 32-bit integer"
+    for column in _DECIMAL_COLUMNS:
+        value = transaction[column]
+        if value is not None and (type(value) not in (int, float) or not abs(value) < 1e8):
+            return f"{column} does not fit DECIMAL(10,2)"
+    transaction_date = transaction['transaction_date']
+    if transaction_date is not None:
+        try:
+            date.fromisoformat(transaction_date)
+        except (TypeError, ValueError):
+            return "transaction_date is not an ISO date"
+    return None
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return '\\N'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def encode_copy_rows(transactions: Iterable[Dict]) -> Tuple[str, List[Tuple[Dict, str]]]:
+    """Encode valid transactions as COPY text-format lines with a seq column.
+
+    Returns (copy buffer, [(transaction, reason)] for rejected rows).
+    """
+    lines = []
+    rejected = []
+    for transaction in transactions:
+        reason = validate_transaction(transaction)
+        if reason:
+            rejected.append((transaction, reason))
+            continue
+        values = [str(len(lines))] + [_copy_value(transaction[column]) for column in STORE_COLUMNS]
+        values.append(transaction.get('content_fingerprint') or content_fingerprint(transaction))
+        lines.append('\t'.join(values))
+    return ''.join(f"{line}\n" for line in lines), rejected
+
+
+def reject_transactions(connection, rejected: List[Tuple[Dict, str]]):
+    for transaction, reason in rejected:
+        logging.warning(f"Rejected transaction {transaction.get('unique_key')}: {reason}")
+    if rejected:
+        connection.execute(text(REJECT_SQL), [{
+            'unique_key': str(transaction.get('unique_key'))[:255],
+            'reason': reason,
+            'record': json.dumps(transaction, ensure_ascii=False, default=str)
+        } for transaction, reason in rejected])
+
+
+def _bulk_upsert_batch(connection, batch: List[Dict], store_generation: int) -> Tuple[int, int, int, int]:
+    """COPY one batch into the staging table and merge it with a single upsert."""
+    buffer, rejected = encode_copy_rows(batch)
+    new_records = updated_records = unchanged_records = 0
+    if buffer:
+        connection.execute(text(CREATE_STAGING_SQL))
+        connection.execute(text("TRUNCATE apartment_transactions_staging"))
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY apartment_transactions_staging (seq, {', '.join(COPY_COLUMNS)}) FROM STDIN",
+                io.StringIO(buffer)
+            )
+        finally:
+            cursor.close()
+        new_records, updated_records, staged_keys = connection.execute(
+            text(MERGE_SQL), {'store_generation': store_generation}
+        ).one()
+        unchanged_records = staged_keys - new_records - updated_records
+    reject_transactions(connection, rejected)
+    return new_records, updated_records, len(rejected), unchanged_records
+
+
+def bulk_upsert_transactions(connection, transactions: Iterable[Dict], store_generation: int,
+                             batch_size: int = STORE_BATCH_SIZE) -> Tuple[int, int, int, int]:
+    """PostgreSQL bulk path: COPY each batch into a staging table, then INSERT ... ON CONFLICT DO UPDATE.
+
+    A batch whose merge still fails (a constraint the validation does not know
+    about) is rolled back to its savepoint and stored row by row, so only the
+    offending rows are rejected.
+    """
+    new_records = updated_records = failed_records = unchanged_records = 0
+    transactions = iter(transactions)
+    while True:
+        batch = list(islice(transactions, batch_size))
+        if not batch:
+            break
+        try:
+            with connection.begin_nested():
+                counts = _bulk_upsert_batch(connection, batch, store_generation)
+        except Exception as e:
+            logging.warning(f"Bulk upsert of {len(batch)} transactions failed, storing them row by row: {e}")
+            counts = store_transactions_row_by_row(connection, batch, store_generation)
+        new_records += counts[0]
+        updated_records += counts[1]
+        failed_records += counts[2]
+        unchanged_records += counts[3]
+    return new_records, updated_records, failed_records, unchanged_records
+
+
+def store_transactions_row_by_row(connection, transactions: Iterable[Dict], store_generation: int) -> Tuple[int, int, int, int]:
+    """Insert or update each transaction by unique_key in its own savepoint; failed rows are rejected."""
+    new_records = 0
+    updated_records = 0
+    unchanged_records = 0
+    rejected = []
+    
+    for transaction in transactions:
+        try:
+            with connection.begin_nested():
+                fingerprint = transaction.get('content_fingerprint') or content_fingerprint(transaction)
+                params = {**transaction, 'content_fingerprint': fingerprint, 'store_generation': store_generation}
+                # Check if record already exists
+                existing = connection.execute(text(CHECK_SQL), {'unique_key': transaction['unique_key']}).fetchone()
+                
+                if existing and existing[1] == fingerprint:
+                    # Same content already stored, nothing to write
+                    unchanged_records += 1
+                elif existing:
+                    # Update existing record
+                    connection.execute(text(UPDATE_SQL), params)
+                    updated_records += 1
+                else:
+                    # Insert new record
+                    connection.execute(text(INSERT_SQL), params)
+                    new_records += 1
+                
+        except Exception as e:
+            rejected.append((transaction, str(e).splitlines()[0] if str(e) else type(e).__name__))
+            continue
+    
+    reject_transactions(connection, rejected)
+    return new_records, updated_records, len(rejected), unchanged_records
+
+
+def next_store_generation(connection) -> int:
+    """Claim the next store generation for the current transaction.
+
+    The counter row stays locked until the transaction ends, so concurrent
+    stores commit their generations in order and a rolled back store gives its
+    number back.
+    """
+    connection.execute(text("UPDATE etl_store_generation SET generation = generation + 1 WHERE id = 1"))
+    return connection.execute(text("SELECT generation FROM etl_store_generation WHERE id = 1")).scalar_one()
+
+
+def store_transactions(connection, transactions: Iterable[Dict],
+                       store_generation: Optional[int] = None) -> Tuple[int, int, int, int]:
+    """Upsert transactions by unique_key; returns (new, updated, failed, unchanged). The caller commits.
+
+    PostgreSQL takes the COPY + ON CONFLICT bulk path; other databases fall back
+    to one statement per row. Rows whose content fingerprint matches the stored
+    one are not rewritten. Failed rows go to etl_rejected_transactions. Every
+    written row is stamped with the store generation (see key_index), and the
+    district_daily_stats days of the stored rows are recomputed (see rollups).
+    """
+    if store_generation is None:
+        store_generation = next_store_generation(connection)
+    ranges = DistrictDateRanges()
+    if connection.dialect.name == 'postgresql':
+        counts = bulk_upsert_transactions(connection, ranges.track(transactions), store_generation)
+    else:
+        counts = store_transactions_row_by_row(connection, ranges.track(transactions), store_generation)
+    new_records, updated_records = counts[0], counts[1]
+    if new_records or updated_records:
+        refresh_district_daily_stats(connection, ranges)
+    return counts
@@ -0,0 +1,160 @@
+"""
+Fused, single-process streaming mode of the Seoul apartment ETL pipeline.
+
+fetch -> normalize -> deduplicate -> store run as chained generators over
+fixed-size batches with no Celery hops in between, so peak memory is bounded by
+the batch size rather than the number of rows loaded. Intended for backfills and
+local runs:
+
+    python -m services.etl.streaming --start 202301 --end 202312 --batch-size 5000
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.common.secrets import secrets_manager
+from services.etl.rtms_client import RTMSClient, SEOUL_DISTRICTS
+from services.etl.backfill import BackfillCheckpoint, RTMSPageWalker, DEFAULT_PAGE_SIZE, month_range
+from services.etl.records import TransactionBatch
+from services.etl.transforms import deduplicate_batch
+from services.etl.columnar import normalize_batch
+from services.etl.key_index import KEY_INDEX_ENABLED, get_key_index, store_and_commit
+from services.common.metrics import observe_dedup, observe_rows
+from services.etl.migrations import ensure_schema
+from services.common.db import get_engine
+
+DEFAULT_BATCH_SIZE = int(os.environ.get('ETL_STREAM_BATCH_SIZE', '5000'))
+
+# (district_code, deal_ymd, page_no, row_count) of every page in a batch
+PageUnits = List[Tuple[str, str, int, int]]
+Batch = Tuple[PageUnits, TransactionBatch]
+
+
+def iter_raw_batches(pages: Iterable, batch_size: int) -> Iterator[Batch]:
+    """Group walker pages into batches of whole pages holding about batch_size rows."""
+    units, rows = [], TransactionBatch()
+    for district_code, deal_ymd, page_no, transactions in pages:
+        units.append((district_code, deal_ymd, page_no, len(transactions)))
+        rows.extend(transactions)
+        if len(rows) >= batch_size:
+            yield units, rows
+            units, rows = [], TransactionBatch()
+    if units:
+        yield units, rows
+
+
+def iter_normalized_batches(batches: Iterable[Batch], stats: Dict) -> Iterator[Batch]:
+    for units, rows in batches:
+        normalized = normalize_batch(rows)
+        observe_rows('etl', 'normalize', len(rows), len(normalized))
+        stats['raw_records_fetched'] += len(rows)
+        stats['normalized_records'] += len(normalized)
+        yield units, normalized
+
+
+def iter_deduplicated_batches(batches: Iterable[Batch], stats: Dict) -> Iterator[Batch]:
+    # Duplicates are collapsed within a batch; a key repeated across batches is
+    # resolved by the store step updating the existing row.
+    for units, rows in batches:
+        deduplicated, duplicates_found = deduplicate_batch(rows)
+        observe_dedup('etl', 'deduplicate', len(rows), duplicates_found)
+        stats['unique_records'] += len(deduplicated)
+        stats['duplicates_removed'] += duplicates_found
+        yield units, deduplicated
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+def run_streaming_pipeline(districts: List[str], months: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                           checkpoint: Optional[BackfillCheckpoint] = None, store: bool = True,
+                           client: Optional[RTMSClient] = None, page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+    """Run the whole pipeline in-process and return row counts, throughput and peak RSS."""
+    stats = {
+        'raw_records_fetched': 0,
+        'normalized_records': 0,
+        'unique_records': 0,
+        'duplicates_removed': 0,
+        'new_records_stored': 0,
+        'updated_records': 0,
+        'failed_records': 0,
+        'unchanged_records': 0,
+        'batches': 0,
+        'max_batch_rows': 0
+    }
+    started = time.monotonic()
+    client = client or RTMSClient(secrets_manager.get_kreb_api_key())
+
+    engine = None
+    if store:
+        engine = get_engine(secrets_manager.get_database_url())
+        ensure_schema(engine)
+
+    with client:
+        walker = RTMSPageWalker(client, page_size=page_size, checkpoint=checkpoint, mark_on_yield=False)
+        batches = iter_raw_batches(walker.walk(districts, months), batch_size)
+        batches = iter_deduplicated_batches(iter_normalized_batches(batches, stats), stats)
+
+        for units, rows in batches:
+            stats['batches'] += 1
+            stats['max_batch_rows'] = max(stats['max_batch_rows'], len(rows))
+            if engine is not None:
+                new_records, updated_records, failed_records, unchanged_records = store_and_commit(engine, rows)
+                stats['new_records_stored'] += new_records
+                stats['updated_records'] += updated_records
+                stats['failed_records'] += failed_records
+                stats['unchanged_records'] += unchanged_records
+            # Pages are checkpointed only once their batch is committed
+            if checkpoint:
+                for district_code, deal_ymd, page_no, row_count in units:
+                    checkpoint.mark_done(district_code, deal_ymd, page_no, row_count)
+
+    if checkpoint:
+        checkpoint.save()
+    if engine is not None and KEY_INDEX_ENABLED:
+        get_key_index(engine).save()
+
+    duration = time.monotonic() - started
+    stats.update({
+        'failed_pages': [f"{d}:{m}:{p}" for d, m, p in walker.failed_units],
+        'duration_seconds': round(duration, 2),
+        'rows_per_second': round(stats['raw_records_fetched'] / duration) if duration > 0 else 0,
+        'peak_rss_mb': peak_rss_mb()
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Seoul apartment ETL pipeline in a single streaming process.")
+    current_ym = datetime.now().strftime('%Y%m')
+    parser.add_argument('--start', default=current_ym, help="first DEAL_YMD month (YYYYMM)")
+    parser.add_argument('--end', default=current_ym, help="last DEAL_YMD month (YYYYMM)")
+    parser.add_argument('--districts', default=','.join(SEOUL_DISTRICTS), help="comma-separated LAWD_CD codes")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--checkpoint', help="checkpoint file; resumes a previous run with the same file")
+    parser.add_argument('--dry-run', action='store_true', help="fetch, normalize and deduplicate without storing")
+    args = parser.parse_args(argv)
+
+    checkpoint = BackfillCheckpoint(args.checkpoint) if args.checkpoint else None
+    stats = run_streaming_pipeline(
+        args.districts.split(','), month_range(args.start, args.end),
+        batch_size=args.batch_size, checkpoint=checkpoint, store=not args.dry_run
+    )
+    logging.info(f"Streaming pipeline finished: {stats['raw_records_fetched']} rows in {stats['duration_seconds']}s, "
+                 f"{stats['rows_per_second']} rows/s, peak RSS {stats['peak_rss_mb']} MB")
+    print(json.dumps(stats, indent=2))
+    return 0 if not stats['failed_pages'] and not stats['failed_records'] else 1
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -1,17 +1,36 @@
 from celery import shared_task
-from sqlalchemy import create_engine, text
+from celery.exceptions import Retry
 import logging
-import hashlib
-import json
 import sentry_sdk
 import os
 from prometheus_client import Counter
 import boto3
-from services.etl.secrets_manager import secrets_manager
+from services.common.secrets import secrets_manager
+from services.etl.rtms_client import RTMSClient, SEOUL_DISTRICTS
+from services.etl.resilience import RetryPolicy
+from services.etl.response_cache import get_response_cache
+from services.etl.backfill import BackfillCheckpoint, RTMSPageWalker, default_checkpoint_path, month_range
+from services.etl.watermarks import WatermarkStore, select_changed_partitions
+from services.etl.blob_store import StageOutput, get_blob_store, iter_payload_records, payload_count
+from services.etl.run_tracker import get_run_tracker, stage_span, tracked_stage
+from services.etl.transforms import deduplicate_batch
+from services.etl.records import TransactionBatch
+from services.etl.columnar import iter_normalized_records
+from services.etl.key_index import store_and_commit
+from services.etl.checksums import PartitionDigests, PartitionDigestStore, streaming_checksum
+from services.etl.migrations import ensure_schema
+from services.common.db import get_engine
+from services.common.metrics import observe_dedup, observe_rows
 
 # Prometheus Metrics
 etl_tasks_processed = Counter('etl_tasks_processed_total', 'Total number of ETL tasks processed', ['task_name', 'status'])
 
+# Task-level retries of the fetch tasks: jittered backoff from ETL_FETCH_RETRY_BASE_SECONDS
+FETCH_RETRY_POLICY = RetryPolicy(
+    base_delay=float(os.environ.get('ETL_FETCH_RETRY_BASE_SECONDS', '120')),
+    max_delay=float(os.environ.get('ETL_FETCH_RETRY_MAX_SECONDS', '900'))
+)
+
 # Configure main logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -23,163 +42,179 @@ alert_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 alert_handler.setFormatter(alert_formatter)
 etl_alert_logger.addHandler(alert_handler)
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=300)
-def fetch_seoul_apartment_data(self):
+def _nightly_fetch_months():
+    """DEAL_YMD months covering the last 30 days; the window can span two months"""
+    from datetime import datetime, timedelta
+    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=30)
+    return month_range(start_date.strftime('%Y%m'), end_date.strftime('%Y%m'))
+
+def _fetch_partitions(districts, months, fetched=None):
+    """Fetch every page of the given districts and months, reusing the partitions an earlier attempt checkpointed.
+    
+    Returns the fetched partitions and the set of partitions with a page that
+    failed even after its per-request retries.
+    """
+    fetched = fetched or {}
+    partitions = {}
+    for key, ref in fetched.items():
+        district_code, deal_ymd = key.split(':')
+        partitions[(district_code, deal_ymd)] = TransactionBatch.from_records(get_blob_store().iter_records(ref))
+    if fetched:
+        logging.info(f"Reusing {len(fetched)} partitions checkpointed by an earlier attempt")
+    
+    # Korean Real Estate Board (R-ONE) API endpoint
+    api_key = secrets_manager.get_kreb_api_key()
+    
+    # Every page of every (district, month) is fetched concurrently over a
+    # pooled session, so wall-clock time tracks the slowest district.
+    with RTMSClient(api_key) as client:
+        walker = RTMSPageWalker(client)
+        for district_code, deal_ymd, page_no, transactions in walker.walk(districts, months, skip=partitions.keys()):
+            partitions.setdefault((district_code, deal_ymd), TransactionBatch()).extend(transactions)
+            logging.info(f"Fetched {len(transactions)} transactions from district {district_code} ({deal_ymd} page {page_no})")
+    failed_partitions = {(district_code, deal_ymd) for district_code, deal_ymd, _ in walker.failed_units}
+    return partitions, failed_partitions
+
+def _checkpoint_partitions(partitions, failed_partitions, fetched=None):
+    """Claim checks for every completely fetched partition, passed to the task's retry"""
+    checkpoint = dict(fetched or {})
+    for (district_code, deal_ymd), transactions in partitions.items():
+        key = f"{district_code}:{deal_ymd}"
+        if (district_code, deal_ymd) not in failed_partitions and key not in checkpoint:
+            checkpoint[key] = get_blob_store().put_records(transactions)
+    return checkpoint
+
+def _fetch_changed_partitions(task, districts, months, use_watermarks=True, fetched=None):
+    """Fetch the given districts and months and return a stage payload of the changed partitions.
+    
+    If some partitions still failed after their per-request retries, the task is
+    retried with the complete partitions checkpointed, so the retry only
+    re-fetches the failed ones. Once the task's retries run out, the partial
+    result is passed on as before.
+    """
+    from datetime import datetime
+    
+    partitions, failed_partitions = _fetch_partitions(districts, months, fetched)
+    if failed_partitions and task.request.retries < task.max_retries:
+        checkpoint = _checkpoint_partitions(partitions, failed_partitions, fetched)
+        countdown = FETCH_RETRY_POLICY.delay(task.request.retries)
+        logging.warning(f"{len(failed_partitions)} partitions failed, retrying them in {countdown:.0f}s "
+                        f"with {len(checkpoint)} partitions checkpointed")
+        raise task.retry(kwargs={**(task.request.kwargs or {}), 'fetched': checkpoint}, countdown=countdown)
+    if failed_partitions:
+        etl_alert_logger.error(f"ETL Alert: {len(failed_partitions)} partitions still failed after "
+                               f"{task.request.retries} retries and will be fetched again next run")
+    
+    # Only partitions whose response fingerprint moved since the last stored
+    # run are passed downstream
+    watermarks = {}
+    if use_watermarks:
+        engine = get_engine(secrets_manager.get_database_url())
+        ensure_schema(engine)
+        watermarks = WatermarkStore(engine).load(months)
+    changed, unchanged = select_changed_partitions(partitions, watermarks)
+    
+    # The fetched rows travel to the next stage as a claim check on the
+    # blob store instead of through the Celery result backend
+    changed_partitions = []
+    with StageOutput(as_blob=True) as output:
+        for key, transactions, fingerprint in changed:
+            output.extend(transactions)
+            # A partition with a failed page is stored but its watermark is not
+            # advanced, so the next run fetches it again in full
+            if key not in failed_partitions:
+                changed_partitions.append(fingerprint)
+        data = output.finish('data')
+    
+    fetched_count = sum(len(t) for t in partitions.values())
+    observe_rows('etl', 'fetch', fetched_count, output.count)
+    logging.info(f"Total transactions fetched: {fetched_count}, "
+                 f"{output.count} in {len(changed)} changed partitions, {len(unchanged)} partitions unchanged")
+    
+    return {
+        **data,
+        "count": output.count,
+        "partitions": changed_partitions,
+        "unchanged_partitions": len(unchanged),
+        "failed_partitions": sorted(f"{district_code}:{deal_ymd}" for district_code, deal_ymd in failed_partitions),
+        "fetch_date": datetime.now().isoformat()
+    }
+
+@shared_task(bind=True, max_retries=3)
+def fetch_seoul_apartment_data(self, use_watermarks=True, fetched=None):
     try:
-        import requests
-        from datetime import datetime, timedelta
-        
         logging.info("Fetching Seoul apartment transaction data from government API")
         
-        # Korean Real Estate Board (R-ONE) API endpoint
-        api_key = secrets_manager.get_kreb_api_key()
-        
-        base_url = "http://apis.data.go.kr/1613000/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev"
-        
-        # Fetch data for last 30 days to ensure we get recent transactions
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
-        
-        # Seoul district codes (구)
-        seoul_districts = [
-            "11110", "11140", "11170", "11200", "11215", "11230", "11260", "11290",
-            "11305", "11320", "11350", "11380", "11410", "11440", "11470", "11500",
-            "11530", "11545", "11560", "11590", "11620", "11650", "11680", "11710", "11740"
-        ]
-        
-        all_transactions = []
-        
-        for district_code in seoul_districts:
-            params = {
-                'serviceKey': api_key,
-                'LAWD_CD': district_code,
-                'DEAL_YMD': start_date.strftime('%Y%m'),
-                'numOfRows': '1000',
-                'pageNo': '1'
-            }
-            
-            try:
-                response = requests.get(base_url, params=params, timeout=30)
-                response.raise_for_status()
-                
-                # Parse XML response
-                import xml.etree.ElementTree as ET
-                root = ET.fromstring(response.content)
-                
-                items = root.findall('.//item')
-                for item in items:
-                    transaction = {
-                        'district_code': district_code,
-                        'apartment_name': item.find('아파트').text if item.find('아파트') is not None else '',
-                        'transaction_amount': item.find('거래금액').text if item.find('거래금액') is not None else '',
-                        'construction_year': item.find('건축년도').text if item.find('건축년도') is not None else '',
-                        'transaction_date': f"{item.find('년').text}-{item.find('월').text.zfill(2)}-{item.find('일').text.zfill(2)}" 
-                                          if all(item.find(x) is not None for x in ['년', '월', '일']) else '',
-                        'area_sqm': item.find('전용면적').text if item.find('전용면적') is not None else '',
-                        'district_name': item.find('시군구').text if item.find('시군구') is not None else '',
-                        'dong_name': item.find('법정동').text if item.find('법정동') is not None else '',
-                        'floor': item.find('층').text if item.find('층') is not None else '',
-                        'reg_date': item.find('등기날짜').text if item.find('등기날짜') is not None else ''
-                    }
-                    all_transactions.append(transaction)
-                    
-                logging.info(f"Fetched {len(items)} transactions from district {district_code}")
-                
-            except requests.exceptions.RequestException as e:
-                logging.warning(f"Failed to fetch data for district {district_code}: {e}")
-                continue
-        
-        logging.info(f"Total transactions fetched: {len(all_transactions)}")
+        with stage_span(None, 'fetch'):
+            fetch_result = _fetch_changed_partitions(self, SEOUL_DISTRICTS, _nightly_fetch_months(), use_watermarks, fetched)
         etl_tasks_processed.labels('fetch_seoul_apartment_data', 'success').inc()
         
         return {
             "message": f"Seoul apartment data fetched successfully",
-            "data": all_transactions,
-            "count": len(all_transactions),
-            "fetch_date": datetime.now().isoformat()
+            **fetch_result
         }
         
+    except Retry:
+        raise
     except Exception as e:
         logging.error(f"Error fetching Seoul apartment data: {e}")
         sentry_sdk.capture_exception(e)
         etl_alert_logger.error(f"ETL Alert: Error in fetch_seoul_apartment_data: {e}")
         etl_tasks_processed.labels('fetch_seoul_apartment_data', 'failure').inc()
-        raise self.retry(exc=e)
+        raise self.retry(exc=e, countdown=FETCH_RETRY_POLICY.delay(self.request.retries))
 
-@shared_task
-def normalize_seoul_apartment_data(raw_data):
+@shared_task(bind=True, max_retries=3)
+def fetch_seoul_district_data(self, district_code, months, run_id=None, use_watermarks=True, fetched=None):
+    """Fetch one district's changed partitions; the head of each per-district chain of the pipeline DAG"""
     try:
-        import re
-        from datetime import datetime
+        with stage_span(run_id, 'fetch', district_code):
+            fetch_result = _fetch_changed_partitions(self, [district_code], months, use_watermarks, fetched)
+        etl_tasks_processed.labels('fetch_seoul_district_data', 'success').inc()
         
-        logging.info(f"Normalizing {len(raw_data.get('data', []))} Seoul apartment transactions")
+        return {
+            "message": f"Seoul apartment data fetched successfully for district {district_code}",
+            **fetch_result,
+            "run_id": run_id,
+            "district_code": district_code
+        }
         
-        normalized_transactions = []
+    except Retry:
+        raise
+    except Exception as e:
+        logging.error(f"Error fetching Seoul apartment data for district {district_code}: {e}")
+        sentry_sdk.capture_exception(e)
+        etl_alert_logger.error(f"ETL Alert: Error in fetch_seoul_district_data for district {district_code}: {e}")
+        etl_tasks_processed.labels('fetch_seoul_district_data', 'failure').inc()
+        raise self.retry(exc=e, countdown=FETCH_RETRY_POLICY.delay(self.request.retries))
+
+def _carried(payload):
+    """Run metadata every stage passes through to the next one"""
+    return {key: payload[key] for key in ('run_id', 'district_code', 'partitions', 'unchanged_partitions') if key in payload}
+
+@shared_task
+@tracked_stage('normalize')
+def normalize_seoul_apartment_data(raw_data):
+    try:
+        original_count = payload_count(raw_data, 'data')
+        logging.info(f"Normalizing {original_count} Seoul apartment transactions")
         
-        for transaction in raw_data.get('data', []):
-            try:
-                # Normalize transaction amount (remove commas, convert to integer)
-                amount_str = transaction.get('transaction_amount', '').replace(',', '').strip()
-                amount_won = int(amount_str) * 10000 if amount_str.isdigit() else 0  # Convert 만원 to won
-                
-                # Normalize area (convert to float)
-                area_str = transaction.get('area_sqm', '').strip()
-                area_sqm = float(area_str) if area_str.replace('.', '').isdigit() else 0.0
-                
-                # Normalize construction year
-                construction_year_str = transaction.get('construction_year', '').strip()
-                construction_year = int(construction_year_str) if construction_year_str.isdigit() else None
-                
-                # Normalize floor
-                floor_str = transaction.get('floor', '').strip()
-                floor_num = int(floor_str) if floor_str.isdigit() else None
-                
-                # Parse and validate transaction date
-                transaction_date_str = transaction.get('transaction_date', '').strip()
-                transaction_date = None
-                if transaction_date_str:
-                    try:
-                        transaction_date = datetime.strptime(transaction_date_str, '%Y-%m-%d').date()
-                    except ValueError:
-                        logging.warning(f"Invalid date format: {transaction_date_str}")
-                
-                # Create unique identifier for deduplication
-                unique_key = f"{transaction.get('district_code')}_{transaction.get('apartment_name')}_{transaction_date_str}_{amount_won}_{area_sqm}"
-                
-                normalized_transaction = {
-                    'unique_key': unique_key,
-                    'district_code': transaction.get('district_code', '').strip(),
-                    'district_name': transaction.get('district_name', '').strip(),
-                    'dong_name': transaction.get('dong_name', '').strip(),
-                    'apartment_name': transaction.get('apartment_name', '').strip(),
-                    'transaction_amount_won': amount_won,
-                    'transaction_amount_display': f"{amount_won:,}원" if amount_won > 0 else '',
-                    'area_sqm': area_sqm,
-                    'area_pyeong': round(area_sqm / 3.3058, 2) if area_sqm > 0 else 0.0,  # Convert to 평
-                    'construction_year': construction_year,
-                    'floor': floor_num,
-                    'transaction_date': transaction_date.isoformat() if transaction_date else None,
-                    'reg_date': transaction.get('reg_date', '').strip(),
-                    'price_per_sqm': round(amount_won / area_sqm) if area_sqm > 0 and amount_won > 0 else 0,
-                    'created_at': datetime.now().isoformat(),
-                    'data_quality_score': calculate_data_quality_score(transaction, amount_won, area_sqm, construction_year)
-                }
-                
-                normalized_transactions.append(normalized_transaction)
-                
-            except Exception as e:
-                logging.warning(f"Failed to normalize transaction: {transaction}. Error: {e}")
-                continue
+        with StageOutput.like(raw_data, 'data') as normalized_transactions:
+            normalized_transactions.extend(iter_normalized_records(iter_payload_records(raw_data, 'data')))
+            normalized_data = normalized_transactions.finish('normalized_data')
         
-        logging.info(f"Successfully normalized {len(normalized_transactions)} transactions")
+        observe_rows('etl', 'normalize', original_count, normalized_transactions.count)
+        logging.info(f"Successfully normalized {normalized_transactions.count} transactions")
         etl_tasks_processed.labels('normalize_seoul_apartment_data', 'success').inc()
         
         return {
             "message": f"Seoul apartment data normalized successfully",
-            "normalized_data": normalized_transactions,
-            "count": len(normalized_transactions),
-            "original_count": len(raw_data.get('data', [])),
-            "normalization_success_rate": len(normalized_transactions) / len(raw_data.get('data', [])) if raw_data.get('data') else 0
+            **normalized_data,
+            "count": normalized_transactions.count,
+            "original_count": original_count,
+            **_carried(raw_data),
+            "normalization_success_rate": normalized_transactions.count / original_count if original_count else 0
         }
         
     except Exception as e:
@@ -189,59 +224,33 @@ def normalize_seoul_apartment_data(raw_data):
         etl_tasks_processed.labels('normalize_seoul_apartment_data', 'failure').inc()
         raise
 
-def calculate_data_quality_score(transaction, amount_won, area_sqm, construction_year):
-    """Calculate data quality score (0-100) based on completeness and validity"""
-    score = 0
-    
-    # Required fields scoring
-    if transaction.get('apartment_name', '').strip(): score += 20
-    if amount_won > 0: score += 25
-    if area_sqm > 0: score += 20
-    if transaction.get('transaction_date', '').strip(): score += 15
-    if transaction.get('district_name', '').strip(): score += 10
-    if construction_year and 1950 <= construction_year <= 2024: score += 10
-    
-    return score
-
 @shared_task
+@tracked_stage('deduplicate')
 def deduplicate_seoul_apartment_records(normalized_data):
     try:
-        logging.info(f"Deduplicating {len(normalized_data.get('normalized_data', []))} Seoul apartment records")
-        
-        transactions = normalized_data.get('normalized_data', [])
-        unique_transactions = {}
-        duplicates_found = 0
-        
-        for transaction in transactions:
-            unique_key = transaction.get('unique_key')
-            
-            if unique_key in unique_transactions:
-                # If duplicate found, keep the one with higher data quality score
-                existing_score = unique_transactions[unique_key].get('data_quality_score', 0)
-                current_score = transaction.get('data_quality_score', 0)
-                
-                if current_score > existing_score:
-                    unique_transactions[unique_key] = transaction
-                    
-                duplicates_found += 1
-                logging.debug(f"Duplicate found for key: {unique_key}")
-            else:
-                unique_transactions[unique_key] = transaction
+        total_count = payload_count(normalized_data, 'normalized_data')
+        logging.info(f"Deduplicating {total_count} Seoul apartment records")
         
-        deduplicated_list = list(unique_transactions.values())
+        transactions = TransactionBatch.from_records(iter_payload_records(normalized_data, 'normalized_data'))
+        deduplicated, duplicates_found = deduplicate_batch(transactions)
         
-        # Sort by transaction date descending
-        deduplicated_list.sort(key=lambda x: x.get('transaction_date', ''), reverse=True)
+        with StageOutput.like(normalized_data, 'normalized_data') as output:
+            output.extend(deduplicated)
+            deduplicated_data = output.finish('deduplicated_data')
         
-        logging.info(f"Deduplication complete: {len(deduplicated_list)} unique records, {duplicates_found} duplicates removed")
+        observe_dedup('etl', 'deduplicate', total_count, duplicates_found)
+        logging.info(f"Deduplication complete: {len(deduplicated)} unique records, {duplicates_found} duplicates removed")
         etl_tasks_processed.labels('deduplicate_seoul_apartment_records', 'success').inc()
         
         return {
             "message": "Seoul apartment data deduplicated successfully",
-            "deduplicated_data": deduplicated_list,
-            "unique_count": len(deduplicated_list),
+            **deduplicated_data,
+            "unique_count": len(deduplicated),
             "duplicates_removed": duplicates_found,
-            "deduplication_rate": (duplicates_found / len(transactions)) * 100 if transactions else 0
+            "deduplication_rate": (duplicates_found / total_count) * 100 if total_count else 0,
+            "fetched_count": normalized_data.get('original_count', 0),
+            "normalized_count": total_count,
+            **_carried(normalized_data)
         }
         
     except Exception as e:
@@ -252,115 +261,80 @@ def deduplicate_seoul_apartment_records(normalized_data):
         raise
 
 @shared_task
-def store_seoul_apartment_data_in_postgresql(deduplicated_data):
+@tracked_stage('store')
+def store_seoul_apartment_data_in_postgresql(deduplicated_data, persist_digests=True):
+    """
+    Store deduplicated records. Accepts one deduplication result, or the list of
+    per-district results a chord joins into this step. Callers storing a partition
+    in several pieces pass persist_digests=False and persist whole-partition digests
+    themselves (see backfill_seoul_apartment_data).
+    """
     try:
         from datetime import datetime
+        from itertools import chain as chain_iterables
+        from uuid import uuid4
+        
+        payloads = deduplicated_data if isinstance(deduplicated_data, list) else [deduplicated_data]
+        total_count = sum(payload_count(payload, 'deduplicated_data') for payload in payloads)
+        transactions = chain_iterables.from_iterable(iter_payload_records(payload, 'deduplicated_data') for payload in payloads)
+        partitions = [partition for payload in payloads for partition in payload.get('partitions', [])]
+        stage_counts = {
+            'raw_records_fetched': sum(payload.get('fetched_count', 0) for payload in payloads),
+            'normalized_records': sum(payload.get('normalized_count', 0) for payload in payloads),
+            'unique_records': sum(payload.get('unique_count', 0) for payload in payloads),
+            'duplicates_removed': sum(payload.get('duplicates_removed', 0) for payload in payloads),
+            'changed_partitions': len(partitions),
+            'unchanged_partitions': sum(payload.get('unchanged_partitions', 0) for payload in payloads)
+        }
+        run_id = next((payload['run_id'] for payload in payloads if payload.get('run_id')), None)
+        
+        if not total_count and not partitions:
+            logging.info("No changed Seoul apartment records to store")
+            etl_tasks_processed.labels('store_seoul_apartment_data_in_postgresql', 'success').inc()
+            return {
+                "message": "No Seoul apartment data to store",
+                "new_records": 0,
+                "updated_records": 0,
+                "failed_records": 0,
+                "total_processed": 0,
+                "stage_counts": stage_counts,
+                "run_id": run_id,
+                "storage_timestamp": datetime.now().isoformat()
+            }
         
-        transactions = deduplicated_data.get('deduplicated_data', [])
-        logging.info(f"Storing {len(transactions)} Seoul apartment records in PostgreSQL")
-        
-        # Get database connection
-        database_url = secrets_manager.get_database_url()
-        
-        engine = create_engine(database_url)
-        
-        # Create apartment_transactions table if it doesn't exist
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS apartment_transactions (
-            id SERIAL PRIMARY KEY,
-            unique_key VARCHAR(255) UNIQUE NOT NULL,
-            district_code VARCHAR(10),
-            district_name VARCHAR(50),
-            dong_name VARCHAR(50),
-            apartment_name VARCHAR(100),
-            transaction_amount_won BIGINT,
-            transaction_amount_display VARCHAR(50),
-            area_sqm DECIMAL(10,2),
-            area_pyeong DECIMAL(10,2),
-            construction_year INTEGER,
-            floor INTEGER,
-            transaction_date DATE,
-            reg_date VARCHAR(20),
-            price_per_sqm INTEGER,
-            data_quality_score INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX idx_district_code (district_code),
-            INDEX idx_transaction_date (transaction_date),
-            INDEX idx_apartment_name (apartment_name),
-            INDEX idx_price_range (transaction_amount_won)
-        );
-        """
+        logging.info(f"Storing {total_count} Seoul apartment records in PostgreSQL")
         
-        new_records = 0
-        updated_records = 0
+        # Pooled process-wide engine; the schema is migrated once per process
+        engine = get_engine(secrets_manager.get_database_url())
+        ensure_schema(engine)
         
-        with engine.connect() as connection:
-            # Create table
-            connection.execute(text(create_table_sql))
-            connection.commit()
-            
-            for transaction in transactions:
-                try:
-                    # Check if record already exists
-                    check_sql = "SELECT id FROM apartment_transactions WHERE unique_key = :unique_key"
-                    existing = connection.execute(text(check_sql), unique_key=transaction['unique_key']).fetchone()
-                    
-                    if existing:
-                        # Update existing record
-                        update_sql = """
-                        UPDATE apartment_transactions SET
-                            district_code = :district_code,
-                            district_name = :district_name,
-                            dong_name = :dong_name,
-                            apartment_name = :apartment_name,
-                            transaction_amount_won = :transaction_amount_won,
-                            transaction_amount_display = :transaction_amount_display,
-                            area_sqm = :area_sqm,
-                            area_pyeong = :area_pyeong,
-                            construction_year = :construction_year,
-                            floor = :floor,
-                            transaction_date = :transaction_date,
-                            reg_date = :reg_date,
-                            price_per_sqm = :price_per_sqm,
-                            data_quality_score = :data_quality_score,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE unique_key = :unique_key
-                        """
-                        connection.execute(text(update_sql), **transaction)
-                        updated_records += 1
-                    else:
-                        # Insert new record
-                        insert_sql = """
-                        INSERT INTO apartment_transactions (
-                            unique_key, district_code, district_name, dong_name, apartment_name,
-                            transaction_amount_won, transaction_amount_display, area_sqm, area_pyeong,
-                            construction_year, floor, transaction_date, reg_date, price_per_sqm,
-                            data_quality_score
-                        ) VALUES (
-                            :unique_key, :district_code, :district_name, :dong_name, :apartment_name,
-                            :transaction_amount_won, :transaction_amount_display, :area_sqm, :area_pyeong,
-                            :construction_year, :floor, :transaction_date, :reg_date, :price_per_sqm,
-                            :data_quality_score
-                        )
-                        """
-                        connection.execute(text(insert_sql), **transaction)
-                        new_records += 1
-                        
-                except Exception as e:
-                    logging.warning(f"Failed to store transaction {transaction.get('unique_key')}: {e}")
-                    continue
-            
-            connection.commit()
+        # Rows the stored-key index knows are unchanged never reach the database
+        digests = PartitionDigests()
+        new_records, updated_records, failed_records, unchanged_records = store_and_commit(engine, digests.observe(transactions))
+        if persist_digests:
+            partition_digests = PartitionDigestStore(engine).save(run_id or f"adhoc-{uuid4().hex}", digests)
+        else:
+            partition_digests = digests.summary()
+        
+        # Advance the watermarks only once every row of the partitions is committed
+        if partitions and not failed_records:
+            WatermarkStore(engine).save(partitions)
         
-        logging.info(f"Successfully stored Seoul apartment data: {new_records} new, {updated_records} updated")
+        observe_rows('etl', 'store', total_count, new_records + updated_records)
+        logging.info(f"Successfully stored Seoul apartment data: {new_records} new, {updated_records} updated, "
+                     f"{unchanged_records} unchanged")
         etl_tasks_processed.labels('store_seoul_apartment_data_in_postgresql', 'success').inc()
         
         return {
             "message": "Seoul apartment data stored in PostgreSQL successfully",
             "new_records": new_records,
             "updated_records": updated_records,
-            "total_processed": len(transactions),
+            "failed_records": failed_records,
+            "unchanged_records": unchanged_records,
+            "total_processed": total_count,
+            "stage_counts": stage_counts,
+            "partition_digests": partition_digests,
+            "run_id": run_id,
             "storage_timestamp": datetime.now().isoformat()
         }
         
@@ -373,22 +347,32 @@ def store_seoul_apartment_data_in_postgresql(deduplicated_data):
 
 @shared_task
 def add_checksum_and_audit_log(data):
+    """
+    Audit record of processed data. Records carried by the payload (inline or as a
+    claim check) are hashed one at a time; partition digests and their Merkle root
+    computed by the store step are copied in. Only digests are logged, never data.
+    """
     try:
-        # Calculate checksum
-        data_str = json.dumps(data, sort_keys=True)
-        checksum = hashlib.sha256(data_str.encode('utf-8')).hexdigest()
-        logging.info(f"Calculated checksum: {checksum} for data: {data}")
+        from datetime import datetime
+        
+        # Calculate checksum incrementally over the records, or over the payload itself
+        records = iter_payload_records(data, 'data') if ('data' in data or 'data_ref' in data) else [data]
+        checksum = streaming_checksum(records)
+        partition_digests = data.get('partition_digests') or {}
+        logging.info(f"Calculated checksum: {checksum}, merkle root: {partition_digests.get('merkle_root')}")
 
-        # Placeholder for audit logging
         audit_log_entry = {
-            "timestamp": "", # Add actual timestamp
+            "timestamp": datetime.now().isoformat(),
             "event": "data_processed",
+            "run_id": data.get('run_id'),
             "data_checksum": checksum,
-            "data_summary": str(data)[:100], # Log a summary or hash of data
+            "merkle_root": partition_digests.get('merkle_root'),
+            "partition_digests": {key: leaf['digest'] for key, leaf in partition_digests.get('partitions', {}).items()},
             "user": "system", # Or actual user if applicable
             "status": "success"
         }
-        logging.info(f"Audit log entry: {audit_log_entry}")
+        logging.info(f"Audit log entry for run {audit_log_entry['run_id']}: checksum {checksum}, "
+                     f"{len(audit_log_entry['partition_digests'])} partition digests")
         etl_tasks_processed.labels('add_checksum_and_audit_log', 'success').inc()
         return {"message": "Checksum calculated and audit log entry created", "checksum": checksum, "audit_log": audit_log_entry}
     except Exception as e:
@@ -399,74 +383,154 @@ def add_checksum_and_audit_log(data):
         raise
 
 @shared_task
-def run_seoul_apartment_etl_pipeline():
+def backfill_seoul_apartment_data(start_ym, end_ym, checkpoint_path=None, districts=None):
     """
-    Complete ETL pipeline for Seoul apartment transaction data
-    Orchestrates: fetch -> normalize -> deduplicate -> store -> audit
+    Historical load of every page of every DEAL_YMD month from start_ym to end_ym (YYYYMM).
+    (district, month, page) units are fetched in parallel and each page is normalized,
+    deduplicated and stored before it is checkpointed, so re-running the task with the
+    same range resumes where an interrupted run stopped.
     """
     try:
         from datetime import datetime
+        from uuid import uuid4
         
-        logging.info("Starting Seoul apartment ETL pipeline")
-        pipeline_start = datetime.now()
-        
-        # Step 1: Fetch data from Korean government API
-        logging.info("ETL Step 1: Fetching Seoul apartment data")
-        raw_data = fetch_seoul_apartment_data.delay().get()
-        
-        if not raw_data.get('data'):
-            raise ValueError("No data fetched from API")
-        
-        # Step 2: Normalize data
-        logging.info("ETL Step 2: Normalizing data")
-        normalized_data = normalize_seoul_apartment_data.delay(raw_data).get()
-        
-        # Step 3: Deduplicate records
-        logging.info("ETL Step 3: Deduplicating records")
-        deduplicated_data = deduplicate_seoul_apartment_records.delay(normalized_data).get()
-        
-        # Step 4: Store in PostgreSQL
-        logging.info("ETL Step 4: Storing in database")
-        storage_result = store_seoul_apartment_data_in_postgresql.delay(deduplicated_data).get()
-        
-        # Step 5: Create audit log
-        logging.info("ETL Step 5: Creating audit log")
-        pipeline_summary = {
-            'pipeline_start': pipeline_start.isoformat(),
-            'pipeline_end': datetime.now().isoformat(),
-            'raw_records_fetched': raw_data.get('count', 0),
-            'normalized_records': normalized_data.get('count', 0),
-            'unique_records': deduplicated_data.get('unique_count', 0),
-            'duplicates_removed': deduplicated_data.get('duplicates_removed', 0),
-            'new_records_stored': storage_result.get('new_records', 0),
-            'updated_records': storage_result.get('updated_records', 0),
-            'data_quality_passed': True
-        }
+        months = month_range(start_ym, end_ym)
+        districts = districts or SEOUL_DISTRICTS
+        checkpoint = BackfillCheckpoint(checkpoint_path or default_checkpoint_path(start_ym, end_ym))
+        logging.info(f"Starting RTMS backfill for {len(districts)} districts x {len(months)} months, checkpoint {checkpoint.path}")
         
-        audit_result = add_checksum_and_audit_log.delay(pipeline_summary).get()
+        backfill_start = datetime.now()
+        pages_loaded = 0
+        records_fetched = 0
+        new_records = 0
+        updated_records = 0
+        # Partitions are stored page by page; their digests are persisted once, whole, at the end
+        run_id = uuid4().hex
+        stored_partitions = set()
+        
+        with RTMSClient(secrets_manager.get_kreb_api_key()) as client:
+            walker = RTMSPageWalker(client, checkpoint=checkpoint)
+            for district_code, deal_ymd, page_no, transactions in walker.walk(districts, months):
+                pages_loaded += 1
+                records_fetched += len(transactions)
+                if not transactions:
+                    continue
+                
+                normalized_data = normalize_seoul_apartment_data({'data': transactions})
+                deduplicated_data = deduplicate_seoul_apartment_records(normalized_data)
+                storage_result = store_seoul_apartment_data_in_postgresql(deduplicated_data, persist_digests=False)
+                stored_partitions.add((district_code, deal_ymd))
+                new_records += storage_result.get('new_records', 0)
+                updated_records += storage_result.get('updated_records', 0)
+                
+                if pages_loaded % 100 == 0:
+                    logging.info(f"Backfill progress: {pages_loaded} pages, {records_fetched} records")
+        
+        failed_units = [f"{d}:{m}:{p}" for d, m, p in walker.failed_units]
+        # A partition with unfetched pages gets its digest when a resumed run completes it
+        complete_partitions = stored_partitions - {(d, m) for d, m, _ in walker.failed_units}
+        partition_digests = {}
+        if complete_partitions:
+            engine = get_engine(secrets_manager.get_database_url())
+            partition_digests = PartitionDigestStore(engine).save_table_digests(run_id, sorted(complete_partitions))
+        if failed_units:
+            etl_alert_logger.error(f"ETL Alert: Backfill {start_ym}-{end_ym} left {len(failed_units)} pages unfetched; re-run to resume")
+        
+        duration = (datetime.now() - backfill_start).total_seconds()
+        logging.info(f"Backfill {start_ym}-{end_ym} finished in {duration:.2f} seconds: {pages_loaded} pages, {records_fetched} records")
+        etl_tasks_processed.labels('backfill_seoul_apartment_data', 'success' if not failed_units else 'partial').inc()
         
-        pipeline_duration = (datetime.now() - pipeline_start).total_seconds()
+        return {
+            "message": "Seoul apartment backfill completed" if not failed_units else "Seoul apartment backfill incomplete, re-run to resume",
+            "months": len(months),
+            "pages_loaded": pages_loaded,
+            "records_fetched": records_fetched,
+            "new_records": new_records,
+            "updated_records": updated_records,
+            "failed_units": failed_units,
+            "run_id": run_id,
+            "merkle_root": partition_digests.get('merkle_root'),
+            "checkpoint_path": checkpoint.path,
+            "duration_seconds": duration
+        }
         
-        # Step 6: Check price alert triggers after new data is processed
-        logging.info("ETL Step 6: Checking price alert triggers")
-        try:
-            # Make HTTP request to backend API to check alert triggers
-            import requests
-            backend_url = os.environ.get("BACKEND_API_URL", "http://localhost:3001")
-            alert_response = requests.post(f"{backend_url}/api/alerts/check-triggers", timeout=30)
+    except Exception as e:
+        logging.error(f"Seoul apartment backfill failed: {e}")
+        sentry_sdk.capture_exception(e)
+        etl_alert_logger.error(f"ETL Alert: Seoul apartment backfill {start_ym}-{end_ym} failed: {e}")
+        etl_tasks_processed.labels('backfill_seoul_apartment_data', 'failure').inc()
+        raise
+
+def _check_price_alert_triggers(pipeline_summary):
+    """Ask the backend to evaluate price alerts against the newly stored data"""
+    try:
+        # Make HTTP request to backend API to check alert triggers
+        import requests
+        backend_url = os.environ.get("BACKEND_API_URL", "http://localhost:3001")
+        alert_response = requests.post(f"{backend_url}/api/alerts/check-triggers", timeout=30)
+        
+        if alert_response.status_code == 200:
+            alert_result = alert_response.json()
+            logging.info(f"Alert check completed: {alert_result.get('message', 'No details')}")
+            pipeline_summary['alerts_checked'] = alert_result.get('total_alerts', 0)
+            pipeline_summary['alerts_triggered'] = alert_result.get('triggered_alerts', 0)
+        else:
+            logging.warning(f"Alert check failed with status {alert_response.status_code}")
+    except Exception as e:
+        logging.warning(f"Failed to check alert triggers: {e}")
+        # Don't fail the entire pipeline if alert checking fails
+
+def build_seoul_apartment_etl_workflow(run_id, months, pipeline_start, districts=None):
+    """
+    Declarative DAG of the Seoul ETL pipeline:
+    per district (fetch -> normalize -> deduplicate) in parallel, joined by a chord
+    into a single store step, then audit and alert checks.
+    """
+    from celery import chain, chord, group
+    
+    district_chains = group(
+        chain(
+            fetch_seoul_district_data.s(district_code, months, run_id=run_id),
+            normalize_seoul_apartment_data.s(),
+            deduplicate_seoul_apartment_records.s()
+        )
+        for district_code in (districts or SEOUL_DISTRICTS)
+    )
+    return chord(district_chains, store_seoul_apartment_data_in_postgresql.s()) | finalize_seoul_apartment_etl_run.s(run_id, pipeline_start)
+
+@shared_task
+def finalize_seoul_apartment_etl_run(storage_result, run_id, pipeline_start):
+    """Final node of the pipeline DAG: audit log and price alert checks"""
+    try:
+        from datetime import datetime
+        
+        with stage_span(run_id, 'finalize'):
+            stage_counts = storage_result.get('stage_counts', {})
+            pipeline_summary = {
+                'run_id': run_id,
+                'pipeline_start': pipeline_start,
+                'pipeline_end': datetime.now().isoformat(),
+                **stage_counts,
+                'new_records_stored': storage_result.get('new_records', 0),
+                'updated_records': storage_result.get('updated_records', 0),
+                'unchanged_records': storage_result.get('unchanged_records', 0),
+                'partition_digests': storage_result.get('partition_digests', {}),
+                'data_quality_passed': not storage_result.get('failed_records', 0)
+            }
+            
+            logging.info("ETL Step 5: Creating audit log")
+            audit_result = add_checksum_and_audit_log(pipeline_summary)
             
-            if alert_response.status_code == 200:
-                alert_result = alert_response.json()
-                logging.info(f"Alert check completed: {alert_result.get('message', 'No details')}")
-                pipeline_summary['alerts_checked'] = alert_result.get('total_alerts', 0)
-                pipeline_summary['alerts_triggered'] = alert_result.get('triggered_alerts', 0)
+            # Step 6: Check price alert triggers after new data is processed
+            if pipeline_summary['new_records_stored'] or pipeline_summary['updated_records']:
+                logging.info("ETL Step 6: Checking price alert triggers")
+                _check_price_alert_triggers(pipeline_summary)
             else:
-                logging.warning(f"Alert check failed with status {alert_response.status_code}")
-        except Exception as e:
-            logging.warning(f"Failed to check alert triggers: {e}")
-            # Don't fail the entire pipeline if alert checking fails
+                # Quiet night: every partition matched its watermark, nothing new to alert on
+                logging.info(f"No new or updated records ({stage_counts.get('unchanged_partitions', 0)} partitions unchanged), skipping alert checks")
         
-        logging.info(f"Seoul apartment ETL pipeline completed successfully in {pipeline_duration:.2f} seconds")
+        pipeline_duration = (datetime.now() - datetime.fromisoformat(pipeline_start)).total_seconds()
+        logging.info(f"Seoul apartment ETL pipeline run {run_id} completed successfully in {pipeline_duration:.2f} seconds")
         etl_tasks_processed.labels('run_seoul_apartment_etl_pipeline', 'success').inc()
         
         return {
@@ -476,6 +540,42 @@ def run_seoul_apartment_etl_pipeline():
             "audit_result": audit_result
         }
         
+    except Exception as e:
+        logging.error(f"Seoul apartment ETL pipeline run {run_id} failed: {e}")
+        sentry_sdk.capture_exception(e)
+        etl_alert_logger.error(f"ETL Alert: Seoul apartment ETL pipeline run {run_id} failed: {e}")
+        etl_tasks_processed.labels('run_seoul_apartment_etl_pipeline', 'failure').inc()
+        raise
+
+@shared_task
+def run_seoul_apartment_etl_pipeline():
+    """
+    Complete ETL pipeline for Seoul apartment transaction data
+    Orchestrates: fetch -> normalize -> deduplicate -> store -> audit
+    
+    The pipeline is dispatched as a Celery canvas and this task returns as soon as
+    it is queued; it never waits on a stage result. Use get_seoul_etl_run_timings
+    with the returned run_id to see per-stage timing of the run.
+    """
+    try:
+        from datetime import datetime
+        from uuid import uuid4
+        
+        run_id = uuid4().hex
+        months = _nightly_fetch_months()
+        logging.info(f"Starting Seoul apartment ETL pipeline run {run_id} for months {months}")
+        
+        workflow = build_seoul_apartment_etl_workflow(run_id, months, datetime.now().isoformat())
+        async_result = workflow.apply_async()
+        
+        return {
+            "message": "Seoul apartment ETL pipeline dispatched",
+            "run_id": run_id,
+            "task_id": async_result.id,
+            "districts": len(SEOUL_DISTRICTS),
+            "months": months
+        }
+        
     except Exception as e:
         logging.error(f"Seoul apartment ETL pipeline failed: {e}")
         sentry_sdk.capture_exception(e)
@@ -483,6 +583,31 @@ def run_seoul_apartment_etl_pipeline():
         etl_tasks_processed.labels('run_seoul_apartment_etl_pipeline', 'failure').inc()
         raise
 
+@shared_task
+def get_seoul_etl_run_timings(run_id):
+    """Per-stage spans and summary (wall clock, total, max) for one pipeline run"""
+    return get_run_tracker().timings(run_id)
+
+@shared_task
+def sweep_etl_blobs(max_age_hours=None):
+    """Delete inter-stage payload blobs older than the retention window"""
+    try:
+        max_age_hours = max_age_hours or float(os.environ.get('ETL_BLOB_RETENTION_HOURS', '72'))
+        removed = get_blob_store().sweep(max_age_hours * 3600)
+        logging.info(f"Blob retention sweep removed {removed} blobs older than {max_age_hours} hours")
+        
+        # Expired RTMS responses are dropped too; a replay corpus is kept as recorded
+        response_cache = get_response_cache()
+        expired_responses = response_cache.prune() if response_cache is not None and response_cache.mode == 'record' else 0
+        
+        etl_tasks_processed.labels('sweep_etl_blobs', 'success').inc()
+        return {"message": "ETL blob sweep completed", "removed": removed, "expired_responses": expired_responses}
+    except Exception as e:
+        logging.error(f"Error sweeping ETL blobs: {e}")
+        sentry_sdk.capture_exception(e)
+        etl_tasks_processed.labels('sweep_etl_blobs', 'failure').inc()
+        raise
+
 @shared_task
 def send_daily_etl_summary_email():
     log_file_path = 'etl_alerts.log'
@@ -17,3 +17,647 @@ def test_fetch_data_from_api_failure():
     with pytest.raises(Exception) as excinfo:
         fetch_data_from_api("http://fail.example.com")
     assert "Simulated API connection error" in str(excinfo.value)
+
+class _SlowSession:
+    """Stands in for requests.Session, answering every request after a fixed delay."""
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get(self, url, params=None, timeout=None):
+        import time
+        from unittest.mock import MagicMock
+        time.sleep(self.delay)
+        response = MagicMock()
+        response.content = f"<response><body><items><item><아파트>{params['LAWD_CD']}</아파트></item></items></body></response>".encode('utf-8')
+        return response
+
+    def close(self):
+        pass
+
+def test_rtms_client_fetches_districts_concurrently():
+    import time
+    from services.etl.rtms_client import RTMSClient, SEOUL_DISTRICTS
+
+    client = RTMSClient("test", max_workers=25, per_host_limit=25, rate_limit=0, session=_SlowSession(0.2))
+    started = time.monotonic()
+    results = list(client.map_concurrent(lambda code: client.fetch_page(code, "202401"), SEOUL_DISTRICTS))
+    elapsed = time.monotonic() - started
+
+    assert sorted(unit for unit, _, _ in results) == sorted(SEOUL_DISTRICTS)
+    assert all(error is None for _, _, error in results)
+    assert elapsed < 0.2 * len(SEOUL_DISTRICTS) / 4
+
+class _PagedSession:
+    """Serves a fixed number of rows per (district, month), split into pages of numOfRows."""
+    def __init__(self, rows_per_month):
+        self.rows_per_month = rows_per_month
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        from unittest.mock import MagicMock
+        self.requests.append((params['LAWD_CD'], params['DEAL_YMD'], int(params['pageNo'])))
+        page_size, page_no = int(params['numOfRows']), int(params['pageNo'])
+        rows = range((page_no - 1) * page_size, min(page_no * page_size, self.rows_per_month))
+        items = "".join(f"<item><아파트>apt{i}</아파트></item>" for i in rows)
+        response = MagicMock()
+        response.content = f"<response><body><items>{items}</items><totalCount>{self.rows_per_month}</totalCount></body></response>".encode('utf-8')
+        return response
+
+    def close(self):
+        pass
+
+def test_backfill_walks_every_page_and_resumes_from_checkpoint(tmp_path):
+    from services.etl.rtms_client import RTMSClient
+    from services.etl.backfill import BackfillCheckpoint, RTMSPageWalker, month_range
+
+    months = month_range("202311", "202402")
+    assert months == ["202311", "202312", "202401", "202402"]
+
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    session = _PagedSession(rows_per_month=25)
+    client = RTMSClient("test", rate_limit=0, session=session)
+    walker = RTMSPageWalker(client, page_size=10, checkpoint=BackfillCheckpoint(checkpoint_path))
+
+    # Stop part-way through, as if the worker had been killed
+    pages = []
+    for unit in walker.walk(["11110", "11140"], months):
+        pages.append(unit)
+        if len(pages) == 5:
+            break
+    walker.checkpoint.save()
+
+    resumed = RTMSPageWalker(client, page_size=10, checkpoint=BackfillCheckpoint(checkpoint_path))
+    pages.extend(resumed.walk(["11110", "11140"], months))
+
+    # Only the page being processed at the interruption is delivered twice
+    unique_pages = {(d, m, p): rows for d, m, p, rows in pages}
+    assert len(unique_pages) == 2 * 4 * 3
+    assert len(pages) == len(unique_pages) + 1
+    assert sum(len(rows) for rows in unique_pages.values()) == 2 * 4 * 25
+
+class _FlakySession(_PagedSession):
+    """_PagedSession whose months in failing_months answer 503 for their first `failures` requests."""
+    def __init__(self, rows_per_month, failing_months, failures):
+        super().__init__(rows_per_month)
+        self.remaining = {month: failures for month in failing_months}
+
+    def get(self, url, params=None, timeout=None):
+        import requests
+        month = params['DEAL_YMD']
+        if self.remaining.get(month, 0) > 0:
+            self.remaining[month] -= 1
+            self.requests.append((params['LAWD_CD'], month, int(params['pageNo'])))
+            response = requests.Response()
+            response.status_code = 503
+            raise requests.exceptions.HTTPError("503 Service Unavailable", response=response)
+        return super().get(url, params, timeout)
+
+class _DatedPagedSession(_PagedSession):
+    """_PagedSession whose rows are complete transactions dated within the requested month."""
+    def get(self, url, params=None, timeout=None):
+        from unittest.mock import MagicMock
+        self.requests.append((params['LAWD_CD'], params['DEAL_YMD'], int(params['pageNo'])))
+        page_no, page_size = int(params['pageNo']), int(params['numOfRows'])
+        year, month = params['DEAL_YMD'][:4], params['DEAL_YMD'][4:]
+        items = "".join(
+            f"<item><아파트>apt{i}</아파트><거래금액>{50000 + i}</거래금액><건축년도>2010</건축년도><년>{year}</년>"
+            f"<월>{month}</월><일>{1 + i % 28}</일><전용면적>84.5</전용면적><시군구>종로구</시군구><법정동>청운동</법정동>"
+            f"<층>{1 + i % 20}</층></item>"
+            for i in range((page_no - 1) * page_size, min(page_no * page_size, self.rows_per_month))
+        )
+        response = MagicMock()
+        response.content = f"<response><body><items>{items}</items><totalCount>{self.rows_per_month}</totalCount></body></response>".encode('utf-8')
+        return response
+
+def test_backfill_persists_one_whole_partition_digest_per_run(tmp_path, monkeypatch):
+    import services.etl.blob_store as blob_store
+    import services.etl.rtms_client as rtms_client
+    from services.common.db import get_engine
+    from services.etl.checksums import PartitionDigestStore
+    from tasks import backfill_seoul_apartment_data
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path / 'state'))
+    monkeypatch.setattr(blob_store, '_blob_store', blob_store.LocalBlobStore(str(tmp_path / 'blobs')))
+    session = _DatedPagedSession(rows_per_month=2500)
+    monkeypatch.setattr(rtms_client.RTMSClient, '_build_session', lambda self: session)
+
+    # 2500 rows are three pages of one partition, each stored on its own
+    result = backfill_seoul_apartment_data("202401", "202401", str(tmp_path / 'checkpoint.json'), ["11110"])
+    assert result["pages_loaded"] == 3 and result["new_records"] == 2500 and result["failed_units"] == []
+
+    store = PartitionDigestStore(get_engine(f"sqlite:///{tmp_path / 'etl.db'}"))
+    assert store.run_leaves(result["run_id"]) == {("11110", "202401"): store.table_digest("11110", "202401")}
+    assert store.latest("11110", "202401")[0] == 2500
+    assert store.verify_partition("11110", "202401")
+
+def test_circuit_breaker_opens_and_recovers_after_probe():
+    import requests
+    from services.etl.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry
+
+    now = [0.0]
+    breaker = CircuitBreaker("rtms", failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=4, sleep=lambda delay: None)
+    assert all(0.5 <= policy.delay(0) <= 1 and 2 <= policy.delay(2) <= 4 for _ in range(20))
+
+    def unavailable():
+        raise requests.exceptions.ConnectionError("down")
+
+    # Three failed attempts open the circuit; the remaining attempts fail fast
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(unavailable, policy, breaker)
+    assert breaker.state == 'open'
+
+    now[0] = 11
+    assert call_with_retry(lambda: "ok", policy, breaker) == "ok"
+    assert breaker.state == 'closed'
+
+def test_fetch_retries_only_failed_partitions(tmp_path, monkeypatch):
+    from celery import current_app
+    import services.etl.blob_store as blob_store
+    import services.etl.rtms_client as rtms_client
+    import services.etl.resilience as resilience
+    from tasks import fetch_seoul_district_data
+
+    monkeypatch.setattr(current_app.conf, 'task_always_eager', True)
+    monkeypatch.setattr(blob_store, '_blob_store', blob_store.LocalBlobStore(str(tmp_path / 'blobs')))
+    monkeypatch.setattr(resilience, '_breakers', {'apis.data.go.kr': resilience.CircuitBreaker('rtms', failure_threshold=100)})
+    monkeypatch.setattr(resilience.RetryPolicy, 'delay', lambda self, attempt: 0)
+    # 202402 outlasts the per-request retries of the first task attempt
+    session = _FlakySession(rows_per_month=3, failing_months={"202402"}, failures=resilience.RTMS_MAX_ATTEMPTS + 1)
+    monkeypatch.setattr(rtms_client.RTMSClient, '_build_session', lambda self: session)
+
+    result = fetch_seoul_district_data.apply(("11110", ["202401", "202402"]), {'use_watermarks': False}).get()
+
+    assert result["count"] == 6 and result["failed_partitions"] == []
+    assert session.requests.count(("11110", "202401", 1)) == 1
+    assert session.requests.count(("11110", "202402", 1)) == resilience.RTMS_MAX_ATTEMPTS + 2
+
+def test_response_cache_records_and_replays_offline(tmp_path):
+    from services.etl.rtms_client import RTMSClient
+    from services.etl.backfill import RTMSPageWalker
+    from services.etl.response_cache import ResponseCache
+
+    def walk(client):
+        walker = RTMSPageWalker(client, page_size=10)
+        pages = {(d, m, p): rows for d, m, p, rows in walker.walk(["11110", "11140"], ["202401", "202402"])}
+        return pages, walker.failed_units
+
+    session = _PagedSession(rows_per_month=25)
+    recorder = ResponseCache(str(tmp_path / "cache"), mode='record', ttl_seconds=3600)
+    recorded, _ = walk(RTMSClient("test", rate_limit=0, session=session, response_cache=recorder))
+    assert walk(RTMSClient("test", rate_limit=0, session=session, response_cache=recorder))[0] == recorded
+    assert len(session.requests) == 12 and recorder.hits == 12
+
+    # Replay never touches the network, however old the entries are
+    offline = _FlakySession(rows_per_month=25, failing_months={"202401", "202402"}, failures=100)
+    replayer = ResponseCache(str(tmp_path / "cache"), mode='replay', ttl_seconds=0)
+    assert walk(RTMSClient("test", rate_limit=0, session=offline, response_cache=replayer)) == (recorded, [])
+    assert offline.requests == []
+
+    # Once pruned, replayed requests fail like failed pages
+    assert ResponseCache(str(tmp_path / "cache"), mode='record', ttl_seconds=0).prune() == 12
+    pages, failed = walk(RTMSClient("test", rate_limit=0, session=offline, response_cache=replayer))
+    assert pages == {} and len(failed) == 4 and offline.requests == []
+
+def test_watermarks_skip_unchanged_partitions():
+    from sqlalchemy import create_engine
+    from services.etl.migrations import migrate
+    from services.etl.watermarks import WatermarkStore, select_changed_partitions
+
+    engine = create_engine("sqlite:///:memory:")
+    migrate(engine)
+    store = WatermarkStore(engine)
+    rows = [{'district_code': '11110', 'apartment_name': 'A'}, {'district_code': '11110', 'apartment_name': 'B'}]
+    partitions = {('11110', '202401'): rows, ('11140', '202401'): [{'district_code': '11140', 'apartment_name': 'C'}]}
+
+    changed, unchanged = select_changed_partitions(partitions, store.load(['202401']))
+    assert len(changed) == 2 and unchanged == []
+    store.save([fingerprint for _, _, fingerprint in changed])
+
+    # Same rows in a different order are unchanged; an extra row is a change
+    partitions[('11110', '202401')] = list(reversed(rows))
+    partitions[('11140', '202401')].append({'district_code': '11140', 'apartment_name': 'D'})
+    changed, unchanged = select_changed_partitions(partitions, store.load(['202401']))
+    assert unchanged == [('11110', '202401')]
+    assert [key for key, _, _ in changed] == [('11140', '202401')]
+
+def test_streaming_rtms_parser_matches_legacy_parser():
+    from services.etl.rtms_parser import iter_rtms_items, parse_rtms_response
+    from services.etl.benchmarks.bench_rtms_parser import legacy_parse, synthetic_rtms_response
+
+    content = synthetic_rtms_response(200)
+    assert list(iter_rtms_items(content, "11110")) == legacy_parse(content, "11110")
+    transactions, total_count = parse_rtms_response(content, "11110")
+    assert len(transactions) == total_count == 200
+
+def test_columnar_normalization_matches_row_normalization():
+    from services.etl.transforms import normalize_transaction
+    from services.etl.columnar import normalize_records_columnar
+    from services.etl.benchmarks.bench_normalize import synthetic_transactions
+
+    transactions = synthetic_transactions(500) + [
+        {'district_code': '11110', 'transaction_amount': ' 1,234 ', 'area_sqm': '', 'transaction_date': '2024-02-30'},
+        {'district_code': '11110', 'transaction_amount': '', 'area_sqm': '84.5', 'construction_year': '1949', 'floor': '-1'},
+        {'district_code': '11110', 'transaction_amount': '12a', 'area_sqm': '1.2.3'},
+        {'district_code': '11110', 'apartment_name': None},
+        {},
+    ]
+    expected = []
+    for transaction in transactions:
+        try:
+            expected.append(normalize_transaction(transaction, '2024-01-01T00:00:00'))
+        except Exception:
+            continue
+    assert len(expected) == len(transactions) - 2
+    assert normalize_records_columnar(transactions, '2024-01-01T00:00:00') == expected
+
+def test_transaction_batch_round_trips_records_and_deduplicates():
+    from services.etl.records import TransactionBatch
+    from services.etl.transforms import deduplicate_batch
+
+    records = [
+        {'unique_key': 'a', 'transaction_date': '2024-01-02', 'data_quality_score': 50, 'dong_name': '청운동'},
+        {'unique_key': 'b', 'transaction_date': None, 'data_quality_score': 90},
+        {'unique_key': 'a', 'transaction_date': '2024-01-03', 'data_quality_score': 80, 'dong_name': ''.join(['청운', '동'])},
+    ]
+    batch = TransactionBatch.from_records(records)
+    assert len(batch) == 3
+    assert batch.to_records() == records
+    assert batch.columns['dong_name'][0] is batch.columns['dong_name'][2]
+
+    deduplicated, duplicates_found = deduplicate_batch(batch)
+    assert duplicates_found == 1
+    assert deduplicated.to_records() == [records[2], records[1]]
+
+def test_bulk_store_encodes_copy_rows_and_rejects_invalid_ones():
+    from services.etl.storage import STORE_COLUMNS, encode_copy_rows
+    from services.etl.transforms import content_fingerprint
+
+    row = {column: None for column in STORE_COLUMNS}
+    row.update({'unique_key': 'k1', 'apartment_name': 'A\tB\\C', 'transaction_amount_won': 10000, 'area_sqm': 84.5,
+                'transaction_date': '2024-01-02'})
+    buffer, rejected = encode_copy_rows([
+        row,
+        {**row, 'unique_key': 'k2', 'floor': 2 ** 40},
+        {**row, 'unique_key': 'k3', 'transaction_date': '2024-02-30'},
+        {'unique_key': 'k4'},
+    ])
+    assert buffer.splitlines() == ['0\tk1\t\\N\t\\N\t\\N\tA\\tB\\\\C\t10000\t\\N\t84.5\t\\N\t\\N\t\\N\t2024-01-02\t\\N\t\\N\t\\N\t' + content_fingerprint(row)]
+    assert [(t['unique_key'], reason) for t, reason in rejected] == [
+        ('k2', 'floor is not a 32-bit integer'),
+        ('k3', 'transaction_date is not an ISO date'),
+        ('k4', 'missing district_code'),
+    ]
+
+def test_migrations_run_once_and_store_upserts_with_rejects(tmp_path):
+    from sqlalchemy import inspect, text
+    from services.common.db import get_engine
+    from services.etl.migrations import MIGRATIONS, migrate
+    from services.etl.storage import store_transactions
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    assert get_engine(f"sqlite:///{tmp_path / 'etl.db'}") is engine
+    assert migrate(engine) == [version for version, _, _ in MIGRATIONS]
+    assert migrate(engine) == []
+    indexes = {index['name'] for index in inspect(engine).get_indexes('apartment_transactions')}
+    assert {'idx_apartment_transactions_district_date', 'idx_apartment_transactions_quality_date'} <= indexes
+
+    row = {'unique_key': 'k1', 'district_code': '11110', 'district_name': '종로구', 'dong_name': '청운동',
+           'apartment_name': 'A', 'transaction_amount_won': 10000, 'transaction_amount_display': '10,000원',
+           'area_sqm': 84.5, 'area_pyeong': 25.56, 'construction_year': 2000, 'floor': 3,
+           'transaction_date': '2024-01-02', 'reg_date': '', 'price_per_sqm': 118, 'data_quality_score': 100}
+    with engine.connect() as connection:
+        assert store_transactions(connection, [row, {'unique_key': 'k2'}]) == (1, 0, 1, 0)
+        assert store_transactions(connection, [{**row, 'floor': 4}]) == (0, 1, 0, 0)
+        # Same content again: fingerprints match, so nothing is rewritten
+        assert store_transactions(connection, [{**row, 'floor': 4}]) == (0, 0, 0, 1)
+        connection.commit()
+        assert connection.execute(text("SELECT floor FROM apartment_transactions")).fetchall() == [(4,)]
+        assert connection.execute(text("SELECT unique_key FROM etl_rejected_transactions")).fetchall() == [('k2',)]
+
+def test_store_keeps_district_daily_stats_in_step_and_rebuildable(tmp_path):
+    from sqlalchemy import text
+    from services.common.db import get_engine
+    from services.etl.migrations import migrate
+    from services.etl.rollups import rebuild_district_daily_stats
+    from services.etl.storage import store_transactions
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    migrate(engine)
+    row = {'unique_key': 'k1', 'district_code': '11110', 'district_name': '종로구', 'dong_name': '청운동',
+           'apartment_name': 'A', 'transaction_amount_won': 100000, 'transaction_amount_display': '',
+           'area_sqm': 80.0, 'area_pyeong': 24.2, 'construction_year': 2000, 'floor': 3,
+           'transaction_date': '2024-01-02', 'reg_date': '', 'price_per_sqm': 1250, 'data_quality_score': 100}
+    rows = [
+        row,
+        {**row, 'unique_key': 'k2', 'transaction_amount_won': 300000, 'price_per_sqm': 3750},
+        {**row, 'unique_key': 'k3', 'transaction_date': '2024-01-05'},
+        {**row, 'unique_key': 'k4', 'district_code': '11140', 'district_name': '중구'},
+    ]
+
+    def stats(connection):
+        return connection.execute(text(
+            "SELECT stat_date, district_code, transaction_count, price_sum, price_per_sqm_sum, area_sum "
+            "FROM district_daily_stats ORDER BY stat_date, district_code")).fetchall()
+
+    with engine.connect() as connection:
+        store_transactions(connection, rows)
+        assert stats(connection) == [('2024-01-02', '11110', 2, 400000, 5000, 160), ('2024-01-02', '11140', 1, 100000, 1250, 80),
+                                     ('2024-01-05', '11110', 1, 100000, 1250, 80)]
+        # An update below the report quality threshold drops the row from its day
+        store_transactions(connection, [{**rows[1], 'data_quality_score': 50}])
+        incremental = stats(connection)
+        assert incremental[0] == ('2024-01-02', '11110', 1, 100000, 1250, 80)
+        assert rebuild_district_daily_stats(connection) == 3
+        assert stats(connection) == incremental
+        connection.commit()
+
+def test_key_index_skips_unchanged_rows_and_catches_up_across_workers(tmp_path):
+    from sqlalchemy import text
+    from services.common.db import get_engine
+    from services.etl.migrations import migrate
+    from services.etl.storage import store_transactions
+    from services.etl.key_index import StoredKeyIndex
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    migrate(engine)
+    rows = [{'unique_key': f"k{i}", 'district_code': '11110', 'district_name': '종로구', 'dong_name': '청운동',
+             'apartment_name': 'A', 'transaction_amount_won': 10000 * i, 'transaction_amount_display': '',
+             'area_sqm': 84.5, 'area_pyeong': 25.56, 'construction_year': 2000, 'floor': i,
+             'transaction_date': '2024-01-02', 'reg_date': '', 'price_per_sqm': i, 'data_quality_score': 100}
+            for i in range(1, 6)]
+
+    def store(index, transactions):
+        with engine.connect() as connection:
+            counts = index.store(connection, transactions)
+            connection.commit()
+        index.committed()
+        return counts
+
+    worker_a = StoredKeyIndex(str(tmp_path / 'a.npz'), 'db')
+    assert store(worker_a, rows) == (5, 0, 0, 0)
+    assert store(worker_a, rows) == (0, 0, 0, 5)
+
+    # Another writer changes k1; a stale index must not skip k1's old content
+    with engine.connect() as connection:
+        store_transactions(connection, [{**rows[0], 'floor': 9}])
+        connection.commit()
+    assert store(worker_a, rows) == (0, 1, 0, 4)
+
+    # A worker without an index file rebuilds it from the table
+    worker_b = StoredKeyIndex(str(tmp_path / 'b.npz'), 'db')
+    assert store(worker_b, rows) == (0, 0, 0, 5)
+    assert len(StoredKeyIndex(str(tmp_path / 'b.npz'), 'db')) == 5
+
+    # Rows deleted behind the index's back are noticed by the row count check and stored again
+    with engine.connect() as connection:
+        connection.execute(text("DELETE FROM apartment_transactions WHERE unique_key IN ('k1', 'k2')"))
+        connection.commit()
+    worker_a._verified_at = None  # as if ETL_KEY_INDEX_VERIFY_INTERVAL_SECONDS had passed
+    assert store(worker_a, rows) == (2, 0, 0, 3)
+    assert len(worker_a) == 5
+
+def test_partition_digests_verify_single_partitions(tmp_path):
+    from sqlalchemy import text
+    from services.common.db import get_engine
+    from services.etl.migrations import migrate
+    from services.etl.storage import store_transactions
+    from services.etl.checksums import PartitionDigests, PartitionDigestStore, streaming_checksum
+    from tasks import add_checksum_and_audit_log
+
+    engine = get_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    migrate(engine)
+    rows = [{'unique_key': f"k{i}", 'district_code': '11110' if i % 2 else '11140', 'district_name': '종로구',
+             'dong_name': '청운동', 'apartment_name': 'A', 'transaction_amount_won': 10000 * i,
+             'transaction_amount_display': '', 'area_sqm': 84.5, 'area_pyeong': 25.56, 'construction_year': 2000,
+             'floor': i, 'transaction_date': f"2024-0{1 + i % 3}-02", 'reg_date': '', 'price_per_sqm': i,
+             'data_quality_score': 100}
+            for i in range(1, 9)]
+
+    digests = PartitionDigests()
+    with engine.connect() as connection:
+        store_transactions(connection, digests.observe([dict(row) for row in rows]))
+        connection.commit()
+    store = PartitionDigestStore(engine)
+    summary = store.save('run-1', digests)
+    assert len(summary['partitions']) == 6 and store.run_leaves('run-1') == digests.leaves()
+
+    # The root does not depend on record order
+    reordered = PartitionDigests()
+    list(reordered.observe(reversed([dict(row) for row in rows])))
+    assert reordered.summary()['merkle_root'] == summary['merkle_root']
+
+    assert store.verify_partition('11110', '202402')
+    with engine.connect() as connection:
+        connection.execute(text("UPDATE apartment_transactions SET floor = 99, content_fingerprint = NULL WHERE unique_key = 'k3'"))
+        connection.commit()
+    assert not store.verify_partition('11110', '202401')
+    assert store.verify_partition('11110', '202402')
+
+    audit = add_checksum_and_audit_log({'run_id': 'run-1', 'data': rows, 'partition_digests': summary})
+    assert audit['checksum'] == streaming_checksum(rows)
+    assert audit['audit_log']['merkle_root'] == summary['merkle_root']
+
+def test_stages_pass_claim_checks_through_blob_store(tmp_path, monkeypatch):
+    import services.etl.blob_store as blob_store
+    from tasks import normalize_seoul_apartment_data, deduplicate_seoul_apartment_records
+
+    monkeypatch.setattr(blob_store, '_blob_store', blob_store.LocalBlobStore(str(tmp_path)))
+    raw = {'district_code': '11110', 'apartment_name': '래미안', 'transaction_amount': '120,000', 'construction_year': '2010',
+           'transaction_date': '2024-01-15', 'area_sqm': '84.97', 'district_name': '종로구', 'dong_name': '사직동',
+           'floor': '7', 'reg_date': ''}
+    raw_ref = blob_store.get_blob_store().put_records([raw, dict(raw)])
+
+    normalized = normalize_seoul_apartment_data({'data_ref': raw_ref})
+    assert 'normalized_data' not in normalized and normalized['normalized_data_ref']['count'] == 2
+
+    deduplicated = deduplicate_seoul_apartment_records(normalized)
+    assert deduplicated['unique_count'] == 1
+    records = list(blob_store.iter_payload_records(deduplicated, 'deduplicated_data'))
+    assert records[0]['transaction_amount_won'] == 1200000000
+
+    # A stage that fails midway leaves no partial blob behind
+    with pytest.raises(ValueError):
+        with blob_store.StageOutput(as_blob=True) as output:
+            output.append(raw)
+            raise ValueError("stage failed")
+    assert blob_store.get_blob_store().sweep(max_age_seconds=-1) == 3
+
+def test_pipeline_dag_runs_per_district_chains_and_records_stage_timings(tmp_path, monkeypatch):
+    from celery import current_app
+    from sqlalchemy import create_engine
+    import services.etl.blob_store as blob_store
+    import services.etl.rtms_client as rtms_client
+    import services.etl.run_tracker as run_tracker
+    from services.etl.rtms_parser import parse_rtms_response
+    from services.etl.migrations import migrate
+    from services.etl.watermarks import WatermarkStore, partition_fingerprint
+    from tasks import build_seoul_apartment_etl_workflow, get_seoul_etl_run_timings
+
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'etl.db'}")
+    monkeypatch.setattr(current_app.conf, 'task_always_eager', True)
+    monkeypatch.setattr(blob_store, '_blob_store', blob_store.LocalBlobStore(str(tmp_path / 'blobs')))
+    monkeypatch.setattr(run_tracker, '_run_tracker', None)
+    session = _PagedSession(rows_per_month=3)
+    monkeypatch.setattr(rtms_client.RTMSClient, '_build_session', lambda self: session)
+
+    # Watermarks already match every response: a quiet night
+    districts, months = ["11110", "11140"], ["202401", "202402"]
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    migrate(engine)
+    store = WatermarkStore(engine)
+    fingerprints = []
+    for d in districts:
+        for m in months:
+            content = session.get(None, {'LAWD_CD': d, 'DEAL_YMD': m, 'numOfRows': '1000', 'pageNo': '1'}).content
+            row_count, content_hash = partition_fingerprint(parse_rtms_response(content, d)[0])
+            fingerprints.append({'district_code': d, 'deal_ymd': m, 'row_count': row_count, 'content_hash': content_hash})
+    store.save(fingerprints)
+
+    result = build_seoul_apartment_etl_workflow("run-1", months, "2024-02-20T02:00:00", districts).apply_async().get()
+
+    summary = result["pipeline_summary"]
+    assert summary["unchanged_partitions"] == 4 and summary["new_records_stored"] == 0
+    timings = get_seoul_etl_run_timings("run-1")
+    assert set(timings["stages"]) == {"fetch", "normalize", "deduplicate", "store", "finalize"}
+    assert timings["stages"]["fetch"]["spans"] == 2
+    assert {span["district_code"] for span in timings["spans"] if span["stage"] == "normalize"} == set(districts)
+
+def test_streaming_pipeline_processes_bounded_batches(tmp_path):
+    from services.etl.rtms_client import RTMSClient
+    from services.etl.backfill import BackfillCheckpoint
+    from services.etl.streaming import run_streaming_pipeline
+
+    client = RTMSClient("test", rate_limit=0, session=_PagedSession(rows_per_month=25))
+    checkpoint = BackfillCheckpoint(str(tmp_path / "stream.json"))
+    stats = run_streaming_pipeline(["11110", "11140"], ["202401", "202402"], batch_size=20,
+                                   checkpoint=checkpoint, store=False, client=client, page_size=10)
+
+    assert stats['raw_records_fetched'] == stats['normalized_records'] == 100
+    assert stats['max_batch_rows'] < 20 + 10
+    assert len(checkpoint.done) == 2 * 2 * 3
+    assert stats['peak_rss_mb'] > 0
+
+def test_benchmark_suite_is_deterministic_and_flags_regressions(tmp_path, monkeypatch):
+    import sys
+    import tasks
+    from services.etl.benchmarks.synthetic import SyntheticRTMS
+    from services.etl.benchmarks.bench_pipeline import compare, run
+
+    corpus = SyntheticRTMS(seed=3, page_size=100)
+    assert list(corpus.pages(500)) == list(SyntheticRTMS(seed=3, page_size=100).pages(500))
+    assert sum(1 for _ in corpus.raw_records(500)) == 500
+
+    # The suite imports the tasks under their package name; reuse the module the tests loaded
+    monkeypatch.setitem(sys.modules, 'services.etl.tasks', tasks)
+    monkeypatch.setenv("ETL_STATE_DIR", str(tmp_path))
+    result = run(500, batch_rows=200, database_url=f"sqlite:///{tmp_path / 'bench.db'}", months=["202401"])
+    assert result['stages']['parse']['rows'] == result['stages']['normalize']['rows'] == 500
+    assert result['stages']['parse']['batches'] == 3 and result['stages']['store']['rows'] > 0
+
+    slower = {'runs': [{**result, 'stages': {'parse': {'rows_per_second': result['stages']['parse']['rows_per_second'] * 2}}}]}
+    assert compare({'runs': [result]}, slower, tolerance=0.2)[0].startswith("parse at 500 rows")
+    assert compare({'runs': [result]}, {'runs': [result]}, tolerance=0.2) == []
+
+def test_stage_metrics_share_service_and_stage_labels():
+    from prometheus_client import REGISTRY
+    from tasks import normalize_seoul_apartment_data, deduplicate_seoul_apartment_records
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, {'service': 'etl', **labels}) or 0
+
+    raw = {'district_code': '11110', 'apartment_name': '래미안', 'transaction_amount': '120,000', 'construction_year': '2010',
+           'transaction_date': '2024-01-15', 'area_sqm': '84.97', 'district_name': '종로구', 'dong_name': '사직동',
+           'floor': '7', 'reg_date': ''}
+    rows_before = sample('estate_stage_rows_total', stage='deduplicate', direction='out')
+    runs_before = sample('estate_stage_duration_seconds_count', stage='normalize', status='success')
+
+    deduplicate_seoul_apartment_records(normalize_seoul_apartment_data({'data': [raw, dict(raw), dict(raw, transaction_amount='121,000')]}))
+
+    assert sample('estate_stage_rows_total', stage='deduplicate', direction='out') == rows_before + 2
+    assert sample('estate_dedup_ratio', stage='deduplicate') == pytest.approx(1 / 3)
+    assert sample('estate_stage_duration_seconds_count', stage='normalize', status='success') == runs_before + 1
+
+def test_sampled_task_profiles_are_written_per_task_id(tmp_path, monkeypatch):
+    import json
+    import services.common.profiling as profiling
+    from tasks import normalize_seoul_apartment_data, deduplicate_seoul_apartment_records
+
+    monkeypatch.setenv("TASK_PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("TASK_PROFILE_RATES", "normalize_seoul_apartment_data=1")
+    monkeypatch.setenv("TASK_PROFILE_CAPTURE", "cprofile,tracemalloc,spans")
+    monkeypatch.setattr(profiling, '_config', None)
+    profiling.install()
+
+    raw = {'district_code': '11110', 'apartment_name': '래미안', 'transaction_amount': '120,000', 'construction_year': '2010',
+           'transaction_date': '2024-01-15', 'area_sqm': '84.97', 'district_name': '종로구', 'dong_name': '사직동',
+           'floor': '7', 'reg_date': ''}
+    normalized = normalize_seoul_apartment_data.apply(({'data': [raw]},), task_id='profiled-1').get()
+    deduplicate_seoul_apartment_records.apply((normalized,), task_id='unsampled-1').get()
+
+    profile_dir = tmp_path / normalize_seoul_apartment_data.name / 'profiled-1'
+    assert {path.name for path in profile_dir.iterdir()} == {'cprofile.txt', 'cprofile.pstats', 'tracemalloc.txt', 'profile.json'}
+    profile = json.loads((profile_dir / 'profile.json').read_text())
+    assert profile['state'] == 'SUCCESS' and [span['name'] for span in profile['spans']] == ['etl:normalize']
+    assert not (tmp_path / deduplicate_seoul_apartment_records.name).exists()
+
+    monkeypatch.setenv("SENTRY_TRACES_SAMPLE_RATES", "services.etl.tasks.fetch_seoul_district_data=0.5")
+    sampler = profiling.sentry_options()['traces_sampler']
+    assert sampler({'transaction_context': {'name': 'services.etl.tasks.fetch_seoul_district_data'}}) == 0.5
+    assert sampler({'transaction_context': {'name': 'services.etl.tasks.sweep_etl_blobs'}}) == 0.01
+
+
+class _StubSecretsClient:
+    """Local stand-in for the Secrets Manager API, counting round trips."""
+
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.calls = 0
+        self.fail = False
+
+    def batch_get_secret_value(self, SecretIdList, NextToken=None):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("Secrets Manager unreachable")
+        found = [name for name in SecretIdList if name in self.secrets]
+        return {
+            'SecretValues': [{'Name': name, 'ARN': f"arn:{name}", 'SecretString': self.secrets[name]} for name in found],
+            'Errors': [{'SecretId': name, 'ErrorCode': 'ResourceNotFoundException', 'Message': 'not found'}
+                       for name in SecretIdList if name not in found]
+        }
+
+
+def test_secrets_are_batch_loaded_negatively_cached_and_refreshed():
+    from services.common.secrets import SecretsManager
+
+    now = [1000.0]
+    stub = _StubSecretsClient({'estate/database/url': 'postgresql://db', 'estate/kreb/api_key': 'kreb-1'})
+    manager = SecretsManager(ttl_seconds=3600, refresh_ahead_seconds=300, negative_ttl_seconds=60,
+                             client_factory=lambda: stub, clock=lambda: now[0], background=False)
+
+    manager.preload(['estate/database/url', 'estate/kreb/api_key', 'estate/missing'])
+    assert stub.calls == 1
+    assert manager.get_secret('estate/kreb/api_key') == 'kreb-1'
+    # A miss is cached, not looked up again by every task
+    assert manager.get_secret('estate/missing') is None
+    assert manager.get_secret('estate/missing') is None
+    assert stub.calls == 1
+
+    # Nothing is due yet; the miss is retried after the negative TTL, the values before they expire
+    manager.refresh_due()
+    assert stub.calls == 1
+    now[0] += 61
+    manager.refresh_due()
+    assert stub.calls == 2
+    stub.secrets['estate/kreb/api_key'] = 'kreb-2'
+    # Refreshed with jitter, but always at least half the refresh-ahead window before expiry
+    now[0] = 1000 + 3600 - 150
+    manager.refresh_due()
+    assert manager.get_secret('estate/kreb/api_key') == 'kreb-2'
+
+    # A failed refresh keeps serving the cached values
+    stub.fail = True
+    now[0] += 3600
+    manager.refresh_due()
+    assert manager.get_secret('estate/database/url') == 'postgresql://db'
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.etl.records import TransactionBatch
+
+
+def normalize_transaction(transaction: Dict, created_at: Optional[str] = None) -> Dict:
+    """Normalize one raw RTMS transaction; raises if the row cannot be normalized"""
+    # Normalize transaction amount (remove commas, convert to integer)
+    amount_str = transaction.get('transaction_amount', '').replace(',', '').strip()
+    amount_won = int(amount_str) * 10000 if amount_str.isdigit() else 0  # Convert 만원 to won
+    
+    # Normalize area (convert to float)
+    area_str = transaction.get('area_sqm', '').strip()
+    area_sqm = float(area_str) if area_str.replace('.', '').isdigit() else 0.0
+    
+    # Normalize construction year
+    construction_year_str = transaction.get('construction_year', '').strip()
+    construction_year = int(construction_year_str) if construction_year_str.isdigit() else None
+    
+    # Normalize floor
+    floor_str = transaction.get('floor', '').strip()
+    floor_num = int(floor_str) if floor_str.isdigit() else None
+    
+    # Parse and validate transaction date
+    transaction_date_str = transaction.get('transaction_date', '').strip()
+    transaction_date = None
+    if transaction_date_str:
+        try:
+            transaction_date = datetime.strptime(transaction_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            logging.warning(f"Invalid date format: {transaction_date_str}")
+    
+    # Create unique identifier for deduplication
+    unique_key = f"{transaction.get('district_code')}_{transaction.get('apartment_name')}_{transaction_date_str}_{amount_won}_{area_sqm}"
+    
+    return {
+        'unique_key': unique_key,
+        'district_code': transaction.get('district_code', '').strip(),
+        'district_name': transaction.get('district_name', '').strip(),
+        'dong_name': transaction.get('dong_name', '').strip(),
+        'apartment_name': transaction.get('apartment_name', '').strip(),
+        'transaction_amount_won': amount_won,
+        'transaction_amount_display': f"{amount_won:,}원" if amount_won > 0 else '',
+        'area_sqm': area_sqm,
+        'area_pyeong': round(area_sqm / 3.3058, 2) if area_sqm > 0 else 0.0,  # Convert to 평
+        'construction_year': construction_year,
+        'floor': floor_num,
+        'transaction_date': transaction_date.isoformat() if transaction_date else None,
+        'reg_date': transaction.get('reg_date', '').strip(),
+        'price_per_sqm': round(amount_won / area_sqm) if area_sqm > 0 and amount_won > 0 else 0,
+        'created_at': created_at or datetime.now().isoformat(),
+        'data_quality_score': calculate_data_quality_score(transaction, amount_won, area_sqm, construction_year)
+    }
+
+def calculate_data_quality_score(transaction, amount_won, area_sqm, construction_year):
+    """Calculate data quality score (0-100) based on completeness and validity"""
+    score = 0
+    
+    # Required fields scoring
+    if transaction.get('apartment_name', '').strip(): score += 20
+    if amount_won > 0: score += 25
+    if area_sqm > 0: score += 20
+    if transaction.get('transaction_date', '').strip(): score += 15
+    if transaction.get('district_name', '').strip(): score += 10
+    if construction_year and 1950 <= construction_year <= 2024: score += 10
+    
+    return score
+
+def deduplicate_batch(batch: TransactionBatch) -> Tuple[TransactionBatch, int]:
+    """Collapse rows sharing a unique_key, keeping the higher quality score.
+
+    Returns (deduplicated batch sorted by transaction date descending, duplicates found).
+    """
+    keys = batch.column('unique_key', None)
+    scores = batch.column('data_quality_score', 0)
+    dates = batch.column('transaction_date', None)
+
+    # unique_key -> index of the row kept for it, in order of first appearance
+    kept = {}
+    duplicates_found = 0
+    for i, unique_key in enumerate(keys):
+        if unique_key in kept:
+            # If duplicate found, keep the one with higher data quality score
+            if scores[i] > scores[kept[unique_key]]:
+                kept[unique_key] = i
+            duplicates_found += 1
+            logging.debug(f"Duplicate found for key: {unique_key}")
+        else:
+            kept[unique_key] = i
+
+    # Sort by transaction date descending
+    indices = sorted(kept.values(), key=lambda i: dates[i] or '', reverse=True)
+    return batch.take(indices), duplicates_found
+
+
+def deduplicate_transactions(transactions: Iterable[Dict]) -> Tuple[List[Dict], int]:
+    """deduplicate_batch for plain dict records."""
+    deduplicated, duplicates_found = deduplicate_batch(TransactionBatch.from_records(transactions))
+    return deduplicated.to_records(), duplicates_found
+
+
+# The stored content of a transaction, in the order content_fingerprint hashes it
+FINGERPRINT_COLUMNS = (
+    'unique_key', 'district_code', 'district_name', 'dong_name', 'apartment_name',
+    'transaction_amount_won', 'transaction_amount_display', 'area_sqm', 'area_pyeong',
+    'construction_year', 'floor', 'transaction_date', 'reg_date', 'price_per_sqm',
+    'data_quality_score'
+)
+
+
+def _canonical(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (float, Decimal)):
+        # Matches the DECIMAL(10,2) columns, so a row read back from the table hashes the same
+        return f"{value:.2f}"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def content_fingerprint(transaction: Dict) -> str:
+    """128-bit hex fingerprint of the columns a normalized transaction stores."""
+    canonical = '\x1f'.join(_canonical(transaction.get(column)) for column in FINGERPRINT_COLUMNS)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
@@ -0,0 +1,82 @@
+import json
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+
+PartitionKey = Tuple[str, str]
+
+
+def partition_fingerprint(transactions: List[Dict[str, str]]) -> Tuple[int, str]:
+    """Return (row_count, content_hash) for the raw rows of one (district, month) partition.
+
+    Rows are canonicalised and sorted before hashing, so the fingerprint does not
+    depend on the order the API happened to return them in.
+    """
+    canonical_rows = sorted(json.dumps(row, sort_keys=True, ensure_ascii=False) for row in transactions)
+    digest = hashlib.sha256()
+    for row in canonical_rows:
+        digest.update(row.encode('utf-8'))
+        digest.update(b'\n')
+    return len(canonical_rows), digest.hexdigest()
+
+
+class WatermarkStore:
+    """Per-(district, month) fingerprints of the last RTMS responses that were stored,
+    in etl_partition_watermarks (services/etl/migrations.py)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def load(self, deal_ymds: Iterable[str]) -> Dict[PartitionKey, Tuple[int, str]]:
+        """Return the stored fingerprints for every district in the given months."""
+        deal_ymds = sorted(set(deal_ymds))
+        if not deal_ymds:
+            return {}
+        params = {f"m{i}": deal_ymd for i, deal_ymd in enumerate(deal_ymds)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        query = f"SELECT district_code, deal_ymd, row_count, content_hash FROM etl_partition_watermarks WHERE deal_ymd IN ({placeholders})"
+        with self.engine.connect() as connection:
+            rows = connection.execute(text(query), params).fetchall()
+        return {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+    def save(self, partitions: List[Dict]):
+        """Upsert fingerprints; call only after the partitions' rows are committed."""
+        if not partitions:
+            return
+        upsert_sql = """
+        INSERT INTO etl_partition_watermarks (district_code, deal_ymd, row_count, content_hash, updated_at)
+        VALUES (:district_code, :deal_ymd, :row_count, :content_hash, CURRENT_TIMESTAMP)
+        ON CONFLICT (district_code, deal_ymd) DO UPDATE SET
+            row_count = EXCLUDED.row_count,
+            content_hash = EXCLUDED.content_hash,
+            updated_at = CURRENT_TIMESTAMP
+        """
+        with self.engine.connect() as connection:
+            connection.execute(text(upsert_sql), partitions)
+            connection.commit()
+        logging.info(f"Saved watermarks for {len(partitions)} partitions")
+
+
+def select_changed_partitions(partitions: Dict[PartitionKey, List[Dict[str, str]]],
+                              watermarks: Dict[PartitionKey, Tuple[int, str]]):
+    """Split fetched partitions into (changed, unchanged_keys).
+
+    changed is a list of (key, transactions, fingerprint dict) for partitions that
+    are new or whose fingerprint differs from the stored watermark.
+    """
+    changed = []
+    unchanged = []
+    for (district_code, deal_ymd), transactions in partitions.items():
+        row_count, content_hash = partition_fingerprint(transactions)
+        if watermarks.get((district_code, deal_ymd)) == (row_count, content_hash):
+            unchanged.append((district_code, deal_ymd))
+            continue
+        changed.append(((district_code, deal_ymd), transactions, {
+            'district_code': district_code,
+            'deal_ymd': deal_ymd,
+            'row_count': row_count,
+            'content_hash': content_hash
+        }))
+    return changed, unchanged